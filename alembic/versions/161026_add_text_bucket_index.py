@@ -0,0 +1,21 @@
+from alembic import op  # type: ignore
+
+revision = "161026_add_text_bucket_index"
+down_revision = "161026_add_text_embedding_vector"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Declared on the model but never migrated; bucket reads, index syncs and the pgvector
+    # bucket counts filter on these columns. Built concurrently, so writes go on meanwhile
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_domain_audience_tone "
+            "ON texts (domain, audience, tone)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_domain_audience_tone")
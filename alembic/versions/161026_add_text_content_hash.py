@@ -0,0 +1,55 @@
+import logging
+
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+revision = "161026_add_text_content_hash"
+down_revision = "161026_add_text_embeddings"
+branch_labels = None
+depends_on = None
+
+# Duplicate texts removed by the upgrade are kept here, the downgrade restores them
+DUPLICATES_TABLE = "texts_duplicates_161026"
+
+
+def upgrade():
+    op.add_column("texts", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.execute("UPDATE texts SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+    # Keep the oldest copy of texts stored more than once in a bucket, the unique index needs it.
+    # The other copies are moved to DUPLICATES_TABLE, so the removal can be audited and undone
+    op.execute(
+        f"""
+        CREATE TABLE {DUPLICATES_TABLE} AS
+        SELECT texts.* FROM texts
+        WHERE EXISTS (
+            SELECT 1 FROM texts AS original
+            WHERE texts.content_hash = original.content_hash
+              AND texts.domain = original.domain
+              AND texts.audience IS NOT DISTINCT FROM original.audience
+              AND texts.tone IS NOT DISTINCT FROM original.tone
+              AND texts.id > original.id
+        )
+        """
+    )
+    op.execute(f"DELETE FROM texts WHERE id IN (SELECT id FROM {DUPLICATES_TABLE})")
+    removed = op.get_bind().execute(sa.text(f"SELECT count(*) FROM {DUPLICATES_TABLE}")).scalar()
+    logger.warning(
+        f"Removed {removed} duplicate texts, the oldest copy of each is kept; the removed rows "
+        f"are in the {DUPLICATES_TABLE} table."
+    )
+    op.alter_column("texts", "content_hash", nullable=False)
+    op.create_index(
+        "unique_text_entry_hash",
+        "texts",
+        ["content_hash", "domain", "audience", "tone"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("unique_text_entry_hash", table_name="texts")
+    op.execute(f"INSERT INTO texts SELECT * FROM {DUPLICATES_TABLE}")
+    op.execute(f"DROP TABLE {DUPLICATES_TABLE}")
+    op.drop_column("texts", "content_hash")
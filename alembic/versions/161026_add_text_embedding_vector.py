@@ -0,0 +1,33 @@
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+revision = "161026_add_text_embedding_vector"
+down_revision = "161026_add_text_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def pgvector_available() -> bool:
+    return bool(
+        op.get_bind()
+        .execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'"))
+        .scalar()
+    )
+
+
+def upgrade():
+    # Only needed for retrieval_backend=pgvector, skipped on servers without the extension
+    if not pgvector_available():
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute("ALTER TABLE texts ADD COLUMN IF NOT EXISTS embedding_vector vector(384)")
+    # Embeddings are L2-normalized, so inner product ordering is cosine ordering
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_texts_embedding_vector "
+        "ON texts USING hnsw (embedding_vector vector_ip_ops)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_texts_embedding_vector")
+    op.execute("ALTER TABLE texts DROP COLUMN IF EXISTS embedding_vector")
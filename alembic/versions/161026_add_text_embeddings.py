@@ -0,0 +1,17 @@
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+revision = "161026_add_text_embeddings"
+down_revision = "031124_add_texts_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable so existing rows stay valid until
+    # `python -m content_assistant.core.db.backfill_embeddings` has been run.
+    op.add_column("texts", sa.Column("embedding", sa.LargeBinary, nullable=True))
+
+
+def downgrade():
+    op.drop_column("texts", "embedding")
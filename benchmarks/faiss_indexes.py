@@ -0,0 +1,114 @@
+"""
+Compare the similarity index types on synthetic 384-d corpora.
+
+Reports recall@1 against exact flat search, single-query latency, build time and serialized
+index size, to pick `faiss_index_type` / `faiss_ann_threshold` for a given bucket size.
+
+Usage:
+    python -m benchmarks.faiss_indexes --sizes 10000 100000 --queries 500 [--json results.json]
+"""
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from content_assistant.core.faiss_indexes import INDEX_TYPES, FaissIndexFactory
+
+DIMENSION = 384
+
+
+def make_corpus(n_vectors: int, n_queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Build a clustered, L2-normalized corpus and queries that are noisy copies of corpus rows.
+
+    Real buckets hold many near-paraphrases of the same few topics, which uniform random
+    vectors do not capture.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, int(np.sqrt(n_vectors)))
+    centers = rng.standard_normal((n_clusters, DIMENSION), dtype=np.float32)
+    labels = rng.integers(0, n_clusters, n_vectors)
+    corpus = centers[labels] + 0.5 * rng.standard_normal((n_vectors, DIMENSION), dtype=np.float32)
+    faiss.normalize_L2(corpus)
+
+    queries = corpus[rng.integers(0, n_vectors, n_queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    return corpus, queries
+
+
+def benchmark_index(factory: FaissIndexFactory, index_type: str, corpus, queries, truth) -> dict:
+    started = time.perf_counter()
+    index = factory.create(index_type, corpus)
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    found = np.empty(len(queries), dtype=np.int64)
+    # The request path searches one query at a time, so measure single-query latency
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, positions = index.search(query.reshape(1, -1), 1)
+        latencies.append(time.perf_counter() - started)
+        found[i] = positions[0][0]
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "index_type": index_type,
+        "n_vectors": len(corpus),
+        "recall_at_1": float(np.mean(found == truth)),
+        "latency_ms_mean": float(latencies_ms.mean()),
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+        "build_seconds": build_seconds,
+        "memory_bytes": len(faiss.serialize_index(index)),
+    }
+
+
+def run(sizes: list[int], n_queries: int, index_types: list[str], factory: FaissIndexFactory):
+    results = []
+    for n_vectors in sizes:
+        corpus, queries = make_corpus(n_vectors, n_queries)
+        _, truth = factory.create("flat", corpus).search(queries, 1)
+        for index_type in index_types:
+            if n_vectors < factory.min_training_points(index_type):
+                print(f"{n_vectors:>9} {index_type:>9} skipped, too few vectors to train")
+                continue
+            result = benchmark_index(factory, index_type, corpus, queries, truth[:, 0])
+            results.append(result)
+            print(
+                f"{n_vectors:>9} {index_type:>9} recall@1={result['recall_at_1']:.3f} "
+                f"latency={result['latency_ms_mean']:.3f}ms (p95 {result['latency_ms_p95']:.3f}ms) "
+                f"build={result['build_seconds']:.2f}s memory={result['memory_bytes'] / 2**20:.1f}MiB"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--ivf-nprobe", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--hnsw-ef-search", type=int, default=64)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--json", help="Write the results to this file.")
+    args = parser.parse_args()
+
+    factory = FaissIndexFactory(
+        ivf_nprobe=args.ivf_nprobe,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_search=args.hnsw_ef_search,
+        pq_m=args.pq_m,
+    )
+    results = run(args.sizes, args.queries, args.index_types, factory)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
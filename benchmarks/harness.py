@@ -0,0 +1,128 @@
+"""
+Shared setup of the pipeline benchmarks: settings, database, seed data and result files.
+
+The app reads its settings when it is imported, so `configure` has to run before anything
+from `content_assistant` is imported.
+"""
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+# Required settings that are normally read from `.env`, for runs without one
+DEFAULT_ENVIRONMENT = {
+    "POSTGRES_USER": "benchmark",
+    "POSTGRES_PASSWORD": "benchmark",
+    "POSTGRES_DB": "benchmark",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "UVICORN_HOST": "127.0.0.1",
+    "UVICORN_PORT": "8000",
+    "ENVIRONMENT": "benchmark",
+}
+
+
+def configure(database_url: Optional[str] = None, **settings: str) -> str:
+    """
+    Point the app settings at the benchmark database.
+
+    Args:
+        database_url (str, optional): An async database URL, e.g. a local PostgreSQL with the
+            migrations applied. Defaults to a new SQLite file.
+        **settings: Further settings, by environment variable name.
+
+    Returns:
+        str: The database URL.
+    """
+    if database_url is None:
+        handle, path = tempfile.mkstemp(prefix="content_assistant_benchmark_", suffix=".sqlite3")
+        os.close(handle)
+        database_url = f"sqlite+aiosqlite:///{path}"
+    os.environ["DATABASE_URL"] = database_url
+    for name, value in DEFAULT_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    os.environ.update(settings)
+    return database_url
+
+
+async def create_tables():
+    """Create the tables in a SQLite stand-in; PostgreSQL databases are migrated with Alembic."""
+    from content_assistant.core.db.database import engine
+    from content_assistant.core.models import Base
+
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+
+async def seed_bucket(
+    bucket: tuple[str, str, str], n_texts: int, seed: int = 0, chunk_size: int = 1000
+):
+    """Store `n_texts` texts with random embeddings in a bucket."""
+    from content_assistant.core.content_generator import INDEX_DIMENSION, insert_texts
+    from content_assistant.core.db.database import get_db
+
+    rng = np.random.default_rng(seed)
+    async with get_db() as db:
+        for start in range(0, n_texts, chunk_size):
+            count = min(chunk_size, n_texts - start)
+            embeddings = rng.standard_normal((count, INDEX_DIMENSION), dtype=np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+            texts = [f"Seed text {start + i} of {' '.join(bucket)}." for i in range(count)]
+            await insert_texts(db, bucket, texts, embeddings)
+            await db.commit()
+
+
+def summarize_latencies(latencies_seconds) -> dict:
+    latencies_ms = np.asarray(latencies_seconds, dtype=np.float64) * 1000
+    if not len(latencies_ms):
+        return {"count": 0}
+    return {
+        "count": int(len(latencies_ms)),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, results, **metadata):
+    """Save results with what is needed to compare them across branches."""
+    from content_assistant.core.config.settings import get_settings
+
+    settings = get_settings()
+    document = {
+        "benchmark": benchmark,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "database": settings.DATABASE_URL.split(":", 1)[0],
+        "settings": {
+            "retrieval_backend": settings.retrieval_backend,
+            "faiss_index_type": settings.faiss_index_type,
+            "cache_backend": settings.cache_backend,
+            "admission_enabled": settings.admission_enabled,
+            "inference_workers": settings.inference_workers,
+            "embedding_inference_backend": settings.embedding_inference_backend,
+            "generation_inference_backend": settings.generation_inference_backend,
+        },
+        **metadata,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
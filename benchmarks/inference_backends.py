@@ -0,0 +1,150 @@
+"""
+Compare the inference backends of the embedding and generation models.
+
+Each backend is loaded in a fresh process, so its resident memory is measured in isolation.
+Reports load time, resident memory, embedding and generation latency, and output quality
+against the fp32 PyTorch backend: cosine similarity of the embeddings and token overlap (F1)
+of greedily decoded texts. Run it from the repository root, the app settings are read from
+`.env`.
+
+Usage:
+    python -m benchmarks.inference_backends --backends pytorch quantized onnx [--json results.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from content_assistant.core.inference_backends import INFERENCE_BACKENDS, PYTORCH
+
+SAMPLE_TEXTS = [
+    "salad",
+    "fresh organic vegetables delivered to your door",
+    "A playful description of a summer collection of linen shirts for young professionals.",
+    "Quarterly report on the logistics costs of our European warehouses and carriers.",
+]
+
+SAMPLE_PROMPTS = [
+    "As a professional, write a text in a playful tone. Target audience: consumer. "
+    "Domain: e-commerce. Keywords: salad, summer. It should be exactly 30 words long.",
+    "As a professional, write a text in a formal tone. Target audience: business. "
+    "Domain: logistics. Keywords: warehouse, costs. It should be exactly 30 words long.",
+]
+
+
+def resident_memory_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _latencies_ms(func, repeats: int) -> np.ndarray:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return np.array(latencies) * 1000
+
+
+def benchmark_backend(backend: str, repeats: int, max_new_tokens: int) -> dict:
+    # Runs in its own process, the settings have to be in place before the app is imported
+    os.environ["EMBEDDING_INFERENCE_BACKEND"] = backend
+    os.environ["GENERATION_INFERENCE_BACKEND"] = backend
+    from content_assistant.core.content_generator import run_generation_batch
+    from content_assistant.core.generator import embed_text, embed_texts
+    from content_assistant.core.model_registry import model_registry
+
+    memory_before = resident_memory_bytes()
+    started = time.perf_counter()
+    model_registry.load_all(warm_up=True)
+    load_seconds = time.perf_counter() - started
+    memory_bytes = resident_memory_bytes() - memory_before
+
+    embedding_ms = _latencies_ms(lambda: embed_text(SAMPLE_TEXTS[2]), repeats)
+    generation_ms = _latencies_ms(
+        lambda: run_generation_batch(SAMPLE_PROMPTS[:1], max_new_tokens=max_new_tokens),
+        max(1, repeats // 10),
+    )
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "memory_bytes": memory_bytes,
+        "embedding_latency_ms_mean": float(embedding_ms.mean()),
+        "embedding_latency_ms_p95": float(np.percentile(embedding_ms, 95)),
+        "generation_latency_ms_mean": float(generation_ms.mean()),
+        "generation_latency_ms_p95": float(np.percentile(generation_ms, 95)),
+        "embeddings": embed_texts(SAMPLE_TEXTS).tolist(),
+        # Greedy decoding, so the texts only differ where the backends' outputs do
+        "generated_texts": run_generation_batch(SAMPLE_PROMPTS, max_new_tokens=max_new_tokens),
+    }
+
+
+def token_f1(reference: str, candidate: str) -> float:
+    reference_tokens, candidate_tokens = Counter(reference.split()), Counter(candidate.split())
+    overlap = sum((reference_tokens & candidate_tokens).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(candidate_tokens.values())
+    recall = overlap / sum(reference_tokens.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def add_quality(result: dict, reference: dict):
+    embeddings = np.array(result["embeddings"])
+    reference_embeddings = np.array(reference["embeddings"])
+    # Embeddings are L2-normalized, the row-wise inner product is the cosine similarity
+    similarities = (embeddings * reference_embeddings).sum(axis=1)
+    result["embedding_cosine_min"] = float(similarities.min())
+    scores = [
+        token_f1(reference_text, text)
+        for reference_text, text in zip(reference["generated_texts"], result["generated_texts"])
+    ]
+    result["generation_token_f1_mean"] = float(np.mean(scores))
+
+
+def run(backends: list[str], repeats: int, max_new_tokens: int) -> list[dict]:
+    # The fp32 PyTorch backend is the quality reference
+    backends = [PYTORCH] + [backend for backend in backends if backend != PYTORCH]
+    context = multiprocessing.get_context("spawn")
+    results: list[dict] = []
+    for backend in backends:
+        with context.Pool(1) as pool:
+            result = pool.apply(benchmark_backend, (backend, repeats, max_new_tokens))
+        add_quality(result, results[0] if results else result)
+        results.append(result)
+        print(
+            f"{backend:>9} load={result['load_seconds']:.1f}s "
+            f"memory={result['memory_bytes'] / 2**20:.0f}MiB "
+            f"embed={result['embedding_latency_ms_mean']:.1f}ms "
+            f"(p95 {result['embedding_latency_ms_p95']:.1f}ms) "
+            f"generate={result['generation_latency_ms_mean']:.0f}ms "
+            f"(p95 {result['generation_latency_ms_p95']:.0f}ms) "
+            f"cosine_min={result['embedding_cosine_min']:.4f} "
+            f"token_f1={result['generation_token_f1_mean']:.3f}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--backends", nargs="+", choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS)
+    )
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--max-new-tokens", type=int, default=60)
+    parser.add_argument("--json", help="Write the results to this file.")
+    args = parser.parse_args()
+
+    results = run(args.backends, args.repeats, args.max_new_tokens)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
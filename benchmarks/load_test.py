@@ -0,0 +1,192 @@
+"""
+Replay generation traffic against the app in-process at fixed concurrency levels.
+
+Requests are read from a JSONL file with one `TextGenerationRequest` per line, the format of
+`/collections/generate_text/batch/jsonl`, or generated from a fixed seed. Each concurrency
+level replays them through `create_app()` and reports latency percentiles, throughput and
+response status counts. Runs offline with tiny stand-in models and a SQLite database by
+default.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1 4 8 --requests traffic.jsonl --json load.json
+        [--database-url postgresql+asyncpg://...] [--real-models] [--cache-backend memory]
+        [--admission]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+from benchmarks import harness
+
+KEYWORDS = ["salad", "summer", "fresh", "organic", "delivery", "menu", "healthy", "lunch"]
+BUCKETS = [
+    ("e-commerce", "consumer", "playful"),
+    ("e-commerce", "business", "formal"),
+    ("advertising", "consumer", "informal"),
+]
+
+
+def load_requests(path: Optional[str], count: int, seed: int = 0) -> list[dict]:
+    """Read request bodies from a JSONL file, or generate `count` of them."""
+    if path:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        domain, audience, tone = rng.choice(BUCKETS)
+        requests.append(
+            {
+                "keywords": rng.sample(KEYWORDS, rng.randint(1, 3)),
+                "domain": domain,
+                "word_count": rng.choice([20, 40, 60]),
+                "audience": audience,
+                "tone": tone,
+            }
+        )
+    return requests
+
+
+async def replay(client, endpoint: str, requests: list[dict], concurrency: int) -> dict:
+    """Send all requests with `concurrency` of them in flight at a time."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def worker():
+        while not queue.empty():
+            request = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(endpoint, json=request)
+            elapsed = time.perf_counter() - started
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "wall_seconds": wall_seconds,
+        "throughput_rps": statuses[200] / wall_seconds if wall_seconds else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        # Latencies of successful requests only, rejections return right away
+        **harness.summarize_latencies(latencies),
+    }
+
+
+def error_share(result: dict) -> float:
+    """The share of responses of a concurrency level that were not successful."""
+    errors = sum(count for status, count in result["statuses"].items() if status[0] != "2")
+    return errors / result["requests"] if result["requests"] else 0.0
+
+
+async def run(
+    requests: list[dict], concurrency_levels: list[int], endpoint: str, seed_texts: int
+) -> list[dict]:
+    import httpx
+    from content_assistant.core.model_registry import model_registry
+    from content_assistant.main import create_app
+
+    await harness.create_tables()
+    buckets = {(request["domain"], request["audience"], request["tone"]) for request in requests}
+    for seed, bucket in enumerate(sorted(buckets)):
+        await harness.seed_bucket(bucket, seed_texts, seed=seed)
+    # The app's lifespan does not run in-process, load the models up front
+    model_registry.load_all(warm_up=True)
+
+    results = []
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", timeout=None
+    ) as client:
+        for concurrency in concurrency_levels:
+            result = await replay(client, endpoint, requests, concurrency)
+            results.append(result)
+            print(
+                f"concurrency={concurrency:>3} throughput={result['throughput_rps']:.2f}/s "
+                f"p50={result.get('p50_ms', 0):.0f}ms p95={result.get('p95_ms', 0):.0f}ms "
+                f"p99={result.get('p99_ms', 0):.0f}ms statuses={result['statuses']}"
+            )
+            if error_share(result):
+                print(
+                    f"WARNING: {error_share(result):.0%} of the requests at concurrency="
+                    f"{concurrency} failed, the latencies only cover the others."
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", help="JSONL file of requests, generated if not given.")
+    parser.add_argument("--count", type=int, default=200, help="Number of generated requests.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--endpoint", default="/collections/generate_text")
+    parser.add_argument("--seed-texts", type=int, default=1_000, help="Stored texts per bucket.")
+    parser.add_argument("--database-url", help="Defaults to a new SQLite database.")
+    parser.add_argument("--cache-backend", default="none", choices=["none", "memory", "redis"])
+    parser.add_argument(
+        "--real-models", action="store_true", help="Use the configured models, not stand-ins."
+    )
+    parser.add_argument(
+        "--admission",
+        action="store_true",
+        help="Apply the per-tenant rate limits, all requests then count against one tenant.",
+    )
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument(
+        "--max-error-share",
+        type=float,
+        default=0.05,
+        help="Exit with an error if a larger share of requests fails at any concurrency level.",
+    )
+    args = parser.parse_args()
+
+    harness.configure(
+        args.database_url,
+        CACHE_BACKEND=args.cache_backend,
+        MODEL_PRELOAD="False",
+        # All requests come from one client, which the rate limits would mostly reject
+        ADMISSION_ENABLED=str(args.admission),
+    )
+    if not args.real_models:
+        from benchmarks.stand_ins import install_stand_in_models
+
+        install_stand_in_models()
+
+    requests = load_requests(args.requests, args.count)
+    results = asyncio.run(run(requests, args.concurrency, args.endpoint, args.seed_texts))
+    if args.json:
+        harness.write_results(
+            args.json,
+            "load_test",
+            results,
+            endpoint=args.endpoint,
+            seed_texts=args.seed_texts,
+            stand_in_models=not args.real_models,
+        )
+    failing = [
+        result["concurrency"] for result in results if error_share(result) > args.max_error_share
+    ]
+    if failing:
+        # Failures return early, so the results would measure the error path
+        sys.exit(
+            f"More than {args.max_error_share:.0%} of the requests failed at concurrency "
+            f"{', '.join(map(str, failing))}, see the status counts."
+        )
+
+
+if __name__ == "__main__":
+    main()
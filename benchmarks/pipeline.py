@@ -0,0 +1,168 @@
+"""
+Micro-benchmarks of the generation pipeline stages.
+
+Measures keyword embedding, FAISS search at several bucket sizes, and reading a bucket from
+the database: the cold sync of a bucket index, the incremental sync when nothing changed, and
+fetching the content of a match. Runs offline with tiny stand-in models and a SQLite database
+by default.
+
+Usage:
+    python -m benchmarks.pipeline --sizes 1000 10000 100000 --json pipeline.json
+        [--database-url postgresql+asyncpg://...] [--real-models]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks import harness
+
+SAMPLE_KEYWORDS = "fresh organic salad for a playful summer menu"
+
+
+def _timed(func, repeats: int) -> list[float]:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def _timed_async(func, repeats: int) -> list[float]:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def benchmark_embed_text(repeats: int) -> dict:
+    from content_assistant.core.generator import embed_text
+
+    latencies = _timed(lambda: embed_text(SAMPLE_KEYWORDS), repeats)
+    return {"stage": "embed_text", **harness.summarize_latencies(latencies)}
+
+
+def benchmark_faiss_search(n_texts: int, repeats: int, seed: int = 0) -> dict:
+    from content_assistant.core.config.settings import get_settings
+    from content_assistant.core.content_generator import (
+        INDEX_DIMENSION,
+        search_similar_texts_in_faiss,
+    )
+    from content_assistant.core.faiss_indexes import FaissIndexFactory
+    from content_assistant.core.index_manager import BucketIndex
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_texts, INDEX_DIMENSION), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    bucket_index = BucketIndex(INDEX_DIMENSION, FaissIndexFactory.from_settings(get_settings()))
+    started = time.perf_counter()
+    bucket_index.add(range(1, n_texts + 1), vectors)
+    build_seconds = time.perf_counter() - started
+
+    queries = vectors[rng.integers(0, n_texts, repeats)]
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search_similar_texts_in_faiss(query, bucket_index, get_settings().retrieval_top_k)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "stage": "faiss_search",
+        "n_texts": n_texts,
+        "index_type": bucket_index.index_type,
+        "build_seconds": build_seconds,
+        **harness.summarize_latencies(latencies),
+    }
+
+
+async def benchmark_bucket_reads(n_texts: int, repeats: int) -> list[dict]:
+    from content_assistant.core.content_generator import (
+        fetch_text_contents,
+        index_manager,
+        sync_bucket_index,
+    )
+    from content_assistant.core.db.database import get_db
+
+    bucket = ("benchmark", f"bucket-{n_texts}", "neutral")
+    await harness.seed_bucket(bucket, n_texts)
+
+    async def cold_sync():
+        # Drop the resident index, so the whole bucket is read again
+        index_manager.clear()
+        async with get_db() as db:
+            await sync_bucket_index(db, bucket)
+
+    async def incremental_sync():
+        async with get_db() as db:
+            await sync_bucket_index(db, bucket)
+
+    async with get_db() as db:
+        bucket_index = await sync_bucket_index(db, bucket)
+    text_ids = list(bucket_index.ids)
+    rng = np.random.default_rng(0)
+
+    async def fetch_content():
+        async with get_db() as db:
+            await fetch_text_contents(db, [text_ids[rng.integers(0, len(text_ids))]])
+
+    results = []
+    for stage, func, stage_repeats in (
+        ("index_sync_cold", cold_sync, max(1, repeats // 10)),
+        ("index_sync_incremental", incremental_sync, repeats),
+        ("fetch_content", fetch_content, repeats),
+    ):
+        latencies = await _timed_async(func, stage_repeats)
+        results.append(
+            {"stage": stage, "n_texts": n_texts, **harness.summarize_latencies(latencies)}
+        )
+    return results
+
+
+async def run(sizes: list[int], repeats: int) -> list[dict]:
+    from content_assistant.core.model_registry import model_registry
+
+    await harness.create_tables()
+    model_registry.load_all(warm_up=True)
+
+    results = [benchmark_embed_text(repeats)]
+    for n_texts in sizes:
+        results.append(benchmark_faiss_search(n_texts, repeats))
+        results.extend(await benchmark_bucket_reads(n_texts, repeats))
+
+    for result in results:
+        size = f"{result['n_texts']:>9}" if "n_texts" in result else " " * 9
+        print(
+            f"{result['stage']:>22} {size} p50={result['p50_ms']:.3f}ms "
+            f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--database-url", help="Defaults to a new SQLite database.")
+    parser.add_argument(
+        "--real-models", action="store_true", help="Use the configured models, not stand-ins."
+    )
+    parser.add_argument("--json", help="Write the results to this file.")
+    args = parser.parse_args()
+
+    harness.configure(args.database_url, MODEL_PRELOAD="False")
+    if not args.real_models:
+        from benchmarks.stand_ins import install_stand_in_models
+
+        install_stand_in_models()
+
+    results = asyncio.run(run(args.sizes, args.repeats))
+    if args.json:
+        harness.write_results(args.json, "pipeline", results, stand_in_models=not args.real_models)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Tiny, randomly initialized stand-ins for the embedding and generation models.
+
+They run the same code paths as the real models (tokenization, padding, pooling, batched
+decoding) without downloading anything, so the benchmarks can run offline and measure the
+pipeline around the models. Their outputs are meaningless, and their latency is far below the
+real models', so compare stand-in results only with other stand-in results.
+"""
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import (
+    BertConfig,
+    BertModel,
+    PreTrainedTokenizerFast,
+    T5Config,
+    T5ForConditionalGeneration,
+    pipeline,
+)
+
+# The stand-in embeddings have the dimension of the FAISS indexes
+EMBEDDING_DIMENSION = 384
+
+SPECIAL_TOKENS = ["<pad>", "</s>", "<unk>"]
+VOCABULARY = """
+a about an and as at audience be business by consumer current domain e-commerce exactly
+for formal from improve informal it keywords long make more of on or playful professional
+salad should target text the to tone unique words write you your
+""".split()
+
+
+def make_tokenizer() -> PreTrainedTokenizerFast:
+    words = SPECIAL_TOKENS + sorted(set(VOCABULARY))
+    tokenizer = Tokenizer(
+        models.WordLevel({word: i for i, word in enumerate(words)}, unk_token="<unk>")
+    )
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    # Special tokens are skipped when decoding
+    tokenizer.add_special_tokens(SPECIAL_TOKENS)
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        pad_token="<pad>",
+        eos_token="</s>",
+        unk_token="<unk>",
+        model_max_length=512,
+        # T5 does not take token type ids, BERT defaults them to zeros
+        model_input_names=["input_ids", "attention_mask"],
+    )
+
+
+def load_embedding_stand_in():
+    torch.manual_seed(0)
+    tokenizer = make_tokenizer()
+    config = BertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=EMBEDDING_DIMENSION,
+        num_hidden_layers=1,
+        num_attention_heads=4,
+        intermediate_size=EMBEDDING_DIMENSION,
+    )
+    return tokenizer, BertModel(config).eval()
+
+
+def load_generation_stand_in():
+    torch.manual_seed(0)
+    tokenizer = make_tokenizer()
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=64,
+        d_kv=16,
+        d_ff=128,
+        num_layers=1,
+        num_decoder_layers=1,
+        num_heads=4,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+        # Untrained, the model mostly decodes padding, which leaves every text empty and equal;
+        # without special tokens it writes words until the length limits of the request stop it
+        suppress_tokens=tokenizer.all_special_ids,
+        no_repeat_ngram_size=2,
+    )
+    model = T5ForConditionalGeneration(config).eval()
+    return pipeline(
+        "text2text-generation", model=model, tokenizer=tokenizer, framework="pt", device=-1
+    )
+
+
+def install_stand_in_models():
+    """Replace the registered models of the app with the stand-ins, before they are loaded."""
+    from content_assistant.core.content_generator import GENERATION_MODEL
+    from content_assistant.core.generator import EMBEDDING_MODEL
+    from content_assistant.core.model_registry import model_registry
+
+    model_registry.register(EMBEDDING_MODEL, load_embedding_stand_in)
+    model_registry.register(GENERATION_MODEL, load_generation_stand_in)
@@ -0,0 +1,157 @@
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from content_assistant.core.exceptions import RateLimitedError, RequestError
+from content_assistant.core.inference import BULK, INTERACTIVE
+from content_assistant.core.metrics import ADMISSION_REJECTIONS
+
+logger = logging.getLogger("content_assistant_app")
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+
+def is_trusted_proxy(host: str, trusted_proxies: list[str]) -> bool:
+    """Whether a peer address is one of the trusted proxies, given as addresses or networks."""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False) for network in trusted_proxies
+    )
+
+
+class TokenBucket:
+    """
+    A budget refilled at `rate` units per second up to `capacity`.
+
+    A request is admitted while the bucket holds its cost, which is then taken; requests
+    costing more than the capacity are never admitted.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = now
+
+    def try_take(self, cost: float, now: float) -> float:
+        """
+        Take `cost` from the bucket if it is admitted.
+
+        Returns:
+            float: 0 if admitted, otherwise the seconds until the request would be.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        cost = max(0.0, cost)
+        if self.level >= cost:
+            self.level -= cost
+            return 0.0
+        return (cost - self.level) / self.rate
+
+    def give_back(self, tokens: float):
+        """Return tokens taken for work that was not done, up to the capacity."""
+        self.level = min(self.capacity, self.level + tokens)
+
+
+class AdmissionController:
+    """
+    Per-tenant rate limits of the generation endpoints, checked before any work is done.
+
+    Each tenant (configured API key, or else client address) has a token bucket per priority
+    class, holding a budget of decode tokens: requests cost the tokens their word count is
+    expected to need, so long texts and bulk calls use up more of it. A request over budget is
+    rejected with RateLimitedError, which carries the seconds until it would be admitted as
+    Retry-After; requests costing more than the whole budget are rejected with RequestError,
+    to be split by the caller. Buckets live in process memory, so each worker enforces the limits on the
+    requests it serves; the least recently seen tenants are forgotten past `max_tenants`.
+    """
+
+    def __init__(
+        self,
+        rates: dict[int, float],
+        capacities: dict[int, float],
+        max_tenants: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rates = rates
+        self.capacities = capacities
+        self.max_tenants = max_tenants
+        self.clock = clock
+        self._buckets: OrderedDict[tuple[str, int], TokenBucket] = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["AdmissionController"]:
+        """Build the admission controller configured in settings, or None if it is disabled."""
+        if not settings.admission_enabled:
+            return None
+        return cls(
+            rates={
+                INTERACTIVE: settings.admission_interactive_tokens_per_second,
+                BULK: settings.admission_bulk_tokens_per_second,
+            },
+            capacities={
+                INTERACTIVE: settings.admission_interactive_burst_tokens,
+                BULK: settings.admission_bulk_burst_tokens,
+            },
+            max_tenants=settings.admission_max_tenants,
+        )
+
+    def admit(self, tenant: str, cost: float, priority: int = INTERACTIVE):
+        """
+        Take the cost of a request from the tenant's budget of its priority class.
+
+        Args:
+            tenant (str): The tenant the request is counted against.
+            cost (float): The estimated decode tokens of the request.
+            priority (int): INTERACTIVE or BULK.
+
+        Raises:
+            RequestError: If the request costs more than the whole budget, so it has to be split.
+            RateLimitedError: If the tenant's budget does not cover the request.
+        """
+        capacity = self.capacities[priority]
+        if cost > capacity:
+            raise RequestError(
+                context={
+                    "reason": f"The request needs an estimated {math.ceil(cost)} tokens, more "
+                    f"than the budget of {math.ceil(capacity)}; split it into smaller ones."
+                }
+            )
+        now = self.clock()
+        key = (tenant, priority)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rates[priority], capacity, now)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_tenants:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+
+        wait_seconds = bucket.try_take(cost, now)
+        if wait_seconds:
+            ADMISSION_REJECTIONS.labels(priority=PRIORITY_NAMES[priority]).inc()
+            logger.info(f"Rate limited a {PRIORITY_NAMES[priority]} request of cost {cost}.")
+            raise RateLimitedError(
+                context={"reason": "The request budget is used up, retry later."},
+                retry_after=max(1, math.ceil(wait_seconds)),
+            )
+
+    def refund(self, tenant: str, cost: float, priority: int = INTERACTIVE):
+        """
+        Give back the cost of admitted work that was not done, e.g. bulk items that failed.
+
+        Args:
+            tenant (str): The tenant the request was counted against.
+            cost (float): The estimated decode tokens of the work not done.
+            priority (int): INTERACTIVE or BULK.
+        """
+        bucket = self._buckets.get((tenant, priority))
+        # Forgotten tenants start over with a full bucket anyway
+        if bucket is not None:
+            bucket.give_back(cost)
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from content_assistant.core.inference import InferenceExecutor
+from content_assistant.core.metrics import GENERATION_BATCH_SIZE, GENERATION_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger("content_assistant_app")
+
+# (max_new_tokens bucket, sorted generation settings) prompts must share to be batched together
+BatchKey = tuple[int, tuple[tuple[str, Any], ...]]
+
+
+@dataclass
+class _PendingBatch:
+    prompts: list[str] = field(default_factory=list)
+    word_counts: list[Optional[int]] = field(default_factory=list)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    enqueued_at: list[float] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class GenerationBatcher:
+    """
+    Groups concurrent generation requests into padded batches.
+
+    Prompts with compatible generation settings are collected for up to `max_wait_ms`, or until
+    `max_batch_size` of them are waiting, and decoded with one `generate_batch` call in the
+    inference executor. `max_new_tokens` is rounded up to a multiple of `token_bucket_size`, so
+    requests of similar length share a batch; the model still stops each sequence at its EOS.
+    Prompts with a target word count pass them on as `word_counts`, one per prompt, so
+    `generate_batch` can stop decoding once the texts are long enough.
+    """
+
+    def __init__(
+        self,
+        generate_batch: Callable[..., list[Any]],
+        executor: InferenceExecutor,
+        max_wait_ms: int,
+        max_batch_size: int,
+        token_bucket_size: int = 64,
+    ):
+        self.generate_batch = generate_batch
+        self.executor = executor
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.token_bucket_size = token_bucket_size
+        self._pending: dict[BatchKey, _PendingBatch] = {}
+
+    def batch_key(self, max_new_tokens: int, generation_kwargs: dict[str, Any]) -> BatchKey:
+        token_bucket = -(-max_new_tokens // self.token_bucket_size) * self.token_bucket_size
+        return token_bucket, tuple(sorted(generation_kwargs.items()))
+
+    async def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int,
+        word_count: Optional[int] = None,
+        **generation_kwargs: Any,
+    ) -> Any:
+        """
+        Generate text for one prompt as part of the next batch with compatible settings.
+
+        Args:
+            prompt (str): The prompt to generate text for.
+            max_new_tokens (int): The decode budget of the prompt.
+            word_count (int, optional): The number of words the text should have.
+            **generation_kwargs: Sampling settings passed on to the model.
+
+        Returns:
+            Any: The result of `generate_batch` for the prompt, e.g. the generated text.
+
+        Raises:
+            ServiceOverloadedError: If the inference queue is full.
+        """
+        if self.max_batch_size <= 1:
+            if word_count is not None:
+                generation_kwargs["word_counts"] = [word_count]
+            results = await self.executor.run(
+                self.generate_batch, [prompt], max_new_tokens=max_new_tokens, **generation_kwargs
+            )
+            return results[0]
+
+        loop = asyncio.get_running_loop()
+        key = self.batch_key(max_new_tokens, generation_kwargs)
+        batch = self._pending.setdefault(key, _PendingBatch())
+        future = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.word_counts.append(word_count)
+        batch.futures.append(future)
+        batch.enqueued_at.append(time.perf_counter())
+
+        if len(batch.prompts) >= self.max_batch_size:
+            self._dispatch(key)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.max_wait_ms / 1000, self._dispatch, key)
+
+        return await future
+
+    def _dispatch(self, key: BatchKey):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        asyncio.ensure_future(self._run_batch(key, batch))
+
+    async def _run_batch(self, key: BatchKey, batch: _PendingBatch):
+        dispatched_at = time.perf_counter()
+        GENERATION_BATCH_SIZE.observe(len(batch.prompts))
+        for enqueued_at in batch.enqueued_at:
+            GENERATION_QUEUE_WAIT_SECONDS.observe(dispatched_at - enqueued_at)
+
+        max_new_tokens, frozen_kwargs = key
+        generation_kwargs: dict[str, Any] = dict(frozen_kwargs)
+        if any(word_count is not None for word_count in batch.word_counts):
+            # Prompts without a target are stopped by max_new_tokens alone
+            generation_kwargs["word_counts"] = [
+                max_new_tokens if word_count is None else word_count
+                for word_count in batch.word_counts
+            ]
+        try:
+            results = await self.executor.run(
+                self.generate_batch,
+                batch.prompts,
+                max_new_tokens=max_new_tokens,
+                **generation_kwargs,
+            )
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"Generated a batch of {len(batch.prompts)} prompts in {key}.")
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,217 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.content_generator import (
+    GENERATION_SAMPLING_KWARGS,
+    PGVECTOR_BACKEND,
+    calibrate_length_estimate,
+    fetch_text_contents,
+    index_manager,
+    inference_executor,
+    insert_texts,
+    max_new_tokens_for,
+    prepare_prompt,
+    relevant_matches,
+    run_generation_batch,
+    search_similar_texts_in_faiss,
+    search_similar_texts_in_pgvector,
+    select_retrieved_texts,
+    sync_bucket_index,
+)
+from content_assistant.core.db.database import get_db
+from content_assistant.core.generator import embed_texts
+from content_assistant.core.index_manager import BucketIndex, BucketKey
+from content_assistant.core.inference import BULK
+from content_assistant.core.models import content_hash
+from content_assistant.schemas import TextGenerationRequest
+
+logger = logging.getLogger("content_assistant_app")
+
+settings = get_settings()
+
+
+@dataclass
+class BulkGenerationResult:
+    # Position of the request in the submitted list
+    index: int
+    generated_text: Optional[str] = None
+    error: Optional[str] = None
+
+
+async def generate_texts_in_bulk(
+    requests: list[TextGenerationRequest], chunk_size: Optional[int] = None, max_retries: int = 5
+) -> AsyncIterator[BulkGenerationResult]:
+    """
+    Generate texts for many requests, sharing work between requests of the same bucket.
+
+    Requests are grouped by (domain, audience, tone), so each bucket's index is synchronized
+    with the database once.
+    Within a bucket, requests are processed in chunks of similar word count: keywords are
+    embedded and texts generated with one batched model call per chunk, and the new texts are
+    written with one bulk insert per chunk. Texts the database rejects as already existing in
+    the bucket are regenerated up to `max_retries` times. Model calls run in the BULK priority
+    class, so interactive requests are served first.
+
+    Args:
+        requests (list[TextGenerationRequest]): The generation requests.
+        chunk_size (int, optional): The number of requests processed together.
+        max_retries (int): The number of attempts to generate a unique text per request.
+
+    Yields:
+        BulkGenerationResult: The plain generated text or the error of each request, in the
+            order the chunks complete.
+    """
+    chunk_size = chunk_size or settings.bulk_chunk_size
+
+    buckets: dict[BucketKey, list[int]] = defaultdict(list)
+    for position, request in enumerate(requests):
+        if not " ".join(request.keywords).strip():
+            yield BulkGenerationResult(position, error="Keywords cannot be empty.")
+            continue
+        buckets[(request.domain, request.audience, request.tone)].append(position)
+
+    for bucket, positions in buckets.items():
+        domain, audience, tone = bucket
+        bucket_index = None
+        try:
+            # The pgvector backend searches in the database and needs no index
+            if settings.retrieval_backend != PGVECTOR_BACKEND:
+                async with get_db() as db:
+                    bucket_index = await sync_bucket_index(db, bucket, priority=BULK)
+            async with get_db() as db:
+                await calibrate_length_estimate(db, domain, priority=BULK)
+        except Exception as e:
+            logger.error(f"Error fetching texts of bucket {bucket}: {str(e)}")
+            for position in positions:
+                yield BulkGenerationResult(position, error="Database query failed.")
+            continue
+
+        # Similar lengths share a chunk, so its decode budget fits all of its requests
+        positions.sort(key=lambda position: requests[position].word_count)
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start : start + chunk_size]
+            try:
+                results = await _generate_chunk(
+                    [requests[position] for position in chunk], bucket, bucket_index, max_retries
+                )
+            except Exception as e:
+                logger.error(f"Error generating a chunk of bucket {bucket}: {str(e)}")
+                results = [None] * len(chunk)
+                error = "Text generation failed."
+            else:
+                error = f"Failed to generate a unique text after {max_retries} attempts."
+
+            for position, generated_text in zip(chunk, results):
+                if generated_text is None:
+                    yield BulkGenerationResult(position, error=error)
+                else:
+                    yield BulkGenerationResult(position, generated_text=generated_text)
+
+
+async def _generate_chunk(
+    chunk: list[TextGenerationRequest],
+    bucket: BucketKey,
+    bucket_index: Optional[BucketIndex],
+    max_retries: int,
+) -> list[Optional[str]]:
+    domain, audience, tone = bucket
+
+    query_embeddings = await inference_executor.run_with_priority(
+        BULK, embed_texts, [" ".join(request.keywords).strip() for request in chunk]
+    )
+
+    candidates: list[list[tuple[str, float]]]
+    if settings.retrieval_backend == PGVECTOR_BACKEND:
+        async with get_db() as db:
+            candidates = [
+                await search_similar_texts_in_pgvector(
+                    db, query_embedding, bucket, k=settings.retrieval_top_k
+                )
+                for query_embedding in query_embeddings
+            ]
+    else:
+        # Synchronized by generate_texts_in_bulk for the FAISS backend
+        assert bucket_index is not None
+        searched_index = bucket_index
+
+        def search_chunk() -> list[list[tuple[int, float]]]:
+            return [
+                relevant_matches(
+                    search_similar_texts_in_faiss(
+                        query_embedding, searched_index, settings.retrieval_top_k
+                    ),
+                    bucket,
+                )
+                for query_embedding in query_embeddings
+            ]
+
+        matches = await inference_executor.run_with_priority(BULK, search_chunk)
+        # One query for the contents of all matches of the chunk
+        async with get_db() as db:
+            contents = await fetch_text_contents(
+                db, [text_id for request_matches in matches for text_id, _ in request_matches]
+            )
+        candidates = [
+            [
+                (contents[text_id], score)
+                for text_id, score in request_matches
+                if text_id in contents
+            ]
+            for request_matches in matches
+        ]
+    retrieved_texts = [
+        select_retrieved_texts(request.keywords, request_candidates, bucket)
+        for request, request_candidates in zip(chunk, candidates)
+    ]
+
+    max_new_tokens = max(max_new_tokens_for(request.word_count, domain) for request in chunk)
+    results: list[Optional[str]] = [None] * len(chunk)
+    pending = list(range(len(chunk)))
+    for _ in range(max_retries):
+        if not pending:
+            break
+        prompts = [
+            prepare_prompt(
+                chunk[i].keywords, domain, chunk[i].word_count, audience, tone, retrieved_texts[i]
+            )
+            for i in pending
+        ]
+        generated_texts = await inference_executor.run_with_priority(
+            BULK,
+            run_generation_batch,
+            prompts,
+            max_new_tokens=max_new_tokens,
+            word_counts=[chunk[i].word_count for i in pending],
+            **GENERATION_SAMPLING_KWARGS,
+        )
+
+        # Texts the bucket already contains are not inserted and get generated again
+        inserted = await _save_texts(generated_texts, bucket)
+        duplicates = []
+        for i, generated_text in zip(pending, generated_texts):
+            if inserted.pop(content_hash(generated_text), None) is not None:
+                results[i] = generated_text
+            else:
+                duplicates.append(i)
+        pending = duplicates
+
+    return results
+
+
+async def _save_texts(texts: list[str], bucket: BucketKey) -> dict[str, int]:
+    embeddings = await inference_executor.run_with_priority(BULK, embed_texts, texts)
+    async with get_db() as db:
+        inserted = await insert_texts(db, bucket, texts, embeddings)
+        await db.commit()
+
+    positions = {content_hash(text): position for position, text in enumerate(texts)}
+    index_manager.add(
+        bucket,
+        inserted.values(),
+        embeddings[[positions[text_hash] for text_hash in inserted]],
+    )
+    logger.info(f"Saved {len(inserted)} generated texts of bucket {bucket} to database.")
+    return inserted
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from content_assistant.core.index_manager import BucketKey
+
+logger = logging.getLogger("content_assistant_app")
+
+
+class CacheBackend(ABC):
+    """Storage of the exact-match response cache tier."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str): ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """A per-process LRU cache with a TTL, bounded to `max_entries`."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    A cache shared by all replicas, stored in Redis with a TTL.
+
+    Size is bounded by the Redis `maxmemory` policy rather than by the application.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "content_assistant:response:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend requires the `redis` package.") from e
+        self.client = redis_asyncio.from_url(url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str):
+        await self.client.set(self.prefix + key, value, ex=self.ttl_seconds)
+
+
+class SemanticCache:
+    """
+    Recent generations of this process, looked up by query embedding similarity.
+
+    A generation is reused for a request of the same bucket and word count whose query
+    embedding has a cosine similarity of at least `threshold` with the cached one. Embeddings
+    are L2-normalized, so the inner product is the cosine similarity.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, tuple, np.ndarray, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket: BucketKey, word_count: int, query_embedding: np.ndarray) -> Optional[str]:
+        now = time.monotonic()
+        best_score, best_value = self.threshold, None
+        with self._lock:
+            for key, (expires_at, scope, embedding, value) in list(self._entries.items()):
+                if expires_at < now:
+                    del self._entries[key]
+                elif scope == (bucket, word_count):
+                    score = float(np.dot(embedding, query_embedding))
+                    if score >= best_score:
+                        best_score, best_value = score, value
+        return best_value
+
+    def set(
+        self, key: str, bucket: BucketKey, word_count: int, query_embedding: np.ndarray, value: str
+    ):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[key] = (expires_at, (bucket, word_count), query_embedding, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of generated texts in front of the generation pipeline.
+
+    The exact tier is keyed on the request with normalized keywords and stored in a pluggable
+    backend, so replicas can share it. The optional semantic tier reuses a recent generation of
+    this process for a request with a near-identical query embedding. Backend failures are
+    logged and treated as cache misses, the cache never fails a request.
+    """
+
+    def __init__(self, backend: CacheBackend, semantic_cache: Optional[SemanticCache] = None):
+        self.backend = backend
+        self.semantic_cache = semantic_cache
+
+    @staticmethod
+    def make_key(
+        keywords: list[str], domain: str, word_count: int, audience: str, tone: str
+    ) -> str:
+        # Buckets are case-sensitive in the database, only the keywords are normalized
+        normalized = {
+            "keywords": sorted(keyword.strip().lower() for keyword in keywords if keyword.strip()),
+            "domain": domain,
+            "word_count": word_count,
+            "audience": audience,
+            "tone": tone,
+        }
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+    async def get_exact(self, key: str) -> Optional[str]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {str(e)}")
+            return None
+
+    def get_similar(
+        self, bucket: BucketKey, word_count: int, query_embedding: np.ndarray
+    ) -> Optional[str]:
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.get(bucket, word_count, query_embedding)
+
+    async def set(
+        self,
+        key: str,
+        bucket: BucketKey,
+        word_count: int,
+        query_embedding: np.ndarray,
+        value: str,
+    ):
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(key, bucket, word_count, query_embedding, value)
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Response cache update failed: {str(e)}")
+
+
+def create_response_cache(settings) -> Optional[ResponseCache]:
+    """Build the response cache configured in settings, or None if caching is disabled."""
+    backend: CacheBackend
+    if settings.cache_backend == "none":
+        return None
+    elif settings.cache_backend == "memory":
+        backend = InMemoryCacheBackend(settings.cache_max_entries, settings.cache_ttl_seconds)
+    elif settings.cache_backend == "redis":
+        backend = RedisCacheBackend(settings.cache_redis_url, settings.cache_ttl_seconds)
+    else:
+        raise ValueError(f"Unknown cache backend: {settings.cache_backend}.")
+
+    semantic_cache = None
+    if settings.semantic_cache_enabled:
+        semantic_cache = SemanticCache(
+            settings.semantic_cache_threshold,
+            settings.semantic_cache_max_entries,
+            settings.cache_ttl_seconds,
+        )
+    return ResponseCache(backend, semantic_cache)
@@ -1,4 +1,6 @@
 from functools import lru_cache
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,8 +15,142 @@ class Settings(BaseSettings):
     uvicorn_host: str
     uvicorn_port: int
     environment: str
+    # Models, loaded from the Hugging Face hub, a local path, or only from model_cache_dir and
+    # local paths with model_offline
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    generation_model: str = "google/flan-t5-base"
+    model_cache_dir: Optional[str] = None
+    model_offline: bool = False
+    # Inference backend of each model: pytorch, quantized (dynamic int8) or onnx (ONNX Runtime,
+    # exported graphs are kept in onnx_export_dir)
+    embedding_inference_backend: str = "pytorch"
+    generation_inference_backend: str = "pytorch"
+    onnx_export_dir: Optional[str] = None
+    # Load (and warm up) the models when the app starts instead of on first use; the replica
+    # reports ready on /health/ready once they are loaded
+    model_preload: bool = True
+    model_warm_up: bool = True
+    # Intra-op threads of each worker when serving with gunicorn.conf.py
+    torch_num_threads: int = 1
+    # Similar texts are searched in resident FAISS indexes ("faiss") or in PostgreSQL with
+    # pgvector ("pgvector"), which requires the extension and the embedding_vector migration
+    retrieval_backend: str = "faiss"
+    pgvector_ef_search: int = 64
+    # Buckets of up to pgvector_exact_scan_max_texts texts are ranked exactly instead of by the
+    # HNSW index shared by all buckets. Larger buckets use iterative index scans, which need
+    # pgvector >= 0.8 (set pgvector_iterative_scan=False for older versions) and stop after
+    # pgvector_max_scan_tuples rows
+    pgvector_exact_scan_max_texts: int = 10000
+    pgvector_iterative_scan: bool = True
+    pgvector_max_scan_tuples: int = 20000
+    # The retrieval_top_k texts most similar to the keywords are reranked by their similarity
+    # blended with their keyword overlap (retrieval_lexical_weight, 0 for similarity only), and
+    # up to retrieval_snippets of them with a relevance of at least the bucket's threshold are
+    # improved upon instead of writing a new text. Thresholds override the default per
+    # "domain:audience:tone" or "domain", e.g. RETRIEVAL_BUCKET_THRESHOLDS='{"legal": 0.7}'
+    retrieval_top_k: int = 5
+    retrieval_snippets: int = 1
+    retrieval_lexical_weight: float = 0.3
+    retrieval_similarity_threshold: float = 0.8
+    retrieval_bucket_thresholds: dict[str, float] = {}
+    # Connection pool of each replica, holding up to db_pool_size + db_max_overflow connections
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: float = 30
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced, -1 never
+    # Prepared statements cached per asyncpg connection, 0 when running behind PgBouncer
+    db_statement_cache_size: int = 100
+    # Rows per chunk when streaming a bucket's embeddings from the database
+    db_stream_chunk_size: int = 1_000
+    # Memory budget of the resident per-bucket FAISS indexes before cold buckets are evicted
+    faiss_index_memory_budget_mb: int = 256
+    # Similarity index: flat, ivf_flat, hnsw, ivf_pq, or auto to switch from flat to
+    # faiss_ann_index_type once a bucket holds faiss_ann_threshold texts
+    faiss_index_type: str = "auto"
+    faiss_ann_index_type: str = "hnsw"
+    faiss_ann_threshold: int = 50_000
+    faiss_ivf_nlist: int = 0  # 0 derives the number of IVF lists from the bucket size
+    faiss_ivf_nprobe: int = 16
+    faiss_hnsw_m: int = 32
+    faiss_hnsw_ef_construction: int = 80
+    faiss_hnsw_ef_search: int = 64
+    faiss_pq_m: int = 48
+    # Directory of the per-bucket index snapshots written by core.db.snapshot_indexes, read
+    # when a bucket is loaded; memory-mapped where FAISS supports it unless disabled
+    faiss_snapshot_dir: Optional[str] = None
+    faiss_snapshot_mmap: bool = True
+    # Threads running model inference and calls allowed to wait for one before returning 503
+    inference_workers: int = 1
+    inference_queue_size: int = 8
+    # Concurrent generation requests are batched for up to this long or this many prompts;
+    # max_new_tokens is rounded up to a multiple of the token bucket size to batch them together
+    generation_batch_wait_ms: int = 10
+    generation_max_batch_size: int = 8
+    generation_token_bucket_size: int = 64
+    # Generation stops once a text has its word count and ends a sentence, or has
+    # generation_length_tolerance more words. The decode budget is derived from the tokens per
+    # word of the domain's latest generation_calibration_samples stored texts (0 disables
+    # calibration), re-sampled every generation_calibration_ttl_seconds
+    generation_length_tolerance: float = 0.2
+    generation_tokens_per_word: float = 1.5
+    generation_calibration_samples: int = 200
+    generation_calibration_ttl_seconds: int = 3600
+    # Texts sampled per prompt with one model call; a duplicate is replaced by the next one
+    # instead of generating again
+    generation_candidates: int = 1
+    # Identical generate_text requests in flight share one pipeline run, which saves up to
+    # generation_coalesced_texts distinct texts to hand out to them in turn
+    generation_coalescing_enabled: bool = True
+    generation_coalesced_texts: int = 1
+    # Save generated texts in the background after responding, in batches of up to
+    # write_behind_batch_size texts collected for write_behind_wait_ms. Requests wait while
+    # write_behind_queue_size texts are queued; shutdown waits write_behind_drain_seconds
+    write_behind_enabled: bool = True
+    write_behind_batch_size: int = 32
+    write_behind_wait_ms: int = 50
+    write_behind_queue_size: int = 1_000
+    write_behind_drain_seconds: float = 30
+    # Bulk generation: requests accepted per call and processed together per bucket
+    bulk_max_items: int = 50_000
+    bulk_chunk_size: int = 32
+    # Per-tenant budgets of decode tokens (estimated from word_count), refilled per second up
+    # to the burst size, for interactive and bulk requests; tenants are identified by the
+    # admission_tenant_header (an API key) or the client address, over budget they get a 429
+    admission_enabled: bool = True
+    admission_tenant_header: str = "X-API-Key"
+    # API keys counted as their own tenant, e.g. ADMISSION_API_KEYS='["key-a"]'; requests with
+    # other keys are counted against their client address
+    admission_api_keys: list[str] = []
+    # Peers (addresses or networks) whose X-Real-IP header is taken as the client address,
+    # e.g. ADMISSION_TRUSTED_PROXIES='["172.16.0.0/12"]' for nginx; others are counted by
+    # their own address
+    admission_trusted_proxies: list[str] = []
+    admission_interactive_tokens_per_second: float = 50
+    admission_interactive_burst_tokens: float = 2_000
+    admission_bulk_tokens_per_second: float = 50
+    admission_bulk_burst_tokens: float = 20_000
+    admission_max_tenants: int = 10_000
+    # Response cache: "memory" (per process), "redis" (shared by replicas) or "none"
+    cache_backend: str = "memory"
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_ttl_seconds: int = 3600
+    cache_max_entries: int = 10_000
+    # Reuse a recent generation of this process for a query with at least this cosine similarity
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_max_entries: int = 1_000
+
+    # Compress generate_text responses of at least this size with brotli (with the optional
+    # brotli package) or gzip when the client accepts it
+    response_compression_enabled: bool = True
+    response_compression_min_bytes: int = 1024
+
+    # Add a Server-Timing header with the duration of each request stage to responses
+    server_timing_enabled: bool = False
 
-    model_config = SettingsConfigDict(env_file=".env")
+    # The model_* fields are ours, only pydantic's own settings_ namespace is protected
+    model_config = SettingsConfigDict(env_file=".env", protected_namespaces=("settings_",))
 
 
 @lru_cache(maxsize=1)
@@ -1,95 +1,634 @@
 import numpy as np
-import faiss
-from transformers import pipeline
+from transformers import AutoTokenizer, StoppingCriteriaList, pipeline
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import Float, case, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from content_assistant.core.generator import embed_text
-from content_assistant.core.models import TextEntry
+from content_assistant.core.generator import (
+    embed_text,
+    embed_texts,
+    embedding_from_bytes,
+    embedding_to_bytes,
+)
+from content_assistant.core.batching import GenerationBatcher
+from content_assistant.core.cache import ResponseCache, create_response_cache
+from content_assistant.core.metrics import (
+    FAISS_INDEX_BUCKETS,
+    FAISS_INDEX_MEMORY_BYTES,
+    GENERATED_TOKENS,
+    GENERATION_ATTEMPTS,
+    GENERATION_TOKENS_PER_SECOND,
+    INFERENCE_IN_FLIGHT,
+    INFERENCE_QUEUED,
+    RESPONSE_CACHE_HITS,
+    RETRIEVED_TEXTS,
+    SEARCHED_INDEX_SIZE,
+    WRITE_BEHIND_QUEUED,
+    set_gauge_function,
+    time_stage,
+)
+from content_assistant.core.single_flight import SingleFlight
+from content_assistant.core.streaming import AsyncTextStreamer
+from content_assistant.core.exceptions import ServiceOverloadedError
+from content_assistant.core.faiss_indexes import FaissIndexFactory
+from content_assistant.core.index_manager import BucketIndex, BucketKey, FaissIndexManager
+from content_assistant.core.index_snapshots import IndexSnapshotStore
+from content_assistant.core.inference import BULK, INTERACTIVE, InferenceExecutor
+from content_assistant.core.inference_backends import load_model
+from content_assistant.core.length_control import TokensPerWordEstimator, WordCountStoppingCriteria
+from content_assistant.core.model_registry import model_registry, pretrained_kwargs
+from content_assistant.core.models import TextEntry, content_hash
+from content_assistant.core.reranking import max_relevance, rerank, similarity_threshold_for
+from content_assistant.core.config.settings import get_settings
+import asyncio
 import logging
 import random
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Optional
 from content_assistant.core.db.database import get_db
+from content_assistant.core.write_behind import PendingText, WriteBehindWriter
 
 logger = logging.getLogger("content_assistant_app")
 
-# FAISS index initialization for vector similarity search
+settings = get_settings()
+
+# Where similar texts are searched: resident FAISS indexes or the texts table itself
+FAISS_BACKEND = "faiss"
+PGVECTOR_BACKEND = "pgvector"
+if settings.retrieval_backend not in (FAISS_BACKEND, PGVECTOR_BACKEND):
+    raise ValueError(f"Unknown retrieval backend: {settings.retrieval_backend}.")
+
+# Resident per-bucket FAISS indexes for vector similarity search
 INDEX_DIMENSION = 384
-index = faiss.IndexFlatIP(INDEX_DIMENSION)
+index_factory = FaissIndexFactory.from_settings(settings)
+# Buckets are loaded from their snapshot, written by core.db.snapshot_indexes, when configured
+snapshot_store = (
+    IndexSnapshotStore(
+        settings.faiss_snapshot_dir,
+        INDEX_DIMENSION,
+        index_factory,
+        mmap=settings.faiss_snapshot_mmap,
+    )
+    if settings.faiss_snapshot_dir
+    else None
+)
+index_manager = FaissIndexManager(
+    INDEX_DIMENSION,
+    memory_budget_bytes=settings.faiss_index_memory_budget_mb * 1024 * 1024,
+    index_factory=index_factory,
+    load_snapshot=snapshot_store.load if snapshot_store is not None else None,
+)
+
+GENERATION_MODEL = "generation"
+
+
+def load_generator():
+    """Load the text generation pipeline, see ModelRegistry."""
+    kwargs = pretrained_kwargs(settings)
+    return pipeline(
+        "text2text-generation",
+        model=load_model(
+            "generation",
+            settings.generation_model,
+            backend=settings.generation_inference_backend,
+            onnx_export_dir=settings.onnx_export_dir,
+            **kwargs,
+        ),
+        tokenizer=AutoTokenizer.from_pretrained(settings.generation_model, **kwargs),
+        framework="pt",
+        device=-1,
+    )
+
+
+def get_generator():
+    return model_registry.get(GENERATION_MODEL)
+
+
+model_registry.register(
+    GENERATION_MODEL,
+    load_generator,
+    warm_up=lambda generator: generator(["warm up"], max_new_tokens=4),
+)
+
+
+# Cache of generated texts in front of generate_text, None when disabled
+response_cache = create_response_cache(settings)
+
+# Model calls are blocking, they run here instead of on the event loop
+inference_executor = InferenceExecutor(
+    max_workers=settings.inference_workers, max_queue_size=settings.inference_queue_size
+)
+set_gauge_function(INFERENCE_IN_FLIGHT, lambda: inference_executor.in_flight)
+set_gauge_function(INFERENCE_QUEUED, lambda: inference_executor.queued)
+set_gauge_function(FAISS_INDEX_MEMORY_BYTES, lambda: index_manager.memory_bytes)
+set_gauge_function(FAISS_INDEX_BUCKETS, lambda: len(index_manager))
+
+
+# Decode budgets, from the tokens per word of each domain's stored texts
+length_estimator = TokensPerWordEstimator(
+    default_tokens_per_word=settings.generation_tokens_per_word,
+    tolerance=settings.generation_length_tolerance,
+    refresh_seconds=settings.generation_calibration_ttl_seconds,
+)
+
+
+def run_generation_candidates(
+    prompts: list[str],
+    word_counts: Optional[list[int]] = None,
+    num_return_sequences: int = 1,
+    **generation_kwargs,
+) -> list[list[str]]:
+    """
+    Generate candidate texts for a batch of prompts with one padded model call.
+
+    Args:
+        prompts (list[str]): The prompts to generate texts for.
+        word_counts (list[int], optional): The number of words of each prompt's text; decoding
+            stops once every text has it, see WordCountStoppingCriteria.
+        num_return_sequences (int): The number of candidates sampled per prompt.
+        **generation_kwargs: Generation settings passed on to the pipeline.
+
+    Returns:
+        list[list[str]]: The generated candidates of each prompt, in the order of `prompts`.
+    """
+    generator = get_generator()
+    if word_counts is not None:
+        generation_kwargs["stopping_criteria"] = StoppingCriteriaList(
+            [
+                WordCountStoppingCriteria(
+                    generator.tokenizer,
+                    word_counts,
+                    tolerance=settings.generation_length_tolerance,
+                    num_return_sequences=num_return_sequences,
+                )
+            ]
+        )
+    started = time.perf_counter()
+    response = generator(
+        prompts,
+        batch_size=len(prompts),
+        num_return_sequences=num_return_sequences,
+        **generation_kwargs,
+    )
+    elapsed = time.perf_counter() - started
+    candidates = [
+        [
+            candidate["generated_text"]
+            for candidate in (result if isinstance(result, list) else [result])
+        ]
+        for result in response
+    ]
 
-generator = pipeline("text2text-generation", model="google/flan-t5-base", device=-1)
+    generated_texts = [text for texts in candidates for text in texts]
+    token_counts = [len(input_ids) for input_ids in generator.tokenizer(generated_texts).input_ids]
+    for token_count in token_counts:
+        GENERATED_TOKENS.observe(token_count)
+    if elapsed > 0:
+        GENERATION_TOKENS_PER_SECOND.observe(sum(token_counts) / elapsed)
+    return candidates
 
 
-async def fetch_similar_texts_from_db(db: AsyncSession, domain: str, audience: str, tone: str):
+def run_generation_batch(prompts: list[str], **generation_kwargs) -> list[str]:
     """
-    Fetch similar texts from the database based on the given domain, audience, and tone.
+    Generate one text per prompt for a batch of prompts, see run_generation_candidates.
+
+    Returns:
+        list[str]: The generated texts, in the order of `prompts`.
+    """
+    return [texts[0] for texts in run_generation_candidates(prompts, **generation_kwargs)]
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """Count the tokens the generation model needs for each text, without special tokens."""
+    tokenizer = get_generator().tokenizer
+    return [len(input_ids) for input_ids in tokenizer(texts, add_special_tokens=False).input_ids]
+
+
+async def calibrate_length_estimate(db: AsyncSession, domain: str, priority: int = INTERACTIVE):
+    """
+    Calibrate the tokens per word of a domain from its latest stored texts, unless it is recent.
+
+    Calibration is an optimization: if it fails, the previous or default estimate is used. The
+    transaction is ended before returning.
+
+    Args:
+        db (AsyncSession): The database session of the request.
+        domain (str): The domain of the texts to generate.
+        priority (int): The inference priority class of the request, INTERACTIVE or BULK.
+    """
+    if not settings.generation_calibration_samples or not length_estimator.needs_calibration(
+        domain
+    ):
+        return
+    try:
+        result = await db.execute(
+            select(TextEntry.content)
+            .where(TextEntry.domain == domain)
+            .order_by(TextEntry.id.desc())
+            .limit(settings.generation_calibration_samples)
+        )
+        contents = result.scalars().all()
+        await db.rollback()
+        token_counts = (
+            await inference_executor.run_with_priority(priority, count_tokens, contents)
+            if contents
+            else []
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Error calibrating the tokens per word of {domain}: {str(e)}")
+        return
+
+    length_estimator.calibrate(domain, token_counts, [len(text.split()) for text in contents])
+    logger.debug(f"Tokens per word of {domain}: {length_estimator.tokens_per_word(domain):.2f}.")
+
+
+# Sampling settings to avoid repetitive outputs
+GENERATION_SAMPLING_KWARGS = {
+    "temperature": 0.7,  # Controls randomness. Higher values generate more random text
+    "top_p": 0.9,  # Controls nucleus sampling. Adjust for more focused output
+    "do_sample": True,  # Enables sampling for more diverse outputs
+}
+
+
+def max_new_tokens_for(word_count: int, domain: Optional[str] = None) -> int:
+    # Adjust for the calibrated word length of the domain
+    return length_estimator.max_new_tokens(word_count, domain)
+
+
+def stream_generation(
+    prompt: str, word_count: Optional[int] = None, **generation_kwargs
+) -> AsyncIterator[str]:
+    """
+    Generate text for a prompt, yielding decoded chunks as soon as the model produces them.
+
+    Generation is admitted to the inference queue before this returns, so a full queue is
+    raised before the first chunk is sent.
+
+    Args:
+        prompt (str): The prompt to generate text for.
+        word_count (int, optional): The number of words of the text, see
+            WordCountStoppingCriteria.
+        **generation_kwargs: Generation settings passed on to the model.
+
+    Returns:
+        AsyncIterator[str]: The chunks of generated text, raising RuntimeError if text
+            generation fails.
+
+    Raises:
+        ServiceOverloadedError: If the inference queue is full.
+    """
+    generator = get_generator()
+    streamer = AsyncTextStreamer(generator.tokenizer, skip_special_tokens=True)
+    stopping_criteria = StoppingCriteriaList([streamer.stopping_criteria()])
+    if word_count is not None:
+        stopping_criteria.append(
+            WordCountStoppingCriteria(
+                generator.tokenizer, [word_count], tolerance=settings.generation_length_tolerance
+            )
+        )
+
+    def generate():
+        # Tokenized in the inference thread, the tokenizer must not be used by two threads at once
+        inputs = generator.tokenizer(prompt, return_tensors="pt", truncation=True)
+        return generator.model.generate(
+            **inputs, streamer=streamer, stopping_criteria=stopping_criteria, **generation_kwargs
+        )
+
+    generation = inference_executor.submit(INTERACTIVE, generate)
+    # Stop iterating if generation fails before finishing the stream
+    generation.add_done_callback(lambda _: streamer.close())
+
+    async def chunks() -> AsyncIterator[str]:
+        try:
+            async for chunk in streamer:
+                yield chunk
+            await generation
+        except Exception as e:
+            logger.error(f"Error during streamed text generation: {str(e)}")
+            raise RuntimeError("Text generation failed.") from e
+        finally:
+            # The client went away or iteration failed, do not keep decoding for nobody
+            streamer.cancel()
+
+    return chunks()
+
+
+# Identical generate_text calls in flight, keyed on the normalized request
+generation_flights = SingleFlight()
+
+generation_batcher = GenerationBatcher(
+    run_generation_candidates,
+    inference_executor,
+    max_wait_ms=settings.generation_batch_wait_ms,
+    max_batch_size=settings.generation_max_batch_size,
+    token_bucket_size=settings.generation_token_bucket_size,
+)
+
+
+async def sync_bucket_index(
+    db: AsyncSession, bucket: BucketKey, priority: int = INTERACTIVE
+) -> BucketIndex:
+    """
+    Bring the bucket's resident FAISS index up to date with the texts stored in the database.
+
+    A bucket that is not resident starts from its snapshot if there is one, so only the texts
+    stored since are read, see read_new_texts_into_index.
 
     Args:
         db (AsyncSession): The database session for async operations.
-        domain (str): The domain of the text (e.g., e-commerce, advertising).
-        audience (str): The target audience for the text (e.g., consumer, business).
-        tone (str): The tone of the text (e.g., informal, formal).
+        bucket (BucketKey): The (domain, audience, tone) bucket to synchronize.
+        priority (int): The inference priority class of the request, INTERACTIVE or BULK.
 
     Returns:
-        list: A list of TextEntry objects matching the criteria.
+        BucketIndex: The resident index of the bucket.
+
+    Raises:
+        RuntimeError: If the database query or a FAISS index operation fails.
+        ServiceOverloadedError: If the priority is INTERACTIVE and the inference queue is full.
+    """
+    bucket_index = index_manager.get(bucket)
+    if bucket_index is None:
+        if snapshot_store is not None:
+            # Snapshots are read from disk, keep that off the event loop
+            bucket_index = await inference_executor.run_with_priority(
+                priority, index_manager.get_or_create, bucket
+            )
+        else:
+            bucket_index = index_manager.get_or_create(bucket)
+    await read_new_texts_into_index(db, bucket, bucket_index, priority)
+    index_manager.evict()
+    return bucket_index
+
+
+async def read_new_texts_into_index(
+    db: AsyncSession, bucket: BucketKey, bucket_index: BucketIndex, priority: int = INTERACTIVE
+):
+    """
+    Add the texts of a bucket stored after the index's `synced_id` to the index.
+
+    Only the id and embedding of these texts are selected, and they are streamed through a
+    server-side cursor in chunks of `db_stream_chunk_size` rows, so neither ORM objects nor the
+    whole bucket are held in memory. A text committed by another replica with an id below one
+    already read is only picked up once the bucket is rebuilt.
+
+    Args:
+        db (AsyncSession): The database session for async operations.
+        bucket (BucketKey): The (domain, audience, tone) bucket of the index.
+        bucket_index (BucketIndex): The index to add the texts to.
+        priority (int): The inference priority class of the request, INTERACTIVE or BULK.
+
+    Raises:
+        RuntimeError: If the database query or a FAISS index operation fails.
+        ServiceOverloadedError: If the priority is INTERACTIVE and the inference queue is full.
+    """
+    domain, audience, tone = bucket
+    query = (
+        select(
+            TextEntry.id,
+            TextEntry.embedding,
+            # Contents are only needed to embed rows that have no stored embedding
+            case((TextEntry.embedding.is_(None), TextEntry.content)).label("content"),
+        )
+        .where(
+            TextEntry.domain == domain,
+            TextEntry.audience == audience,
+            TextEntry.tone == tone,
+            TextEntry.id > bucket_index.synced_id,
+        )
+        .order_by(TextEntry.id)
+        .execution_options(yield_per=settings.db_stream_chunk_size)
+    )
+    try:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            await inference_executor.run_with_priority(
+                priority, add_text_rows_to_index, bucket_index, rows
+            )
+            bucket_index.mark_synced(rows[-1].id)
+    except ServiceOverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Error synchronizing the FAISS index of {bucket}: {str(e)}")
+        raise RuntimeError("Database query failed.") from e
+
+
+async def fetch_text_contents(db: AsyncSession, text_ids) -> dict[int, str]:
+    """
+    Fetch the contents of stored texts.
+
+    Args:
+        db (AsyncSession): The database session for async operations.
+        text_ids (Iterable[int]): The TextEntry ids to fetch.
+
+    Returns:
+        dict[int, str]: The content of every found text, by TextEntry id.
 
     Raises:
         RuntimeError: If the database query fails.
     """
+    text_ids = set(text_ids)
+    if not text_ids:
+        return {}
     try:
         result = await db.execute(
-            select(TextEntry).where(
-                TextEntry.domain == domain, TextEntry.audience == audience, TextEntry.tone == tone
-            )
+            select(TextEntry.id, TextEntry.content).where(TextEntry.id.in_(text_ids))
         )
-        return result.scalars().all()
+        return {text_id: content for text_id, content in result.all()}
     except Exception as e:
         logger.error(f"Database query error: {str(e)}")
         raise RuntimeError("Database query failed.") from e
 
 
-def search_similar_texts_in_faiss(query_embedding, db_texts):
+def get_text_embeddings(rows) -> np.ndarray:
+    """
+    Get the embeddings of stored texts, preferring the ones persisted with the rows.
+
+    Args:
+        rows (list): Rows or TextEntry objects with `embedding` and `content` attributes.
+
+    Returns:
+        np.ndarray: A (len(rows), INDEX_DIMENSION) float32 matrix of embeddings.
+    """
+    embeddings = np.empty((len(rows), INDEX_DIMENSION), dtype="float32")
+    missing = []
+    for position, row in enumerate(rows):
+        if row.embedding is not None:
+            embeddings[position] = embedding_from_bytes(row.embedding)
+        else:
+            missing.append(position)
+
+    if missing:
+        # Rows written before embeddings were persisted; run the backfill command to avoid this
+        logger.warning(f"{len(missing)} texts have no stored embedding, embedding them on the fly.")
+        embeddings[missing] = embed_texts([rows[position].content for position in missing])
+    return embeddings
+
+
+def add_text_rows_to_index(bucket_index: BucketIndex, rows):
+    """
+    Add stored texts that are not indexed yet to a bucket index.
+
+    Args:
+        bucket_index (BucketIndex): The index of the bucket the texts belong to.
+        rows (list): Rows or TextEntry objects with `id`, `embedding` and `content` attributes.
+    """
+    new_rows = [row for row in rows if row.id not in bucket_index]
+    if new_rows:
+        bucket_index.add([row.id for row in new_rows], get_text_embeddings(new_rows))
+        logger.debug(f"Added {len(new_rows)} embeddings to a FAISS index.")
+
+
+def search_similar_texts_in_faiss(
+    query_embedding, bucket_index: BucketIndex, k: int = 1
+) -> list[tuple[int, float]]:
     """
-    Search for similar texts in the FAISS index using the given query embedding.
+    Search for the most similar texts in a bucket's resident FAISS index.
 
     Args:
         query_embedding (np.ndarray): The embedding of the query keywords.
-        db_texts (list): A list of TextEntry objects from the database.
+        bucket_index (BucketIndex): The synchronized index of the bucket, see sync_bucket_index.
+        k (int): The number of texts to return.
 
     Returns:
-        str or None: The content of the most similar text if found, otherwise None.
+        list[tuple[int, float]]: (TextEntry id, cosine similarity) of up to `k` texts, most
+            similar first; whether they are close enough is decided by select_retrieved_texts.
 
     Raises:
         RuntimeError: If an error occurs during FAISS index operations.
     """
-    if db_texts:
-        try:
-            db_embeddings = np.array([embed_text(text.content) for text in db_texts]).astype(
-                "float32"
-            )
-            if db_embeddings.size > 0:
-                index.reset()
-                index.add(db_embeddings)
-                logger.debug(f"Added {db_embeddings.shape[0]} embeddings to the FAISS index.")
-
-                logger.info("Performing similarity search...")
-                search_results = index.search(np.array([query_embedding]), k=1)
-
-                if len(search_results) == 2:
-                    distances, closest_indices = search_results
-                    if closest_indices.size > 0 and distances[0][0] > 0.8:
-                        return db_texts[closest_indices[0][0]].content
-                    else:
-                        logger.debug("No close enough match found, generating new text.")
-                else:
-                    logger.error("Unexpected format from FAISS search result.")
-        except Exception as e:
-            logger.error(f"Error during FAISS index operations: {str(e)}")
-            raise RuntimeError("FAISS index operation failed.") from e
-    else:
+    if not len(bucket_index):
         logger.info("No relevant entries found in the database.")
-    return None
+        return []
 
+    try:
+        logger.info("Performing similarity search...")
+        SEARCHED_INDEX_SIZE.observe(len(bucket_index))
+        return bucket_index.search(query_embedding, k=k)
+    except Exception as e:
+        logger.error(f"Error during FAISS index operations: {str(e)}")
+        raise RuntimeError("FAISS index operation failed.") from e
 
-def prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_text=None):
+
+async def search_similar_texts_in_pgvector(
+    db: AsyncSession, query_embedding: np.ndarray, bucket: BucketKey, k: int = 1
+) -> list[tuple[str, float]]:
+    """
+    Search for the most similar texts of a bucket in PostgreSQL with pgvector.
+
+    Only the best `k` matches are transferred, so neither the bucket's texts nor their
+    embeddings are loaded into the application. The HNSW index on `texts.embedding_vector`
+    is shared by all buckets and the bucket filter is applied to the rows it returns, so it
+    can miss the texts of a bucket holding a small share of the table: buckets of up to
+    `pgvector_exact_scan_max_texts` texts are ranked exactly, larger ones by the index with
+    iterative scans (pgvector >= 0.8), which keep scanning until `k` texts of the bucket are
+    found or `pgvector_max_scan_tuples` rows were visited.
+
+    Args:
+        db (AsyncSession): The database session for async operations.
+        query_embedding (np.ndarray): The L2-normalized embedding of the query keywords.
+        bucket (BucketKey): The (domain, audience, tone) bucket to search.
+        k (int): The number of texts to return.
+
+    Returns:
+        list[tuple[str, float]]: (content, cosine similarity) of up to `k` texts, most similar
+            first.
+
+    Raises:
+        RuntimeError: If the database query fails.
+    """
+    domain, audience, tone = bucket
+    # `<#>` is the negative inner product, the cosine similarity for normalized embeddings
+    distance = TextEntry.embedding_vector.op("<#>", return_type=Float)(query_embedding)
+    in_bucket = (
+        TextEntry.domain == domain,
+        TextEntry.audience == audience,
+        TextEntry.tone == tone,
+        TextEntry.embedding_vector.is_not(None),
+    )
+    try:
+        exact_scan_max_texts = settings.pgvector_exact_scan_max_texts
+        # Counted on idx_domain_audience_tone (161026_add_text_bucket_index), up to the first
+        # text over the limit
+        bucket_texts = await db.scalar(
+            select(func.count()).select_from(
+                select(TextEntry.id).where(*in_bucket).limit(exact_scan_max_texts + 1).subquery()
+            )
+        )
+        if not bucket_texts:
+            return []
+        if bucket_texts <= exact_scan_max_texts:
+            # OFFSET 0 keeps the planner from ordering the bucket's rows by the HNSW index
+            bucket_rows = (
+                select(TextEntry.content, distance.label("distance"))
+                .where(*in_bucket)
+                .offset(0)
+                .subquery()
+            )
+            result = await db.execute(
+                select(bucket_rows.c.content, bucket_rows.c.distance)
+                .order_by(bucket_rows.c.distance)
+                .limit(k)
+            )
+        else:
+            # Candidates the HNSW scan considers, scoped to this transaction
+            await db.execute(
+                select(func.set_config("hnsw.ef_search", str(settings.pgvector_ef_search), True))
+            )
+            if settings.pgvector_iterative_scan:
+                await db.execute(
+                    select(
+                        func.set_config("hnsw.iterative_scan", "relaxed_order", True),
+                        func.set_config(
+                            "hnsw.max_scan_tuples", str(settings.pgvector_max_scan_tuples), True
+                        ),
+                    )
+                )
+            result = await db.execute(
+                select(TextEntry.content, distance).where(*in_bucket).order_by(distance).limit(k)
+            )
+        # Iterative scans return the rows in approximate order
+        matches = sorted(result.all(), key=lambda row: row[1])
+        return [(content, -negative_similarity) for content, negative_similarity in matches]
+    except Exception as e:
+        logger.error(f"Error during pgvector similarity search: {str(e)}")
+        raise RuntimeError("Database query failed.") from e
+
+
+def select_retrieved_texts(
+    keywords: list[str], candidates: list[tuple[str, float]], bucket: BucketKey
+) -> list[str]:
+    """
+    Rerank the texts retrieved for a request and keep the ones relevant enough to improve upon.
+
+    Args:
+        keywords (list[str]): The keywords of the request.
+        candidates (list[tuple[str, float]]): (content, cosine similarity) of the retrieved
+            texts.
+        bucket (BucketKey): The (domain, audience, tone) bucket of the request.
+
+    Returns:
+        list[str]: Up to `retrieval_snippets` texts, most relevant first, empty to write a new
+            text.
+    """
+    retrieved_texts = rerank(
+        keywords,
+        candidates,
+        threshold=similarity_threshold_for(
+            bucket, settings.retrieval_similarity_threshold, settings.retrieval_bucket_thresholds
+        ),
+        lexical_weight=settings.retrieval_lexical_weight,
+        limit=settings.retrieval_snippets,
+    )
+    RETRIEVED_TEXTS.observe(len(retrieved_texts))
+    if not retrieved_texts:
+        logger.debug("No close enough match found, generating new text.")
+    return retrieved_texts
+
+
+def prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_texts=None):
     """
     Prepare the prompt for the text generation model.
 
@@ -99,12 +638,13 @@ def prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_text=
         word_count (int): The expected number of words in the generated text.
         audience (str): The target audience for the generated text.
         tone (str): The tone of the generated text.
-        retrieved_text (str, optional): The retrieved text to improve upon, if any.
+        retrieved_texts (list[str], optional): The retrieved texts to improve upon, most
+            relevant first, if any.
 
     Returns:
         str: The prepared prompt for text generation.
     """
-    if retrieved_text:
+    if retrieved_texts:
         improvement_instruction = random.choice(
             [
                 "improve it or make it more unique",
@@ -112,9 +652,12 @@ def prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_text=
                 "Paraphrase and expand the text while keeping the tone consistent",
             ]
         )
+        # Further retrieved texts are offered as material, the first one is rewritten
+        related_texts = "".join(f'Related text: "{text}". ' for text in retrieved_texts[1:])
         prompt = (
             f"{improvement_instruction}. "
-            f'Current text: "{retrieved_text}". '
+            f'Current text: "{retrieved_texts[0]}". '
+            f"{related_texts}"
             f"Make sure the tone remains {tone} and suitable for a {audience}. "
             f"Keywords to include: {', '.join(keywords)}. It should be around {word_count} words long."
         )
@@ -127,100 +670,578 @@ def prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_text=
     return prompt
 
 
-async def generate_text(
-    keywords: list[str], domain: str, word_count: int, audience: str, tone: str
-) -> str:
+async def embed_keywords(keywords: list[str]) -> np.ndarray:
     """
-    Generate or improve text based on keywords, domain, audience, and tone.
+    Embed the keywords of a request into a single query vector.
 
     Args:
         keywords (list[str]): A list of keywords to include in the generated text.
-        domain (str): The domain of the text (e.g., e-commerce, advertising).
-        word_count (int): The expected number of words in the generated text.
-        audience (str): The target audience for the generated text (e.g., consumer, business).
-        tone (str): The tone of the generated text (e.g., informal, formal).
 
     Returns:
-        str: The generated text encoded in UTF-16.
+        np.ndarray: The float32 query embedding.
 
     Raises:
         ValueError: If the keywords are empty or embedding fails.
-        RuntimeError: If database queries or text generation fails.
+        ServiceOverloadedError: If the inference queue is full.
     """
-
     # Validate input keywords
     keyword_string = " ".join(keywords).strip()
     if not keyword_string:
         raise ValueError("Keywords cannot be empty.")
 
-    # Embed the keywords into a single vector for query
     try:
-        query_embedding = embed_text(keyword_string).astype("float32")
+        query_embedding = (await inference_executor.run(embed_text, keyword_string)).astype(
+            "float32"
+        )
         if query_embedding.shape[0] != INDEX_DIMENSION:
             raise ValueError(
                 f"Unexpected embedding dimension: {query_embedding.shape[0]}. Expected {INDEX_DIMENSION}."
             )
+    except ServiceOverloadedError:
+        raise
     except Exception as e:
         logger.error(f"Error embedding keywords: {str(e)}")
         raise ValueError("Failed to embed keywords.") from e
+    return query_embedding
 
-    # Fetch similar texts from the database
-    async with get_db() as db:
-        db_texts = await fetch_similar_texts_from_db(db, domain, audience, tone)
 
-    attempt = 0
-    max_retries = 5
+async def retrieve_similar_texts(
+    db: AsyncSession,
+    query_embedding: np.ndarray,
+    keywords: list[str],
+    domain: str,
+    audience: str,
+    tone: str,
+) -> list[str]:
+    """
+    Find the stored texts of the request bucket to improve upon.
+
+    The `retrieval_top_k` texts most similar to the query are retrieved and reranked by their
+    keyword overlap, see select_retrieved_texts. With the FAISS backend the bucket's new
+    embeddings are streamed into the resident index and searched in this process, and only the
+    contents of candidates that can still reach the bucket's threshold are loaded; with the
+    pgvector backend the search runs in the database. The transaction is ended before
+    returning, so `db` holds no connection while text is generated.
 
-    while attempt < max_retries:
-        # Search for similar texts using FAISS
-        retrieved_text = search_similar_texts_in_faiss(query_embedding, db_texts)
+    Args:
+        db (AsyncSession): The database session of the request.
+        query_embedding (np.ndarray): The embedding of the query keywords.
+        keywords (list[str]): The keywords of the request.
+        domain (str): The domain of the text (e.g., e-commerce, advertising).
+        audience (str): The target audience for the text (e.g., consumer, business).
+        tone (str): The tone of the text (e.g., informal, formal).
 
-        # Prepare the prompt for text generation
-        prompt = prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_text)
-        logger.info("Prepared prompt to generate is: %s" % prompt)
+    Returns:
+        list[str]: The texts to improve upon, most relevant first, empty if none is relevant
+            enough.
 
-        # Generate a response with sampling settings to avoid repetitive outputs
-        try:
-            response = generator(
-                prompt,
-                max_new_tokens=int(word_count * 2),  # Adjust for expected word length
-                temperature=0.7,  # Controls randomness. Higher values generate more random text
-                top_p=0.9,  # Controls nucleus sampling. Adjust for more focused output
-                do_sample=True,  # Enables sampling for more diverse outputs
+    Raises:
+        RuntimeError: If the database query or the FAISS search fails.
+        ServiceOverloadedError: If the inference queue is full.
+    """
+    bucket = (domain, audience, tone)
+    try:
+        if settings.retrieval_backend == PGVECTOR_BACKEND:
+            with time_stage("pgvector_search"):
+                candidates = await search_similar_texts_in_pgvector(
+                    db, query_embedding, bucket, k=settings.retrieval_top_k
+                )
+            return select_retrieved_texts(keywords, candidates, bucket)
+
+        with time_stage("index_sync"):
+            bucket_index = await sync_bucket_index(db, bucket)
+            # Do not keep the connection checked out while the search waits for an inference
+            # worker
+            await db.rollback()
+        with time_stage("faiss_search"):
+            matches = await inference_executor.run(
+                search_similar_texts_in_faiss,
+                query_embedding,
+                bucket_index,
+                settings.retrieval_top_k,
             )
-            generated_text = response[0]["generated_text"]
-        except Exception as e:
-            logger.error(f"Error during text generation: {str(e)}")
-            raise RuntimeError("Text generation failed.") from e
+        matches = relevant_matches(matches, bucket)
+        if not matches:
+            RETRIEVED_TEXTS.observe(0)
+            return []
+        with time_stage("fetch_content"):
+            contents = await fetch_text_contents(db, [text_id for text_id, _ in matches])
+        candidates = [
+            (contents[text_id], score) for text_id, score in matches if text_id in contents
+        ]
+        return select_retrieved_texts(keywords, candidates, bucket)
+    finally:
+        # End the read-only transaction, returning the connection to the pool
+        await db.rollback()
+
+
+def relevant_matches(
+    matches: list[tuple[int, float]], bucket: BucketKey
+) -> list[tuple[int, float]]:
+    """Drop the FAISS matches too dissimilar to reach the bucket's threshold even by reranking."""
+    threshold = similarity_threshold_for(
+        bucket, settings.retrieval_similarity_threshold, settings.retrieval_bucket_thresholds
+    )
+    return [
+        (text_id, score)
+        for text_id, score in matches
+        if max_relevance(score, settings.retrieval_lexical_weight) >= threshold
+    ]
+
+
+async def insert_texts(
+    db: AsyncSession, bucket: BucketKey, texts: list[str], embeddings: np.ndarray
+) -> dict[str, int]:
+    """
+    Insert texts of a bucket with one statement, skipping the ones the bucket already contains.
+
+    Duplicates are detected by the unique index on (content_hash, domain, audience, tone) with
+    `INSERT ... ON CONFLICT DO NOTHING`, so no texts have to be compared in Python. The caller
+    commits the transaction.
 
-        # Convert to UTF-16
+    Args:
+        db (AsyncSession): The database session for async operations.
+        bucket (BucketKey): The (domain, audience, tone) bucket of the texts.
+        texts (list[str]): The texts to insert.
+        embeddings (np.ndarray): The embeddings of `texts`, one row per text.
+
+    Returns:
+        dict[str, int]: The TextEntry id of every inserted text, by content hash.
+    """
+    domain, audience, tone = bucket
+    store_vectors = settings.retrieval_backend == PGVECTOR_BACKEND
+    # PostgreSQL and SQLite (for local runs) both support ON CONFLICT DO NOTHING
+    dialect_insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    statement = (
+        dialect_insert(TextEntry)
+        .on_conflict_do_nothing(index_elements=["content_hash", "domain", "audience", "tone"])
+        .returning(TextEntry.id, TextEntry.content_hash)
+    )
+
+    rows = []
+    for text, embedding in zip(texts, embeddings):
+        row = {
+            "content": text,
+            "content_hash": content_hash(text),
+            "domain": domain,
+            "audience": audience,
+            "tone": tone,
+            "embedding": embedding_to_bytes(embedding),
+        }
+        if store_vectors:
+            row["embedding_vector"] = embedding
+        rows.append(row)
+
+    result = await db.execute(statement, rows)
+    return {text_hash: text_id for text_id, text_hash in result.all()}
+
+
+async def find_stored_hashes(db: AsyncSession, bucket: BucketKey, texts: list[str]) -> set[str]:
+    """
+    Find which of some texts a bucket already contains.
+
+    Args:
+        db (AsyncSession): The database session for async operations.
+        bucket (BucketKey): The (domain, audience, tone) bucket of the texts.
+        texts (list[str]): The texts to look up.
+
+    Returns:
+        set[str]: The content hashes of the texts that are stored in the bucket.
+
+    Raises:
+        RuntimeError: If the database query fails.
+    """
+    domain, audience, tone = bucket
+    try:
+        result = await db.execute(
+            select(TextEntry.content_hash).where(
+                TextEntry.content_hash.in_({content_hash(text) for text in texts}),
+                TextEntry.domain == domain,
+                TextEntry.audience == audience,
+                TextEntry.tone == tone,
+            )
+        )
+        return set(result.scalars().all())
+    except Exception as e:
+        logger.error(f"Database query error: {str(e)}")
+        raise RuntimeError("Database query failed.") from e
+    finally:
+        await db.rollback()
+
+
+async def save_new_texts(
+    db: AsyncSession,
+    candidates: list[str],
+    domain: str,
+    audience: str,
+    tone: str,
+    limit: int = 1,
+) -> list[str]:
+    """
+    Save the first candidate texts that their bucket does not contain yet.
+
+    Args:
+        db (AsyncSession): The database session of the request.
+        candidates (list[str]): The generated candidates, in order of preference.
+        domain (str): The domain of the texts.
+        audience (str): The target audience of the texts.
+        tone (str): The tone of the texts.
+        limit (int): The number of texts to save at most.
+
+    Returns:
+        list[str]: The saved texts, or with write-behind the texts queued to be saved, empty if
+            the bucket contains all candidates.
+
+    Raises:
+        RuntimeError: If the database query or saving a text fails.
+        ServiceOverloadedError: If the inference queue is full.
+    """
+    bucket = (domain, audience, tone)
+    candidates = list(dict.fromkeys(candidates))
+    if text_writer is not None:
+        # Texts are saved after responding, so duplicates are only detected up front; a text
+        # another replica inserts in between is returned but not saved again
+        stored_hashes = await find_stored_hashes(db, bucket, candidates)
+        new_texts = [
+            text
+            for text in candidates
+            if content_hash(text) not in stored_hashes and not text_writer.is_pending(bucket, text)
+        ][:limit]
+        for generated_text in new_texts:
+            await text_writer.put(bucket, generated_text)
+        return new_texts
+
+    if len(candidates) > 1:
+        # One query skips the duplicates, so only the saved texts are embedded
+        stored_hashes = await find_stored_hashes(db, bucket, candidates)
+        candidates = [text for text in candidates if content_hash(text) not in stored_hashes]
+
+    saved_texts: list[str] = []
+    for generated_text in candidates:
+        if len(saved_texts) == limit:
+            break
+        # Another request may have saved the same text since, the insert is skipped then
+        if await save_generated_text(db, generated_text, domain, audience, tone):
+            saved_texts.append(generated_text)
+    return saved_texts
+
+
+async def save_generated_text(
+    db: AsyncSession,
+    generated_text: str,
+    domain: str,
+    audience: str,
+    tone: str,
+    priority: int = INTERACTIVE,
+) -> bool:
+    """
+    Save a generated text with its embedding unless its bucket already contains it.
+
+    Args:
+        db (AsyncSession): The database session of the request.
+        generated_text (str): The generated text.
+        domain (str): The domain of the text.
+        audience (str): The target audience of the text.
+        tone (str): The tone of the text.
+        priority (int): The inference priority class of the embedding, INTERACTIVE or BULK.
+
+    Returns:
+        bool: True if the text was saved, False if it already exists.
+
+    Raises:
+        RuntimeError: If saving the text fails.
+        ServiceOverloadedError: If the priority is INTERACTIVE and the inference queue is full.
+    """
+    bucket = (domain, audience, tone)
+    try:
+        with time_stage("embed_text"):
+            generated_embedding = await inference_executor.run_with_priority(
+                priority, embed_text, generated_text
+            )
+        with time_stage("db_write"):
+            inserted = await insert_texts(db, bucket, [generated_text], generated_embedding[None])
+            await db.commit()
+    except ServiceOverloadedError:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error saving generated text to the database: {str(e)}")
+        raise RuntimeError("Failed to save generated text.") from e
+
+    if not inserted:
+        return False
+    index_manager.add(bucket, inserted.values(), generated_embedding)
+    logger.info(f"Generated text saved to database: {generated_text}")
+    return True
+
+
+async def persist_texts(pending_texts: list[PendingText]):
+    """
+    Save texts queued by the write-behind writer: one embedding call, one insert per bucket.
+
+    Texts their bucket already contains are skipped, the others are added to the resident
+    indexes once committed.
+
+    Args:
+        pending_texts (list[PendingText]): The queued texts.
+
+    Raises:
+        RuntimeError: If embedding or the database write fails.
+    """
+    # No time_stage here, the worker runs outside of any request. The texts were already
+    # returned, so they are embedded as bulk work, which waits for a worker instead of being
+    # rejected
+    embeddings = await inference_executor.run_with_priority(
+        BULK, embed_texts, [pending.text for pending in pending_texts]
+    )
+    positions = defaultdict(list)
+    for position, pending in enumerate(pending_texts):
+        positions[pending.bucket].append(position)
+
+    inserted_by_bucket = {}
+    async with get_db() as db:
         try:
-            generated_text_utf16 = generated_text.encode("utf-16")
+            for bucket, bucket_positions in positions.items():
+                inserted_by_bucket[bucket] = await insert_texts(
+                    db,
+                    bucket,
+                    [pending_texts[position].text for position in bucket_positions],
+                    embeddings[bucket_positions],
+                )
+            await db.commit()
         except Exception as e:
-            logger.error(f"Error encoding text to UTF-16: {str(e)}")
-            raise RuntimeError("Failed to encode text to UTF-16.") from e
-
-        # Check if the generated text already exists in the database before saving
-        if not any(text.content == generated_text for text in db_texts):
-            async with get_db() as db:
-                try:
-                    new_text_entry = TextEntry(
-                        content=generated_text, domain=domain, audience=audience, tone=tone
+            await db.rollback()
+            logger.error(f"Error saving generated texts to the database: {str(e)}")
+            raise RuntimeError("Failed to save generated texts.") from e
+
+    for bucket, inserted in inserted_by_bucket.items():
+        hash_positions = {
+            content_hash(pending_texts[position].text): position for position in positions[bucket]
+        }
+        index_manager.add(
+            bucket,
+            inserted.values(),
+            embeddings[[hash_positions[text_hash] for text_hash in inserted]],
+        )
+    saved = sum(len(inserted) for inserted in inserted_by_bucket.values())
+    logger.info(
+        f"Saved {saved} generated texts to database, {len(pending_texts) - saved} already existed."
+    )
+
+
+# Saves generated texts after the response is sent, None when texts are saved inline
+text_writer = (
+    WriteBehindWriter(
+        persist_texts,
+        max_batch_size=settings.write_behind_batch_size,
+        max_wait_ms=settings.write_behind_wait_ms,
+        max_queue_size=settings.write_behind_queue_size,
+    )
+    if settings.write_behind_enabled
+    else None
+)
+if text_writer is not None:
+    set_gauge_function(WRITE_BEHIND_QUEUED, text_writer.__len__)
+
+
+async def generate_text(
+    keywords: list[str],
+    domain: str,
+    word_count: int,
+    audience: str,
+    tone: str,
+    use_cache: bool = True,
+) -> str:
+    """
+    Generate or improve text based on keywords, domain, audience, and tone.
+
+    Texts are served from the response cache when an identical (or, with the semantic tier
+    enabled, a near-identical) request was answered recently. Identical requests arriving while
+    one is being generated wait for its result instead of running the pipeline again; with
+    `generation_coalesced_texts` above 1 that run saves several texts, handed out in turn.
+
+    Args:
+        keywords (list[str]): A list of keywords to include in the generated text.
+        domain (str): The domain of the text (e.g., e-commerce, advertising).
+        word_count (int): The expected number of words in the generated text.
+        audience (str): The target audience for the generated text (e.g., consumer, business).
+        tone (str): The tone of the generated text (e.g., informal, formal).
+        use_cache (bool): Serve a cached text if available. A fresh text is cached either way.
+
+    Returns:
+        str: The plain generated text, see core.response_formats for its response encodings.
+
+    Raises:
+        ValueError: If the keywords are empty or embedding fails.
+        RuntimeError: If database queries or text generation fails.
+        ServiceOverloadedError: If the inference queue is full.
+    """
+    cache_key = ResponseCache.make_key(keywords, domain, word_count, audience, tone)
+    if not settings.generation_coalescing_enabled:
+        generated_texts = await _generate_texts(
+            cache_key, keywords, domain, word_count, audience, tone, use_cache
+        )
+        return generated_texts[0]
+
+    generated_texts, position = await generation_flights.run(
+        f"{cache_key}:{use_cache}",
+        lambda: _generate_texts(cache_key, keywords, domain, word_count, audience, tone, use_cache),
+    )
+    return generated_texts[position % len(generated_texts)]
+
+
+async def _generate_texts(
+    cache_key: str,
+    keywords: list[str],
+    domain: str,
+    word_count: int,
+    audience: str,
+    tone: str,
+    use_cache: bool,
+) -> list[str]:
+    bucket = (domain, audience, tone)
+    if response_cache is not None and use_cache:
+        with time_stage("cache_lookup"):
+            cached_text = await response_cache.get_exact(cache_key)
+        if cached_text is not None:
+            RESPONSE_CACHE_HITS.labels(tier="exact").inc()
+            logger.info("Serving generated text from the response cache.")
+            return [cached_text]
+
+    # Embed the keywords into a single vector for query
+    with time_stage("embed_keywords"):
+        query_embedding = await embed_keywords(keywords)
+
+    if response_cache is not None and use_cache:
+        with time_stage("cache_lookup"):
+            cached_text = response_cache.get_similar(bucket, word_count, query_embedding)
+        if cached_text is not None:
+            RESPONSE_CACHE_HITS.labels(tier="semantic").inc()
+            logger.info("Serving generated text of a similar request from the response cache.")
+            return [cached_text]
+
+    # One session serves the request, it only holds a connection while it queries the database
+    async with get_db() as db:
+        # Search for similar texts, the result does not change between retries
+        retrieved_texts = await retrieve_similar_texts(
+            db, query_embedding, keywords, domain, audience, tone
+        )
+        await calibrate_length_estimate(db, domain)
+
+        attempt = 0
+        max_retries = 5
+
+        while attempt < max_retries:
+            # Prepare the prompt for text generation
+            prompt = prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_texts)
+            logger.info("Prepared prompt to generate is: %s" % prompt)
+
+            # Generate candidates with sampling settings to avoid repetitive outputs
+            try:
+                with time_stage("generation"):
+                    candidates = await generation_batcher.generate(
+                        prompt,
+                        max_new_tokens=max_new_tokens_for(word_count, domain),
+                        word_count=word_count,
+                        num_return_sequences=max(
+                            settings.generation_candidates, settings.generation_coalesced_texts
+                        ),
+                        **GENERATION_SAMPLING_KWARGS,
                     )
-                    db.add(new_text_entry)
-                    await db.commit()
-                    logger.info(f"Generated text saved to database: {generated_text}")
-                    break
-                except Exception as e:
-                    logger.error(f"Error saving generated text to the database: {str(e)}")
-                    raise RuntimeError("Failed to save generated text.") from e
-        else:
+            except ServiceOverloadedError:
+                raise
+            except Exception as e:
+                logger.error(f"Error during text generation: {str(e)}")
+                raise RuntimeError("Text generation failed.") from e
+
+            # The database rejects texts its bucket already contains, the next candidate is
+            # saved instead and the model only runs again when all of them are duplicates
+            generated_texts = await save_new_texts(
+                db,
+                candidates,
+                domain,
+                audience,
+                tone,
+                limit=settings.generation_coalesced_texts,
+            )
+            if generated_texts:
+                break
+
             logger.info(
-                "Generated text already exists in the database. Retrying with adjusted prompt."
+                "Generated texts already exist in the database. Retrying with adjusted prompt."
             )
             attempt += 1
 
+    GENERATION_ATTEMPTS.observe(min(attempt + 1, max_retries))
     if attempt == max_retries:
         raise RuntimeError(f"Failed to generate a unique text after {max_retries} attempts.")
 
-    return str(generated_text_utf16)
+    if response_cache is not None:
+        await response_cache.set(cache_key, bucket, word_count, query_embedding, generated_texts[0])
+
+    return generated_texts
+
+
+async def stream_text(
+    keywords: list[str], domain: str, word_count: int, audience: str, tone: str
+) -> AsyncIterator[str]:
+    """
+    Generate or improve text like `generate_text`, streaming it as it is decoded.
+
+    Embedding, retrieval and the admission of generation to the inference queue run before
+    this coroutine returns, so their errors are raised before any chunk is sent. The complete text is saved once the stream ends; since chunks
+    have already been sent, a duplicate is not retried but just not saved again.
+
+    Args:
+        keywords (list[str]): A list of keywords to include in the generated text.
+        domain (str): The domain of the text (e.g., e-commerce, advertising).
+        word_count (int): The expected number of words in the generated text.
+        audience (str): The target audience for the generated text (e.g., consumer, business).
+        tone (str): The tone of the generated text (e.g., informal, formal).
+
+    Returns:
+        AsyncIterator[str]: The chunks of plain generated text.
+
+    Raises:
+        ValueError: If the keywords are empty or embedding fails.
+        RuntimeError: If database queries fail.
+        ServiceOverloadedError: If the inference queue is full.
+    """
+    with time_stage("embed_keywords"):
+        query_embedding = await embed_keywords(keywords)
+    async with get_db() as db:
+        retrieved_texts = await retrieve_similar_texts(
+            db, query_embedding, keywords, domain, audience, tone
+        )
+        await calibrate_length_estimate(db, domain)
+
+    prompt = prepare_prompt(keywords, domain, word_count, audience, tone, retrieved_texts)
+    logger.info("Prepared prompt to stream is: %s" % prompt)
+
+    # Admitted to the inference queue here, so a full queue is answered with a 503
+    stream = stream_generation(
+        prompt,
+        word_count=word_count,
+        max_new_tokens=max_new_tokens_for(word_count, domain),
+        **GENERATION_SAMPLING_KWARGS,
+    )
+
+    async def chunks() -> AsyncIterator[str]:
+        generated_chunks = []
+        async for chunk in stream:
+            generated_chunks.append(chunk)
+            yield chunk
+
+        generated_text = "".join(generated_chunks).strip()
+        if text_writer is not None:
+            await text_writer.put((domain, audience, tone), generated_text)
+            return
+        # The text was already sent, so it is embedded as bulk work, which is never rejected
+        async with get_db() as db:
+            saved = await save_generated_text(
+                db, generated_text, domain, audience, tone, priority=BULK
+            )
+        if not saved:
+            logger.info("Streamed text already exists in the database, not saving it again.")
+
+    return chunks()
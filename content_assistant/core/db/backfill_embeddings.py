@@ -0,0 +1,102 @@
+"""
+Backfill the `texts.embedding` column for rows written before embeddings were persisted.
+
+Usage:
+    python -m content_assistant.core.db.backfill_embeddings [--batch-size 256] [--recompute]
+
+Use --recompute to re-embed every row, e.g. after the embedding model or pooling changed.
+With RETRIEVAL_BACKEND=pgvector, `texts.embedding_vector` is filled as well, from the stored
+embedding where there is one.
+"""
+
+import argparse
+import asyncio
+import logging.config
+from typing import Any
+
+from sqlalchemy import ColumnElement, or_, update
+from sqlalchemy.future import select
+
+from content_assistant.core.config.logging import logging_config
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.db.database import get_db
+from content_assistant.core.generator import (
+    embed_texts,
+    embedding_from_bytes,
+    embedding_to_bytes,
+)
+from content_assistant.core.models import TextEntry
+
+logger = logging.getLogger("content_assistant_app")
+
+
+async def backfill_embeddings(batch_size: int = 256, recompute: bool = False) -> int:
+    """
+    Compute and store embeddings for every TextEntry that does not have one yet.
+
+    Rows are processed in primary key order and committed per batch, so the command can be
+    interrupted and re-run safely.
+
+    Args:
+        batch_size (int): The number of rows embedded and committed at once.
+        recompute (bool): Re-embed rows that already have an embedding as well.
+
+    Returns:
+        int: The number of rows updated.
+    """
+    store_vectors = get_settings().retrieval_backend == "pgvector"
+    updated = 0
+    last_id = 0
+    while True:
+        async with get_db() as db:
+            query = select(TextEntry.id, TextEntry.content, TextEntry.embedding).where(
+                TextEntry.id > last_id
+            )
+            if not recompute:
+                missing: ColumnElement[bool] = TextEntry.embedding.is_(None)
+                if store_vectors:
+                    missing = or_(missing, TextEntry.embedding_vector.is_(None))
+                query = query.where(missing)
+            result = await db.execute(query.order_by(TextEntry.id).limit(batch_size))
+            rows = result.all()
+            if not rows:
+                break
+
+            to_embed = [
+                position
+                for position, (_, _, stored) in enumerate(rows)
+                if recompute or stored is None
+            ]
+            computed = dict(zip(to_embed, embed_texts([rows[i][1] for i in to_embed])))
+            for position, (text_id, _, stored) in enumerate(rows):
+                embedding = computed.get(position)
+                values: dict[str, Any] = {}
+                if embedding is None:
+                    embedding = embedding_from_bytes(stored)
+                else:
+                    values["embedding"] = embedding_to_bytes(embedding)
+                if store_vectors:
+                    values["embedding_vector"] = embedding
+                await db.execute(update(TextEntry).where(TextEntry.id == text_id).values(**values))
+            await db.commit()
+
+        updated += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"Backfilled embeddings for {updated} texts (last id: {last_id}).")
+
+    return updated
+
+
+def main():
+    logging.config.dictConfig(logging_config)
+    parser = argparse.ArgumentParser(description="Backfill embeddings for stored texts.")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--recompute", action="store_true", help="Re-embed all rows.")
+    args = parser.parse_args()
+
+    updated = asyncio.run(backfill_embeddings(batch_size=args.batch_size, recompute=args.recompute))
+    logger.info(f"Embedding backfill finished, {updated} texts updated.")
+
+
+if __name__ == "__main__":
+    main()
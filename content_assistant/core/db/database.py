@@ -1,11 +1,48 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from content_assistant.core.config.settings import get_settings
+from content_assistant.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_SIZE, set_gauge_function
 import contextlib
 
 settings = get_settings()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+
+def engine_options(database_url: str) -> dict:
+    """
+    Build the engine arguments for a database URL from the pool settings.
+
+    Every replica may hold up to db_pool_size + db_max_overflow connections, so size them
+    against the PostgreSQL max_connections divided by the number of replicas and workers.
+    """
+    url = make_url(database_url)
+    options: dict = {"url": url, "echo": settings.debug, "future": True}
+    if url.get_backend_name() == "sqlite":
+        # SQLite (for local runs) picks its own pool, which does not take these arguments
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if url.get_driver_name() == "asyncpg":
+        # Prepared statements are cached per connection; 0 disables the cache, e.g. behind
+        # PgBouncer in transaction pooling mode
+        options["url"] = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.db_statement_cache_size)}
+        )
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+
+engine = create_async_engine(**engine_options(settings.DATABASE_URL))
+if hasattr(engine.pool, "checkedout"):
+    # Pools without a fixed size (e.g. SQLite's) have nothing to report
+    set_gauge_function(DB_POOL_CHECKED_OUT, lambda: engine.pool.checkedout())
+    set_gauge_function(DB_POOL_SIZE, lambda: engine.pool.checkedin() + engine.pool.checkedout())
 
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False, autocommit=False
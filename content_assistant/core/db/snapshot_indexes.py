@@ -0,0 +1,82 @@
+"""
+Write snapshots of the per-bucket FAISS indexes, loaded by the app instead of rebuilding them.
+
+Usage:
+    python -m content_assistant.core.db.snapshot_indexes [--directory DIR] [--min-texts 1000]
+
+The directory defaults to FAISS_SNAPSHOT_DIR. Each bucket's index is built from the stored
+embeddings with the configured index settings and replaces the bucket's previous snapshot. Run
+it periodically, e.g. nightly; the app reads the texts stored after a snapshot from the
+database, so stale snapshots only cost load time. Run the embedding backfill first, rows
+without a stored embedding are embedded on the fly.
+"""
+
+import argparse
+import asyncio
+import logging.config
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from content_assistant.core.config.logging import logging_config
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.content_generator import (
+    INDEX_DIMENSION,
+    index_factory,
+    read_new_texts_into_index,
+)
+from content_assistant.core.db.database import get_db
+from content_assistant.core.index_manager import BucketIndex
+from content_assistant.core.index_snapshots import IndexSnapshotStore
+from content_assistant.core.models import TextEntry
+
+logger = logging.getLogger("content_assistant_app")
+
+
+async def snapshot_indexes(directory: str, min_texts: int = 1) -> int:
+    """
+    Build the FAISS index of every bucket from the database and save it as its snapshot.
+
+    Buckets are built one at a time, so only one is held in memory.
+
+    Args:
+        directory (str): The snapshot directory.
+        min_texts (int): Skip buckets with fewer stored texts, they are quick to read anyway.
+
+    Returns:
+        int: The number of buckets snapshotted.
+    """
+    store = IndexSnapshotStore(directory, INDEX_DIMENSION, index_factory)
+    async with get_db() as db:
+        result = await db.execute(
+            select(TextEntry.domain, TextEntry.audience, TextEntry.tone)
+            .group_by(TextEntry.domain, TextEntry.audience, TextEntry.tone)
+            .having(func.count(TextEntry.id) >= min_texts)
+        )
+        buckets = [tuple(row) for row in result.all()]
+
+    for bucket in buckets:
+        bucket_index = BucketIndex(INDEX_DIMENSION, index_factory)
+        async with get_db() as db:
+            await read_new_texts_into_index(db, bucket, bucket_index)
+        await asyncio.to_thread(store.save, bucket, bucket_index)
+    return len(buckets)
+
+
+def main():
+    logging.config.dictConfig(logging_config)
+    parser = argparse.ArgumentParser(description="Snapshot the per-bucket FAISS indexes.")
+    parser.add_argument("--directory", help="Snapshot directory, defaults to FAISS_SNAPSHOT_DIR.")
+    parser.add_argument("--min-texts", type=int, default=1, help="Skip smaller buckets.")
+    args = parser.parse_args()
+
+    directory: Optional[str] = args.directory or get_settings().faiss_snapshot_dir
+    if not directory:
+        parser.error("Set --directory or FAISS_SNAPSHOT_DIR.")
+    snapshotted = asyncio.run(snapshot_indexes(directory, min_texts=args.min_texts))
+    logger.info(f"FAISS snapshots finished, {snapshotted} buckets snapshotted.")
+
+
+if __name__ == "__main__":
+    main()
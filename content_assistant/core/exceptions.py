@@ -12,11 +12,17 @@ logger = logging.getLogger(__name__)
 
 
 class AppExceptionCase(Exception):
-    def __init__(self, status_code: int, context: Optional[dict] = None):
+    def __init__(
+        self,
+        status_code: int,
+        context: Optional[dict] = None,
+        headers: Optional[dict[str, str]] = None,
+    ):
         super().__init__()
         self.exception_case = self.__class__.__name__
         self.status_code = status_code
         self.context = context
+        self.headers = headers
 
     def __str__(self):
         return (
@@ -46,6 +52,20 @@ class ResourceConflictError(AppExceptionCase):
         AppExceptionCase.__init__(self, status_code, context)
 
 
+class ServiceOverloadedError(AppExceptionCase):
+    def __init__(self, context: Optional[dict] = None, retry_after: int = 1):
+        """The service is at capacity and cannot accept the request right now."""
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        AppExceptionCase.__init__(self, status_code, context, {"Retry-After": str(retry_after)})
+
+
+class RateLimitedError(AppExceptionCase):
+    def __init__(self, context: Optional[dict] = None, retry_after: int = 1):
+        """The caller used up its request budget and has to wait before the next request."""
+        status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        AppExceptionCase.__init__(self, status_code, context, {"Retry-After": str(retry_after)})
+
+
 def caller_info() -> str:
     info = inspect.getframeinfo(inspect.stack()[2][0])
     return f"{info.filename}:{info.function}:{info.lineno}"
@@ -56,6 +76,7 @@ async def app_exception_handler(request: Request, exc: AppExceptionCase):
     return JSONResponse(
         status_code=exc.status_code,
         content={"app_exception": exc.exception_case, "context": exc.context},
+        headers=exc.headers,
     )
 
 
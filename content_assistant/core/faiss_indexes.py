@@ -0,0 +1,132 @@
+import math
+from dataclasses import dataclass
+
+import faiss
+import numpy as np
+
+FLAT = "flat"
+IVF_FLAT = "ivf_flat"
+HNSW = "hnsw"
+IVF_PQ = "ivf_pq"
+AUTO = "auto"
+
+INDEX_TYPES = (FLAT, IVF_FLAT, HNSW, IVF_PQ)
+
+# k-means wants ~39 training points per centroid, PQ codebooks 256 per sub-quantizer
+MIN_POINTS_PER_CENTROID = 39
+PQ_CODEBOOK_SIZE = 256
+
+
+@dataclass
+class FaissIndexFactory:
+    """
+    Builds the FAISS index used for a bucket of a given size.
+
+    With `index_type="auto"` buckets stay on exact flat search until they reach `ann_threshold`
+    texts, larger ones use `ann_index_type`. Any other `index_type` is used for every bucket.
+    All indexes use the inner product metric, like the flat index they replace.
+    """
+
+    index_type: str = FLAT
+    ann_index_type: str = HNSW
+    ann_threshold: int = 50_000
+    ivf_nlist: int = 0  # 0 picks ~4 * sqrt(n) centroids
+    ivf_nprobe: int = 16
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    pq_m: int = 48
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES + (AUTO,):
+            raise ValueError(f"Unknown FAISS index type: {self.index_type}.")
+        if self.ann_index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS ANN index type: {self.ann_index_type}.")
+
+    @classmethod
+    def from_settings(cls, settings) -> "FaissIndexFactory":
+        return cls(
+            index_type=settings.faiss_index_type,
+            ann_index_type=settings.faiss_ann_index_type,
+            ann_threshold=settings.faiss_ann_threshold,
+            ivf_nlist=settings.faiss_ivf_nlist,
+            ivf_nprobe=settings.faiss_ivf_nprobe,
+            hnsw_m=settings.faiss_hnsw_m,
+            hnsw_ef_construction=settings.faiss_hnsw_ef_construction,
+            hnsw_ef_search=settings.faiss_hnsw_ef_search,
+            pq_m=settings.faiss_pq_m,
+        )
+
+    def index_type_for(self, n_vectors: int) -> str:
+        """
+        Pick the index type for a bucket holding `n_vectors` texts.
+
+        Trained indexes fall back to flat search while there are too few vectors to train them.
+        """
+        index_type = self.index_type
+        if index_type == AUTO:
+            index_type = self.ann_index_type if n_vectors >= self.ann_threshold else FLAT
+        if index_type in (IVF_FLAT, IVF_PQ) and n_vectors < self.min_training_points(index_type):
+            return FLAT
+        return index_type
+
+    def nlist_for(self, n_vectors: int) -> int:
+        nlist = self.ivf_nlist or int(4 * math.sqrt(n_vectors))
+        return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+    def min_training_points(self, index_type: str) -> int:
+        if index_type == IVF_PQ:
+            return PQ_CODEBOOK_SIZE * MIN_POINTS_PER_CENTROID
+        return MIN_POINTS_PER_CENTROID
+
+    def create(self, index_type: str, vectors: np.ndarray) -> faiss.Index:
+        """
+        Create an index of the given type, train it on `vectors` if needed and add them.
+
+        Args:
+            index_type (str): One of `INDEX_TYPES`.
+            vectors (np.ndarray): A (n, dimension) float32 matrix.
+
+        Returns:
+            faiss.Index: The populated index.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        n_vectors, dimension = vectors.shape
+        metric = faiss.METRIC_INNER_PRODUCT
+
+        index: faiss.Index
+        if index_type == FLAT:
+            index = faiss.IndexFlatIP(dimension)
+        elif index_type == HNSW:
+            index = faiss.IndexHNSWFlat(dimension, self.hnsw_m, metric)
+            index.hnsw.efConstruction = self.hnsw_ef_construction
+            index.hnsw.efSearch = self.hnsw_ef_search
+        elif index_type in (IVF_FLAT, IVF_PQ):
+            nlist = self.nlist_for(n_vectors)
+            quantizer = faiss.IndexFlatIP(dimension)
+            if index_type == IVF_FLAT:
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+            else:
+                index = faiss.IndexIVFPQ(quantizer, dimension, nlist, self.pq_m, 8, metric)
+            index.train(vectors)
+            index.nprobe = min(self.ivf_nprobe, nlist)
+        else:
+            raise ValueError(f"Unknown FAISS index type: {index_type}.")
+
+        if n_vectors:
+            index.add(vectors)
+        return index
+
+    def memory_bytes(self, index_type: str, n_vectors: int, dimension: int) -> int:
+        """Approximate resident memory of an index, without serializing it."""
+        if index_type == HNSW:
+            return n_vectors * (dimension * 4 + self.hnsw_m * 2 * 4)
+        if index_type == IVF_FLAT:
+            return n_vectors * (dimension * 4 + 8) + self.nlist_for(n_vectors) * dimension * 4
+        if index_type == IVF_PQ:
+            return (
+                n_vectors * (self.pq_m + 8)
+                + self.nlist_for(n_vectors) * dimension * 4
+                + PQ_CODEBOOK_SIZE * dimension * 4
+            )
+        return n_vectors * dimension * 4
@@ -1,30 +1,107 @@
-from transformers import AutoTokenizer, AutoModel
+from transformers import AutoTokenizer
 import torch
 import numpy as np
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.inference_backends import load_model
+from content_assistant.core.metrics import EMBEDDING_BATCH_SIZE
+from content_assistant.core.model_registry import model_registry, pretrained_kwargs
 
-# Initialize tokenizer and model for embeddings
-tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
-model = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+settings = get_settings()
 
+EMBEDDING_MODEL = "embedding"
+EMBEDDING_DTYPE = np.float32
 
-def embed_text(text: str) -> np.ndarray:
+
+def load_embedding_model():
+    """
+    Loads the tokenizer and model for embeddings.
+    Returns:
+        tuple: The tokenizer and the model.
+    """
+    kwargs = pretrained_kwargs(settings)
+    tokenizer = AutoTokenizer.from_pretrained(settings.embedding_model, **kwargs)
+    model = load_model(
+        "embedding",
+        settings.embedding_model,
+        backend=settings.embedding_inference_backend,
+        onnx_export_dir=settings.onnx_export_dir,
+        **kwargs,
+    )
+    return tokenizer, model
+
+
+def embed_texts(texts: list[str], batch_size: int = 32, normalize: bool = True) -> np.ndarray:
+    """
+    Embeds a list of texts using a transformer model, in batches.
+    Args:
+        texts (list[str]): Texts to be embedded.
+        batch_size (int): The number of texts run through the model at once.
+        normalize (bool): L2-normalize the embeddings, so their inner product is the cosine similarity.
+    Returns:
+        np.ndarray: A contiguous (len(texts), dimension) float32 matrix, in the order of `texts`.
+    """
+    tokenizer, model = model_registry.get(EMBEDDING_MODEL)
+    EMBEDDING_BATCH_SIZE.observe(len(texts))
+    dimension = model.config.hidden_size
+    embeddings = np.empty((len(texts), dimension), dtype=EMBEDDING_DTYPE)
+
+    # Batch texts of similar length together to keep padding to a minimum
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        batch_positions = order[start : start + batch_size]
+        inputs = tokenizer(
+            [texts[i] for i in batch_positions], return_tensors="pt", padding=True, truncation=True
+        )
+
+        with torch.no_grad():
+            model_output = model(**inputs)
+
+        # Mean pooling over the real tokens only, padding positions are masked out
+        mask = inputs["attention_mask"].unsqueeze(-1).to(model_output.last_hidden_state.dtype)
+        summed = (model_output.last_hidden_state * mask).sum(dim=1)
+        pooled = summed / mask.sum(dim=1).clamp(min=1e-9)
+        if normalize:
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+        embeddings[batch_positions] = pooled.cpu().numpy()
+
+    return embeddings
+
+
+def embed_text(text: str, normalize: bool = True) -> np.ndarray:
     """
     Embeds text using a transformer model.
     Args:
         text (str): Text to be embedded.
+        normalize (bool): L2-normalize the embedding.
     Returns:
         np.ndarray: The text embedding.
     """
-    # Tokenize the text
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
+    return embed_texts([text], normalize=normalize)[0]
+
+
+def embedding_to_bytes(embedding: np.ndarray) -> bytes:
+    """
+    Serializes an embedding for storage in the database.
+    Args:
+        embedding (np.ndarray): The text embedding.
+    Returns:
+        bytes: The raw float32 buffer of the embedding.
+    """
+    return np.ascontiguousarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
 
-    # Generate embeddings with the model
-    with torch.no_grad():
-        model_output = model(**inputs)
+def embedding_from_bytes(data: bytes) -> np.ndarray:
+    """
+    Restores an embedding stored with `embedding_to_bytes`.
+    Args:
+        data (bytes): The raw float32 buffer of the embedding.
+    Returns:
+        np.ndarray: The text embedding.
+    """
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
 
-    # Use mean pooling to get a single vector representation of the text
-    # Take the average of the last hidden state across the sequence length axis
-    embeddings = model_output.last_hidden_state.mean(dim=1)
 
-    # Convert the embeddings to a NumPy array and return
-    return embeddings.cpu().numpy().flatten()
+model_registry.register(
+    EMBEDDING_MODEL, load_embedding_model, warm_up=lambda _: embed_texts(["warm up"])
+)
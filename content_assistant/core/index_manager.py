@@ -0,0 +1,264 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+import faiss
+import numpy as np
+import logging
+
+from content_assistant.core.faiss_indexes import FLAT, FaissIndexFactory
+
+logger = logging.getLogger("content_assistant_app")
+
+# (domain, audience, tone) a similarity index is kept for
+BucketKey = tuple[str, str, str]
+
+
+class BucketIndex:
+    """
+    A resident FAISS index over the stored texts of one (domain, audience, tone) bucket.
+
+    FAISS assigns sequential positions to added vectors, `ids` maps them back to TextEntry ids.
+    All index operations are guarded by a lock, so concurrent requests can search and add safely.
+
+    The bucket starts on exact flat search. Once it grows past the size the index factory picks
+    an approximate index for, it is rebuilt once from the flat vectors; from then on the
+    approximate index is updated incrementally.
+
+    A bucket loaded from a snapshot (see core.index_snapshots) searches the snapshot's
+    read-only, possibly memory-mapped index and the texts added since, kept in the regular
+    index, and merges the results.
+    """
+
+    def __init__(self, dimension: int, index_factory: Optional[FaissIndexFactory] = None):
+        self.dimension = dimension
+        self.index_factory = index_factory or FaissIndexFactory()
+        self.index_type = FLAT
+        self.index = self.index_factory.create(FLAT, np.empty((0, dimension), dtype="float32"))
+        self.ids: list[int] = []
+        self._known_ids: set[int] = set()
+        # Highest TextEntry id up to which the bucket was read from the database. Texts saved by
+        # this process are added directly and do not advance it, so texts of other replicas with
+        # lower ids are still picked up
+        self.synced_id = 0
+        # Read-only index of a snapshot, the TextEntry id of each of its positions, its type and
+        # the highest TextEntry id it was read up to
+        self.snapshot_index: Optional[faiss.Index] = None
+        self.snapshot_ids: np.ndarray = np.empty(0, dtype="int64")
+        self.snapshot_type = FLAT
+        self.snapshot_synced_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        dimension: int,
+        index_factory: Optional[FaissIndexFactory],
+        index,
+        ids: np.ndarray,
+        index_type: str,
+        synced_id: int,
+    ) -> "BucketIndex":
+        """
+        Create a bucket index on top of a snapshot covering the texts up to `synced_id`.
+
+        Args:
+            dimension (int): The embedding dimension.
+            index_factory (FaissIndexFactory, optional): Builds the index of newer texts.
+            index (faiss.Index): The snapshot's index, not modified.
+            ids (np.ndarray): The TextEntry id of each position of `index`.
+            index_type (str): The type of `index`.
+            synced_id (int): The highest TextEntry id the snapshot was read up to.
+
+        Returns:
+            BucketIndex: The bucket index, to be synchronized from `synced_id` on.
+        """
+        bucket_index = cls(dimension, index_factory)
+        bucket_index.snapshot_index = index
+        bucket_index.snapshot_ids = ids
+        bucket_index.snapshot_type = index_type
+        bucket_index.snapshot_synced_id = synced_id
+        bucket_index.synced_id = synced_id
+        return bucket_index
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.snapshot_ids)
+
+    def __contains__(self, text_id: int) -> bool:
+        # Texts up to the snapshot's synced id are in the snapshot, or were committed too late
+        # for it and are never read, like any text below synced_id
+        return text_id in self._known_ids or (
+            self.snapshot_index is not None and text_id <= self.snapshot_synced_id
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate resident memory of the indexes and the id mappings."""
+        memory_bytes = (
+            self.index_factory.memory_bytes(self.index_type, len(self.ids), self.dimension)
+            + len(self.ids) * 8
+        )
+        if self.snapshot_index is not None:
+            # Memory-mapped pages are shared with the other workers of the host, but count them
+            memory_bytes += (
+                self.index_factory.memory_bytes(
+                    self.snapshot_type, len(self.snapshot_ids), self.dimension
+                )
+                + len(self.snapshot_ids) * 8
+            )
+        return memory_bytes
+
+    def add(self, ids: Iterable, embeddings: np.ndarray):
+        """
+        Add embeddings of texts that are not indexed yet.
+
+        Args:
+            ids (Iterable[int]): The TextEntry ids, in the order of `embeddings` rows.
+            embeddings (np.ndarray): A (len(ids), dimension) matrix of embeddings.
+        """
+        ids = list(ids)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32").reshape(-1, self.dimension)
+        with self._lock:
+            new_rows = [i for i, text_id in enumerate(ids) if text_id not in self]
+            if not new_rows:
+                return
+            vectors = embeddings[new_rows]
+            index_type = self.index_factory.index_type_for(len(self.ids) + len(new_rows))
+            if self.index_type == FLAT and index_type != FLAT:
+                # Approximate indexes are trained on the whole bucket, flat vectors included
+                if self.index.ntotal:
+                    vectors = np.vstack([self.index.reconstruct_n(0, self.index.ntotal), vectors])
+                self.index = self.index_factory.create(index_type, vectors)
+                self.index_type = index_type
+                logger.info(f"Switched bucket index to {index_type} at {self.index.ntotal} texts.")
+            else:
+                self.index.add(vectors)
+            for i in new_rows:
+                self.ids.append(ids[i])
+                self._known_ids.add(ids[i])
+
+    def mark_synced(self, text_id: int):
+        """Record that the bucket's stored texts were read from the database up to `text_id`."""
+        with self._lock:
+            self.synced_id = max(self.synced_id, text_id)
+
+    def search(self, query_embedding: np.ndarray, k: int = 1) -> list[tuple[int, float]]:
+        """
+        Find the texts closest to the query embedding.
+
+        Args:
+            query_embedding (np.ndarray): The embedding of the query.
+            k (int): The number of neighbours to return.
+
+        Returns:
+            list[tuple[int, float]]: (TextEntry id, inner product score) pairs, best first.
+        """
+        query = np.ascontiguousarray(query_embedding, dtype="float32").reshape(1, self.dimension)
+        results: list[tuple[int, float]] = []
+        with self._lock:
+            if self.ids:
+                distances, positions = self.index.search(query, min(k, len(self.ids)))
+                results.extend(
+                    (self.ids[position], float(distance))
+                    for distance, position in zip(distances[0], positions[0])
+                    if position >= 0
+                )
+            if self.snapshot_index is not None and len(self.snapshot_ids):
+                distances, positions = self.snapshot_index.search(
+                    query, min(k, len(self.snapshot_ids))
+                )
+                results.extend(
+                    (int(self.snapshot_ids[position]), float(distance))
+                    for distance, position in zip(distances[0], positions[0])
+                    if position >= 0
+                )
+        return sorted(results, key=lambda result: result[1], reverse=True)[:k]
+
+
+class FaissIndexManager:
+    """
+    Keeps one resident BucketIndex per (domain, audience, tone) bucket.
+
+    Buckets are kept in least-recently-used order and the coldest ones are evicted once the
+    total index memory exceeds the configured budget. An evicted bucket is rebuilt from the
+    stored embeddings the next time it is requested, on top of its snapshot if `load_snapshot`
+    returns one.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        memory_budget_bytes: int,
+        index_factory: Optional[FaissIndexFactory] = None,
+        load_snapshot: Optional[Callable[[BucketKey], Optional[BucketIndex]]] = None,
+    ):
+        self.dimension = dimension
+        self.memory_budget_bytes = memory_budget_bytes
+        self.index_factory = index_factory or FaissIndexFactory()
+        self.load_snapshot = load_snapshot
+        self._indexes: OrderedDict[BucketKey, BucketIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(bucket_index.memory_bytes for bucket_index in list(self._indexes.values()))
+
+    def get(self, bucket: BucketKey) -> Optional[BucketIndex]:
+        """Return the resident index of a bucket, marking it as recently used."""
+        with self._lock:
+            bucket_index = self._indexes.get(bucket)
+            if bucket_index is not None:
+                self._indexes.move_to_end(bucket)
+            return bucket_index
+
+    def get_or_create(self, bucket: BucketKey) -> BucketIndex:
+        """
+        Return the resident index of a bucket, creating one if needed.
+
+        A new index starts from the bucket's snapshot if there is one, otherwise empty. Loading a
+        snapshot reads from disk, so call this from a worker thread for non-resident buckets.
+        """
+        with self._lock:
+            bucket_index = self._indexes.get(bucket)
+            if bucket_index is not None:
+                self._indexes.move_to_end(bucket)
+                return bucket_index
+
+        # Snapshots are loaded without holding the lock, other buckets stay available
+        bucket_index = self.load_snapshot(bucket) if self.load_snapshot is not None else None
+        if bucket_index is None:
+            bucket_index = BucketIndex(self.dimension, self.index_factory)
+            logger.debug(f"Created FAISS index for bucket {bucket}.")
+        with self._lock:
+            # Another thread may have created it meanwhile, keep the first one
+            bucket_index = self._indexes.setdefault(bucket, bucket_index)
+            self._indexes.move_to_end(bucket)
+            return bucket_index
+
+    def add(self, bucket: BucketKey, ids: Iterable, embeddings: np.ndarray):
+        """
+        Add new texts to a bucket index if the bucket is resident.
+
+        Non-resident buckets are left alone, they are built with all stored texts on next use.
+        """
+        bucket_index = self.get(bucket)
+        if bucket_index is not None:
+            bucket_index.add(ids, embeddings)
+            self.evict()
+
+    def evict(self):
+        """Drop least-recently-used buckets until the memory budget is met."""
+        with self._lock:
+            total = sum(bucket_index.memory_bytes for bucket_index in self._indexes.values())
+            # Never evict the most recently used bucket, it is the one being served
+            while total > self.memory_budget_bytes and len(self._indexes) > 1:
+                bucket, bucket_index = self._indexes.popitem(last=False)
+                total -= bucket_index.memory_bytes
+                logger.info(f"Evicted FAISS index for bucket {bucket} ({len(bucket_index)} texts).")
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
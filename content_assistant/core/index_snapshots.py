@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from content_assistant.core.faiss_indexes import HNSW, IVF_FLAT, IVF_PQ, FaissIndexFactory
+from content_assistant.core.index_manager import BucketIndex, BucketKey
+
+logger = logging.getLogger("content_assistant_app")
+
+# Bumped when the snapshot layout changes, older snapshots are ignored
+SNAPSHOT_FORMAT_VERSION = 1
+LATEST = "latest.json"
+
+
+class IndexSnapshotStore:
+    """
+    Per-bucket snapshots of the resident FAISS indexes in a local directory.
+
+    Each bucket has a directory with one subdirectory per snapshot, named after the highest
+    TextEntry id the snapshot covers, holding the serialized index (`index.faiss`), the TextEntry
+    id of each index position (`ids.npy`) and `meta.json`. `latest.json` names the newest
+    complete snapshot and is replaced atomically, so readers never see a partial one.
+
+    Snapshots are loaded with memory-mapping where FAISS supports it (the inverted lists of IVF
+    indexes, and the id arrays), so the workers of a host share these pages instead of each
+    holding a copy. Other index types are read into memory, which still avoids reading the
+    bucket from the database and rebuilding the index.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        index_factory: Optional[FaissIndexFactory] = None,
+        mmap: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.index_factory = index_factory or FaissIndexFactory()
+        self.mmap = mmap
+
+    def bucket_directory(self, bucket: BucketKey) -> Path:
+        bucket_hash = hashlib.sha256(json.dumps(list(bucket)).encode("utf-8")).hexdigest()
+        return self.directory / bucket_hash[:32]
+
+    def save(self, bucket: BucketKey, bucket_index: BucketIndex) -> Path:
+        """
+        Write a snapshot of a bucket index built without a snapshot, e.g. from the database.
+
+        Args:
+            bucket (BucketKey): The (domain, audience, tone) bucket of the index.
+            bucket_index (BucketIndex): The index, synchronized up to its `synced_id`.
+
+        Returns:
+            Path: The directory of the snapshot.
+
+        Raises:
+            ValueError: If the bucket index is itself based on a snapshot.
+        """
+        if bucket_index.snapshot_index is not None:
+            raise ValueError("Snapshots are written from bucket indexes built from the database.")
+
+        bucket_directory = self.bucket_directory(bucket)
+        bucket_directory.mkdir(parents=True, exist_ok=True)
+        snapshot_directory = bucket_directory / f"{bucket_index.synced_id:012d}"
+        staging_directory = Path(tempfile.mkdtemp(prefix=".staging-", dir=bucket_directory))
+        try:
+            faiss.write_index(bucket_index.index, str(staging_directory / "index.faiss"))
+            np.save(staging_directory / "ids.npy", np.asarray(bucket_index.ids, dtype="int64"))
+            meta = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "bucket": list(bucket),
+                "dimension": bucket_index.dimension,
+                "index_type": bucket_index.index_type,
+                "synced_id": bucket_index.synced_id,
+                "count": len(bucket_index),
+            }
+            (staging_directory / "meta.json").write_text(json.dumps(meta))
+            if snapshot_directory.exists():
+                shutil.rmtree(snapshot_directory)
+            os.rename(staging_directory, snapshot_directory)
+        except BaseException:
+            shutil.rmtree(staging_directory, ignore_errors=True)
+            raise
+
+        latest_path = bucket_directory / LATEST
+        staging_latest = bucket_directory / f".{LATEST}.staging"
+        staging_latest.write_text(json.dumps({"snapshot": snapshot_directory.name}))
+        os.replace(staging_latest, latest_path)
+
+        # Files still mapped by running workers stay readable after they are unlinked
+        for path in bucket_directory.iterdir():
+            if path.is_dir() and path != snapshot_directory and not path.name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+        logger.info(
+            f"Saved FAISS snapshot of bucket {bucket} with {len(bucket_index)} texts up to id "
+            f"{bucket_index.synced_id}."
+        )
+        return snapshot_directory
+
+    def load(self, bucket: BucketKey) -> Optional[BucketIndex]:
+        """
+        Load the latest snapshot of a bucket.
+
+        Args:
+            bucket (BucketKey): The (domain, audience, tone) bucket.
+
+        Returns:
+            BucketIndex or None: A bucket index on top of the snapshot, to be synchronized with
+                the texts stored since, or None if there is no usable snapshot.
+        """
+        bucket_directory = self.bucket_directory(bucket)
+        try:
+            latest = json.loads((bucket_directory / LATEST).read_text())
+        except FileNotFoundError:
+            return None
+
+        snapshot_directory = bucket_directory / latest["snapshot"]
+        try:
+            meta = json.loads((snapshot_directory / "meta.json").read_text())
+            if meta["format_version"] != SNAPSHOT_FORMAT_VERSION or meta["bucket"] != list(bucket):
+                logger.warning(f"Ignoring the incompatible FAISS snapshot of bucket {bucket}.")
+                return None
+            if meta["dimension"] != self.dimension:
+                logger.warning(f"Ignoring the FAISS snapshot of bucket {bucket}: wrong dimension.")
+                return None
+
+            index_type = meta["index_type"]
+            io_flags = faiss.IO_FLAG_MMAP if self.mmap and index_type in (IVF_FLAT, IVF_PQ) else 0
+            index = faiss.read_index(str(snapshot_directory / "index.faiss"), io_flags)
+            ids = np.load(snapshot_directory / "ids.npy", mmap_mode="r" if self.mmap else None)
+        except Exception as e:
+            # E.g. removed by a newer snapshot while reading, the bucket is read from the database
+            logger.warning(f"Failed to load the FAISS snapshot of bucket {bucket}: {str(e)}")
+            return None
+
+        # Search settings are not part of the snapshot, apply the current ones
+        if index_type == HNSW:
+            index.hnsw.efSearch = self.index_factory.hnsw_ef_search
+        elif index_type in (IVF_FLAT, IVF_PQ):
+            index.nprobe = min(self.index_factory.ivf_nprobe, index.nlist)
+
+        logger.info(
+            f"Loaded FAISS snapshot of bucket {bucket} with {len(ids)} texts up to id "
+            f"{meta['synced_id']}."
+        )
+        return BucketIndex.from_snapshot(
+            self.dimension, self.index_factory, index, ids, index_type, meta["synced_id"]
+        )
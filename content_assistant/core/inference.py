@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from content_assistant.core.exceptions import ServiceOverloadedError
+
+logger = logging.getLogger("content_assistant_app")
+
+T = TypeVar("T")
+
+# Priority classes of model calls, lower values are served first
+INTERACTIVE = 0
+BULK = 1
+PRIORITIES = (INTERACTIVE, BULK)
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model inference in a dedicated thread pool, off the event loop.
+
+    At most `max_workers` calls run at once and at most `max_queue_size` more interactive calls
+    wait for a free worker. Interactive calls beyond that are rejected right away with
+    ServiceOverloadedError, so a busy replica answers quickly instead of piling up requests it
+    cannot serve in time. PyTorch and FAISS release the GIL in their kernels, so threads keep
+    `/health` and DB work responsive without duplicating the models like a process pool would.
+
+    Waiting calls get a free worker by priority class: bulk calls only run when no interactive
+    call waits, so bulk work cannot delay interactive requests by more than the calls already
+    running. Bulk calls are not rejected; each bulk request has one call in flight at a time
+    and they are limited by admission control instead.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._in_flight = {priority: 0 for priority in PRIORITIES}
+        self._running = 0
+        self._waiters: dict[int, deque[asyncio.Future]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls running or waiting for a worker."""
+        return sum(self._in_flight.values())
+
+    @property
+    def queued(self) -> int:
+        """The number of calls waiting for a worker."""
+        return self.in_flight - self._running
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run `func(*args, **kwargs)` as an interactive call in the inference thread pool and await
+        its result.
+
+        Raises:
+            ServiceOverloadedError: If the workers are busy and the queue is full.
+        """
+        return await self.run_with_priority(INTERACTIVE, func, *args, **kwargs)
+
+    async def run_with_priority(
+        self, priority: int, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        """
+        Run `func(*args, **kwargs)` in the inference thread pool with a priority class.
+
+        Raises:
+            ServiceOverloadedError: If the priority is INTERACTIVE, the workers are busy and the
+                queue is full.
+        """
+        self._admit(priority)
+        try:
+            return await self._run_on_worker(priority, func, *args, **kwargs)
+        finally:
+            self._leave(priority)
+
+    def submit(
+        self, priority: int, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> "asyncio.Future[T]":
+        """
+        Start `func(*args, **kwargs)` like `run_with_priority`, without waiting for its result.
+
+        The call is admitted before this returns, so a full queue is reported before the caller
+        commits to a response, e.g. before the headers of a stream are sent.
+
+        Returns:
+            asyncio.Future: The result of the call.
+
+        Raises:
+            ServiceOverloadedError: If the priority is INTERACTIVE, the workers are busy and the
+                queue is full.
+        """
+        self._admit(priority)
+        call = asyncio.ensure_future(self._run_on_worker(priority, func, *args, **kwargs))
+        # Also left when the call is cancelled before it starts
+        call.add_done_callback(lambda _: self._leave(priority))
+        return call
+
+    def _admit(self, priority: int):
+        if (
+            priority == INTERACTIVE
+            and self._in_flight[INTERACTIVE] >= self.max_workers + self.max_queue_size
+        ):
+            logger.warning(f"Inference queue is full ({self.in_flight} calls), rejecting call.")
+            raise ServiceOverloadedError(
+                context={"reason": "The inference queue is full, retry later."}
+            )
+        self._in_flight[priority] += 1
+
+    def _leave(self, priority: int):
+        self._in_flight[priority] -= 1
+
+    async def _run_on_worker(
+        self, priority: int, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        await self._acquire_worker(priority)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self._release_worker()
+
+    async def _acquire_worker(self, priority: int):
+        if self._running < self.max_workers and not any(self._waiters.values()):
+            self._running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            # Resolved by _release_worker, which hands its worker over
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled after the worker was handed over, pass it on
+                self._release_worker()
+            elif waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+            raise
+
+    def _release_worker(self):
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._running -= 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use, so the executor can be used again after a shutdown
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,96 @@
+"""
+Inference backends the embedding and generation models can be loaded with.
+
+- `pytorch`: the fp32 PyTorch model.
+- `quantized`: the PyTorch model with its linear layers dynamically quantized to int8, which
+  roughly halves the model memory and speeds up CPU inference.
+- `onnx`: the model exported to an ONNX graph and run with ONNX Runtime. Requires the optional
+  `optimum[onnxruntime]` package.
+
+Compare them on your hardware with `python -m benchmarks.inference_backends`.
+"""
+
+import logging
+import os
+from typing import Any, Optional
+
+import torch
+from transformers import AutoModel, AutoModelForSeq2SeqLM
+
+logger = logging.getLogger("content_assistant_app")
+
+PYTORCH = "pytorch"
+QUANTIZED = "quantized"
+ONNX = "onnx"
+INFERENCE_BACKENDS = (PYTORCH, QUANTIZED, ONNX)
+
+
+def _onnx_model_class(task: str):
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise RuntimeError(
+            "The onnx inference backend requires the `optimum[onnxruntime]` package."
+        ) from e
+    return ORTModelForFeatureExtraction if task == "embedding" else ORTModelForSeq2SeqLM
+
+
+def _load_onnx(
+    task: str, model_name: str, export_dir: Optional[str], **pretrained_kwargs: Any
+) -> Any:
+    model_class = _onnx_model_class(task)
+    export_path = os.path.join(export_dir, model_name.replace("/", "--")) if export_dir else None
+    if export_path and os.path.isdir(export_path):
+        return model_class.from_pretrained(export_path)
+
+    # Exporting takes a while, keep the graph when there is a place to keep it
+    logger.info(f"Exporting {model_name} to ONNX.")
+    model = model_class.from_pretrained(model_name, export=True, **pretrained_kwargs)
+    if export_path:
+        model.save_pretrained(export_path)
+    return model
+
+
+def _quantize(model: torch.nn.Module) -> torch.nn.Module:
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_model(
+    task: str,
+    model_name: str,
+    backend: str = PYTORCH,
+    onnx_export_dir: Optional[str] = None,
+    **pretrained_kwargs: Any,
+) -> Any:
+    """
+    Load a model with an inference backend.
+
+    Args:
+        task (str): "embedding" for an encoder returning hidden states, "generation" for a
+            sequence-to-sequence model.
+        model_name (str): The hub name or local path of the model.
+        backend (str): One of INFERENCE_BACKENDS.
+        onnx_export_dir (str, optional): Where exported ONNX graphs are stored and loaded from,
+            so a model is only exported once. Without it the model is exported on every load.
+        **pretrained_kwargs: Arguments passed on to `from_pretrained`.
+
+    Returns:
+        The model, called and used for `generate` like the PyTorch model.
+
+    Raises:
+        ValueError: If the task or backend is unknown.
+        RuntimeError: If the backend's optional dependency is missing.
+    """
+    if task not in ("embedding", "generation"):
+        raise ValueError(f"Unknown model task: {task}.")
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}.")
+
+    if backend == ONNX:
+        return _load_onnx(task, model_name, onnx_export_dir, **pretrained_kwargs)
+
+    model_class = AutoModel if task == "embedding" else AutoModelForSeq2SeqLM
+    model = model_class.from_pretrained(model_name, **pretrained_kwargs)
+    if backend == QUANTIZED:
+        model = _quantize(model)
+    return model
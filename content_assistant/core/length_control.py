@@ -0,0 +1,107 @@
+import math
+import threading
+import time
+from typing import Any, Optional
+
+from transformers import StoppingCriteria
+
+# Sentence endings after which a text that reached its word count may stop
+SENTENCE_ENDINGS = (".", "!", "?", '"')
+
+
+class TokensPerWordEstimator:
+    """
+    Estimates how many tokens the generation model needs per word of text, per domain.
+
+    Estimates are calibrated from stored texts of the domain and refreshed after
+    `refresh_seconds`; domains without one use `default_tokens_per_word`. The decode budget of a
+    request is the token count of its word count plus `tolerance`, plus `margin_tokens` for
+    punctuation and the end-of-sequence token.
+    """
+
+    def __init__(
+        self,
+        default_tokens_per_word: float = 1.5,
+        tolerance: float = 0.2,
+        margin_tokens: int = 8,
+        refresh_seconds: float = 3600,
+    ):
+        self.default_tokens_per_word = default_tokens_per_word
+        self.tolerance = tolerance
+        self.margin_tokens = margin_tokens
+        self.refresh_seconds = refresh_seconds
+        # domain -> (tokens per word, calibrated at)
+        self._estimates: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def tokens_per_word(self, domain: Optional[str] = None) -> float:
+        with self._lock:
+            estimate = self._estimates.get(domain) if domain is not None else None
+        return estimate[0] if estimate is not None else self.default_tokens_per_word
+
+    def needs_calibration(self, domain: str) -> bool:
+        with self._lock:
+            estimate = self._estimates.get(domain)
+        return estimate is None or time.monotonic() - estimate[1] > self.refresh_seconds
+
+    def calibrate(self, domain: str, token_counts: list[int], word_counts: list[int]):
+        """
+        Set the estimate of a domain from the token and word counts of stored texts.
+
+        Without any words the domain keeps the default, and is calibrated again after
+        `refresh_seconds`.
+        """
+        total_words = sum(word_counts)
+        tokens_per_word = (
+            sum(token_counts) / total_words if total_words else self.default_tokens_per_word
+        )
+        with self._lock:
+            self._estimates[domain] = (tokens_per_word, time.monotonic())
+
+    def max_new_tokens(self, word_count: int, domain: Optional[str] = None) -> int:
+        """The decode budget of a text of `word_count` words."""
+        max_words = word_count * (1 + self.tolerance)
+        return math.ceil(max_words * self.tokens_per_word(domain)) + self.margin_tokens
+
+
+class WordCountStoppingCriteria(StoppingCriteria):
+    """
+    Stops generation once every sequence of the batch has ended or is long enough.
+
+    A sequence is long enough with `tolerance` more words than its prompt's word count, or with
+    the word count when its text ends a sentence. Sequences that produced the end-of-sequence
+    token have ended. The `num_return_sequences` sequences of a prompt follow each other, as
+    `generate` orders them.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        word_counts: list[int],
+        tolerance: float = 0.2,
+        num_return_sequences: int = 1,
+    ):
+        self.tokenizer = tokenizer
+        self.word_counts = word_counts
+        self.tolerance = tolerance
+        self.num_return_sequences = num_return_sequences
+
+    def is_long_enough(self, text: str, word_count: int) -> bool:
+        words = len(text.split())
+        return words >= math.ceil(word_count * (1 + self.tolerance)) or (
+            words >= word_count and text.rstrip().endswith(SENTENCE_ENDINGS)
+        )
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        eos_token_id = self.tokenizer.eos_token_id
+        for position, sequence in enumerate(input_ids):
+            if eos_token_id is not None and (sequence == eos_token_id).any():
+                continue
+            word_count = self.word_counts[position // self.num_return_sequences]
+            # Words take at least one token each, skip decoding sequences that are too short
+            if len(sequence) < word_count:
+                return False
+            text = self.tokenizer.decode(sequence, skip_special_tokens=True)
+            if not self.is_long_enough(text, word_count):
+                return False
+        return True
@@ -0,0 +1,212 @@
+import asyncio
+import contextlib
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# With several worker processes (gunicorn), each writes its metrics to files in this directory
+# and /metrics reports the metrics of all of them; it has to be set before the app starts
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+GENERATION_BATCH_SIZE = Histogram(
+    "content_assistant_generation_batch_size",
+    "Number of prompts decoded together in one generation call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+GENERATION_QUEUE_WAIT_SECONDS = Histogram(
+    "content_assistant_generation_queue_wait_seconds",
+    "Time a prompt waited for its generation batch to be dispatched.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+RESPONSE_CACHE_HITS = Counter(
+    "content_assistant_response_cache_hits_total",
+    "Generation requests answered from the response cache.",
+    ["tier"],
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "content_assistant_admission_rejections_total",
+    "Generation requests rejected with 429 because their tenant's budget was used up.",
+    ["priority"],
+)
+
+COALESCED_REQUESTS = Counter(
+    "content_assistant_coalesced_requests_total",
+    "Generation requests answered by the pipeline run of an identical concurrent request.",
+)
+
+STAGE_SECONDS = Histogram(
+    "content_assistant_stage_seconds",
+    "Time spent in each stage of a generation request.",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "content_assistant_embedding_batch_size",
+    "Number of texts embedded in one call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024),
+)
+
+SEARCHED_INDEX_SIZE = Histogram(
+    "content_assistant_searched_index_size",
+    "Number of texts in the bucket index a similarity search ran on.",
+    buckets=(0, 10, 100, 1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000),
+)
+
+RETRIEVED_TEXTS = Histogram(
+    "content_assistant_retrieved_texts",
+    "Number of stored texts a generation improved upon, 0 when it wrote a new text.",
+    buckets=(0, 1, 2, 3, 5),
+)
+
+GENERATION_ATTEMPTS = Histogram(
+    "content_assistant_generation_attempts",
+    "Number of generations needed to get a text the database did not already contain.",
+    buckets=(1, 2, 3, 4, 5),
+)
+
+GENERATED_TOKENS = Histogram(
+    "content_assistant_generated_tokens",
+    "Number of tokens of a generated text.",
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024),
+)
+
+GENERATION_TOKENS_PER_SECOND = Histogram(
+    "content_assistant_generation_tokens_per_second",
+    "Tokens generated per second by one generation call, over all texts of its batch.",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+INFERENCE_IN_FLIGHT = Gauge(
+    "content_assistant_inference_in_flight",
+    "Model calls running or waiting for an inference worker.",
+    multiprocess_mode="livesum",
+)
+
+INFERENCE_QUEUED = Gauge(
+    "content_assistant_inference_queued",
+    "Model calls waiting for an inference worker.",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "content_assistant_db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SIZE = Gauge(
+    "content_assistant_db_pool_size",
+    "Database connections currently held by the pool, checked out or idle.",
+    multiprocess_mode="livesum",
+)
+
+FAISS_INDEX_MEMORY_BYTES = Gauge(
+    "content_assistant_faiss_index_memory_bytes",
+    "Approximate memory of the resident FAISS indexes.",
+    multiprocess_mode="livesum",
+)
+
+FAISS_INDEX_BUCKETS = Gauge(
+    "content_assistant_faiss_index_buckets",
+    "Number of resident per-bucket FAISS indexes.",
+    multiprocess_mode="livesum",
+)
+
+WRITE_BEHIND_QUEUED = Gauge(
+    "content_assistant_write_behind_queued",
+    "Generated texts returned to clients but not saved to the database yet.",
+    multiprocess_mode="livesum",
+)
+
+WRITE_BEHIND_BATCH_SIZE = Histogram(
+    "content_assistant_write_behind_batch_size",
+    "Number of generated texts saved together by the write-behind worker.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+WRITE_BEHIND_FAILURES = Counter(
+    "content_assistant_write_behind_failures_total",
+    "Failed attempts of the write-behind worker to save a batch of generated texts.",
+)
+
+INDEX_FRESHNESS_LAG_SECONDS = Histogram(
+    "content_assistant_index_freshness_lag_seconds",
+    "Time from a generated text being queued for saving to it being searchable in its index.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# Stage timings of the current request, collected only when Server-Timing is enabled
+_server_timings: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+# Gauges reported from a function of the process state, see set_gauge_function
+_gauge_functions: list[tuple[Gauge, Callable[[], float]]] = []
+
+
+def set_gauge_function(gauge: Gauge, function: Callable[[], float]):
+    """
+    Report the value of `function()` as the gauge's value.
+
+    A single process calls the function when it is scraped. In multiprocess mode the metrics
+    of other workers are read from their files, so the values are written there by
+    update_gauges instead, and summed over the live workers.
+    """
+    if MULTIPROCESS:
+        _gauge_functions.append((gauge, function))
+    else:
+        gauge.set_function(function)
+
+
+def update_gauges():
+    """Write the current values of the gauges of set_gauge_function, in multiprocess mode."""
+    for gauge, function in _gauge_functions:
+        gauge.set(function())
+
+
+async def update_gauges_periodically(interval_seconds: float):
+    """Keep the gauges of a worker current in multiprocess mode, until cancelled."""
+    while True:
+        update_gauges()
+        await asyncio.sleep(interval_seconds)
+
+
+@contextlib.contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    Time a stage of the request in STAGE_SECONDS and, if enabled, its Server-Timing header.
+
+    Use it on the event loop side: executor threads do not see the request's context.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        timings = _server_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def collect_server_timings() -> list[tuple[str, float]]:
+    """Start collecting the stage timings of the current request and return them."""
+    timings: list[tuple[str, float]] = []
+    _server_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: list[tuple[str, float]]) -> str:
+    """Format stage timings as a Server-Timing header value, repeated stages are summed."""
+    totals: dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
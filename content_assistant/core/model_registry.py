@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("content_assistant_app")
+
+
+class ModelRegistry:
+    """
+    Loads the models of the process once, on first use or all at once at startup.
+
+    Models are registered with a loader and an optional warm-up call, nothing is loaded at
+    import time. Concurrent first uses of a model wait for a single load instead of loading it
+    several times. `ready` is set once `load_all` loaded (and warmed up) every model, so a
+    replica can report itself as not ready while it is still cold.
+    """
+
+    def __init__(self):
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._warm_ups: dict[str, Callable[[Any], Any]] = {}
+        self._models: dict[str, Any] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self.ready = False
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warm_up: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        Register how to load a model.
+
+        Args:
+            name (str): The name the model is retrieved with.
+            loader (Callable[[], Any]): Loads and returns the model.
+            warm_up (Callable[[Any], Any], optional): Runs a throwaway inference on the loaded
+                model, so the first request does not pay for lazy initialization.
+        """
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+        if warm_up is not None:
+            self._warm_ups[name] = warm_up
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """
+        Return a model, loading it first if needed.
+
+        Raises:
+            KeyError: If no model is registered under `name`.
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._locks[name]:
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                logger.info(f"Loaded model {name} in {time.perf_counter() - started:.1f}s.")
+            return self._models[name]
+
+    def load(self):
+        """Load every registered model, without warming it up or marking the registry ready."""
+        for name in self._loaders:
+            self.get(name)
+
+    def load_all(self, warm_up: bool = True):
+        """
+        Load every registered model and mark the registry as ready.
+
+        Args:
+            warm_up (bool): Run the warm-up call of every model after loading it.
+        """
+        self.load()
+        for name in self._loaders:
+            model = self.get(name)
+            if warm_up and name in self._warm_ups:
+                started = time.perf_counter()
+                self._warm_ups[name](model)
+                logger.info(f"Warmed up model {name} in {time.perf_counter() - started:.1f}s.")
+        self.ready = True
+
+
+model_registry = ModelRegistry()
+
+
+def pretrained_kwargs(settings) -> dict[str, Any]:
+    """Arguments of `from_pretrained` for the configured cache directory and offline mode."""
+    # In offline mode models are only read from a local path or the cache directory
+    return {"cache_dir": settings.model_cache_dir, "local_files_only": settings.model_offline}
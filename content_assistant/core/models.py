@@ -1,12 +1,50 @@
-from sqlalchemy import Column, Integer, String, Text, UniqueConstraint
-from sqlalchemy.orm import DeclarativeBase
+import hashlib
+
+from sqlalchemy import Column, FetchedValue, Integer, LargeBinary, String, Text, cast
+from sqlalchemy.orm import DeclarativeBase, deferred
 from sqlalchemy.schema import Index
+from sqlalchemy.types import UserDefinedType
+
+EMBEDDING_DIMENSION = 384
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class Vector(UserDefinedType):
+    """
+    A pgvector `vector` column, bound as its text representation.
+
+    Values are sent as text and cast server-side, so no pgvector client package or asyncpg
+    codec is needed.
+    """
+
+    cache_ok = True
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_col_spec(self, **kw):
+        return f"VECTOR({self.dimension})"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return "[" + ",".join(str(float(component)) for component in value) + "]"
+
+        return process
+
+    def bind_expression(self, bindvalue):
+        return cast(cast(bindvalue, Text), self)
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a text content, used to detect duplicates in the database."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
 class TextEntry(Base):
     __tablename__ = "texts"
     id = Column(Integer, primary_key=True, index=True)
@@ -14,8 +52,19 @@ class TextEntry(Base):
     content = Column(Text, nullable=False)
     audience = Column(String)
     tone = Column(String)
+    # float32 buffer of the content embedding, see core.generator.embedding_to_bytes
+    embedding = Column(LargeBinary, nullable=True)
+    # See content_hash, inserts skip texts that already exist in their bucket
+    content_hash = Column(String(64), nullable=False)
+    # Copy of the embedding for retrieval_backend=pgvector. It exists only when the pgvector
+    # extension was available to the migration, so it is neither loaded nor inserted by default
+    embedding_vector = deferred(
+        Column(Vector(EMBEDDING_DIMENSION), nullable=True, server_default=FetchedValue())
+    )
 
     __table_args__ = (
-        UniqueConstraint("content", "domain", "audience", "tone", name="unique_text_entry"),
+        Index("unique_text_entry_hash", "content_hash", "domain", "audience", "tone", unique=True),
         Index("idx_domain_audience_tone", "domain", "audience", "tone"),
     )
+    # Do not fetch embedding_vector back after inserts
+    __mapper_args__ = {"eager_defaults": False}
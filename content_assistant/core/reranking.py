@@ -0,0 +1,89 @@
+import re
+from typing import Optional
+
+from content_assistant.core.index_manager import BucketKey
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def words(text: str) -> set[str]:
+    """The distinct lowercase words of a text."""
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def keyword_overlap(keywords: list[str], text: str) -> float:
+    """
+    The share of the request's keyword words that occur in a text.
+
+    Args:
+        keywords (list[str]): The keywords of the request, possibly of several words each.
+        text (str): A retrieved text.
+
+    Returns:
+        float: Between 0 (no keyword word occurs) and 1 (all do).
+    """
+    keyword_words = words(" ".join(keywords))
+    if not keyword_words:
+        return 0.0
+    return len(keyword_words & words(text)) / len(keyword_words)
+
+
+def max_relevance(similarity: float, lexical_weight: float) -> float:
+    """The relevance a text of this similarity reaches if it contains all keywords, see rerank."""
+    return (1 - lexical_weight) * similarity + lexical_weight
+
+
+def similarity_threshold_for(
+    bucket: BucketKey, default: float, bucket_thresholds: Optional[dict[str, float]] = None
+) -> float:
+    """
+    The minimum relevance of a retrieved text of a bucket to be reused.
+
+    Args:
+        bucket (BucketKey): The (domain, audience, tone) bucket.
+        default (float): The threshold of buckets without their own.
+        bucket_thresholds (dict[str, float], optional): Thresholds by "domain:audience:tone",
+            or by "domain" for every bucket of a domain.
+
+    Returns:
+        float: The threshold of the bucket.
+    """
+    bucket_thresholds = bucket_thresholds or {}
+    domain = bucket[0]
+    return bucket_thresholds.get(":".join(bucket), bucket_thresholds.get(domain, default))
+
+
+def rerank(
+    keywords: list[str],
+    candidates: list[tuple[str, float]],
+    threshold: float,
+    lexical_weight: float = 0.0,
+    limit: int = 1,
+) -> list[str]:
+    """
+    Pick the retrieved texts to improve upon, most relevant first.
+
+    The relevance of a candidate blends its embedding similarity with the overlap of its words
+    with the keywords, so texts that mention the keywords rank above texts that are only close
+    in topic. Computing it takes no model call.
+
+    Args:
+        keywords (list[str]): The keywords of the request.
+        candidates (list[tuple[str, float]]): (content, cosine similarity) of the texts
+            retrieved for the request.
+        threshold (float): The minimum relevance of a text to be returned.
+        lexical_weight (float): The weight of the keyword overlap, 0 ranks by similarity only.
+        limit (int): The maximum number of texts returned.
+
+    Returns:
+        list[str]: Up to `limit` contents with a relevance of at least `threshold`.
+    """
+    scored = []
+    for content, similarity in candidates:
+        relevance = (1 - lexical_weight) * similarity
+        if lexical_weight:
+            relevance += lexical_weight * keyword_overlap(keywords, content)
+        if relevance >= threshold:
+            scored.append((relevance, content))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [content for _, content in scored[:limit]]
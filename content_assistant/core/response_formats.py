@@ -0,0 +1,140 @@
+import gzip
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger("content_assistant_app")
+
+try:
+    import brotli
+except ImportError:  # Optional, see requirements/requirements-compression.txt
+    brotli = None
+
+# Representations of a generated text, chosen from the Accept header of a request
+LEGACY_JSON = "legacy_json"  # {"generated_text": str() of the UTF-16 bytes}, the default
+UTF8_JSON = "utf8_json"  # {"generated_text": the text}
+UTF8_TEXT = "utf8_text"  # The text as the body, UTF-8 encoded
+UTF16_TEXT = "utf16_text"  # The text as the body, UTF-16 encoded with a byte order mark
+UTF16_BINARY = "utf16_binary"  # The UTF-16 bytes of UTF16_TEXT as application/octet-stream
+
+# Media type of UTF8_JSON, application/json stays the legacy format
+JSON_V2_MEDIA_TYPE = "application/vnd.content-assistant.v2+json"
+
+MEDIA_TYPES = {
+    LEGACY_JSON: "application/json",
+    UTF8_JSON: JSON_V2_MEDIA_TYPE,
+    UTF8_TEXT: "text/plain; charset=utf-8",
+    UTF16_TEXT: "text/plain; charset=utf-16",
+    UTF16_BINARY: "application/octet-stream",
+}
+
+
+def encode_utf16(text: str) -> str:
+    """
+    Encode a generated text in the UTF-16 response format.
+
+    Args:
+        text (str): The plain text.
+
+    Returns:
+        str: The representation of the UTF-16 encoded text.
+
+    Raises:
+        RuntimeError: If the text cannot be encoded.
+    """
+    try:
+        return str(text.encode("utf-16"))
+    except Exception as e:
+        logger.error(f"Error encoding text to UTF-16: {str(e)}")
+        raise RuntimeError("Failed to encode text to UTF-16.") from e
+
+
+def _parse_header(header: Optional[str]) -> list[tuple[str, dict[str, str]]]:
+    """Split an Accept or Accept-Encoding header into its values by descending quality."""
+    values = []
+    for position, element in enumerate((header or "").split(",")):
+        value, *parameters = [part.strip() for part in element.split(";")]
+        if not value:
+            continue
+        parsed = {}
+        for parameter in parameters:
+            name, _, parameter_value = parameter.partition("=")
+            parsed[name.strip().lower()] = parameter_value.strip().strip('"').lower()
+        try:
+            quality = float(parsed.pop("q", 1))
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            values.append((-quality, position, value.lower(), parsed))
+    return [(value, parameters) for _, _, value, parameters in sorted(values)]
+
+
+def negotiate_text_format(accept: Optional[str]) -> str:
+    """
+    Choose the representation of a generated text from the Accept header of a request.
+
+    Args:
+        accept (str, optional): The Accept header.
+
+    Returns:
+        str: One of the formats above, LEGACY_JSON when the header names none of them.
+    """
+    for media_type, parameters in _parse_header(accept):
+        if media_type == JSON_V2_MEDIA_TYPE:
+            return UTF8_JSON
+        if media_type == "text/plain":
+            return UTF16_TEXT if parameters.get("charset") == "utf-16" else UTF8_TEXT
+        if media_type == "application/octet-stream":
+            return UTF16_BINARY
+        if media_type in ("application/json", "application/*", "*/*"):
+            return LEGACY_JSON
+    return LEGACY_JSON
+
+
+def encode_text_body(text: str, text_format: str) -> bytes:
+    """
+    Encode a generated text as the body of a response in `text_format`.
+
+    Args:
+        text (str): The plain text.
+        text_format (str): The format, see negotiate_text_format.
+
+    Returns:
+        bytes: The response body, to be sent with MEDIA_TYPES[text_format].
+    """
+    if text_format == LEGACY_JSON:
+        return json.dumps({"generated_text": encode_utf16(text)}).encode("utf-8")
+    if text_format == UTF8_JSON:
+        return json.dumps({"generated_text": text}, ensure_ascii=False).encode("utf-8")
+    if text_format == UTF8_TEXT:
+        return text.encode("utf-8")
+    if text_format in (UTF16_TEXT, UTF16_BINARY):
+        return text.encode("utf-16")
+    raise ValueError(f"Unknown text format: {text_format}.")
+
+
+def negotiate_content_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choose the compression of a response from the Accept-Encoding header of a request.
+
+    Args:
+        accept_encoding (str, optional): The Accept-Encoding header.
+
+    Returns:
+        str or None: "br" (if the `brotli` package is installed) or "gzip", or None to send
+            the body uncompressed.
+    """
+    accepted = [encoding for encoding, _ in _parse_header(accept_encoding)]
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, content_encoding: str) -> bytes:
+    if content_encoding == "br":
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=5)
+    if content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"Unknown content encoding: {content_encoding}.")
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from content_assistant.core.metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger("content_assistant_app")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Future
+    # Callers sharing the flight so far, the one that started it included
+    callers: int = 1
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time; callers of a key that is in flight share its result.
+
+    The shared call is shielded from cancellation, so a caller going away (e.g. a client
+    disconnecting) does not cancel it for the others. Every caller gets its position among the
+    callers of the flight, the caller that started it being 0, so results can be split among
+    them.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> tuple[Any, int]:
+        """
+        Await `func()`, or the call of a concurrent caller with the same key.
+
+        Args:
+            key (str): The key identical calls share.
+            func (Callable[[], Awaitable]): Starts the call if no call of `key` is in flight.
+
+        Returns:
+            tuple[Any, int]: The result of the call and the position of this caller.
+
+        Raises:
+            Exception: Whatever the shared call raised, to every caller.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            position = flight.callers
+            flight.callers += 1
+            COALESCED_REQUESTS.inc()
+            return await asyncio.shield(flight.task), position
+
+        flight = _Flight(asyncio.ensure_future(func()))
+        self._flights[key] = flight
+        flight.task.add_done_callback(lambda task: self._land(key, flight))
+        return await asyncio.shield(flight.task), 0
+
+    def _land(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            # Retrieved here too, in case every caller went away
+            logger.debug(f"Shared call of {flight.callers} callers failed.")
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any
+
+from transformers import StoppingCriteria, TextStreamer
+
+_END_OF_STREAM = object()
+
+
+class AsyncTextStreamer(TextStreamer):
+    """
+    A TextStreamer handing decoded chunks from the generation thread to the event loop.
+
+    Create it on the event loop, pass it as `streamer` to `model.generate` running in another
+    thread and iterate it with `async for`. Words are emitted once complete, like TextStreamer.
+    """
+
+    def __init__(self, tokenizer: Any, **decode_kwargs: Any):
+        super().__init__(tokenizer, **decode_kwargs)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.cancelled = False
+        self._closed = False
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        # Called from the generation thread
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+        if stream_end:
+            self.loop.call_soon_threadsafe(self.close)
+
+    def close(self):
+        """End the iteration, e.g. when generation failed before finishing the stream."""
+        if not self._closed:
+            self._closed = True
+            self.queue.put_nowait(_END_OF_STREAM)
+
+    def cancel(self):
+        """Ask the running generation to stop at the next decoding step."""
+        self.cancelled = True
+
+    def stopping_criteria(self) -> "StopOnCancel":
+        return StopOnCancel(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        chunk = await self.queue.get()
+        if chunk is _END_OF_STREAM:
+            raise StopAsyncIteration
+        return chunk
+
+
+class StopOnCancel(StoppingCriteria):
+    """Stops generation once its streamer is cancelled, e.g. when the client went away."""
+
+    def __init__(self, streamer: AsyncTextStreamer):
+        self.streamer = streamer
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.streamer.cancelled
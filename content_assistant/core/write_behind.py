@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from content_assistant.core.exceptions import ServiceOverloadedError
+from content_assistant.core.index_manager import BucketKey
+from content_assistant.core.metrics import (
+    INDEX_FRESHNESS_LAG_SECONDS,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FAILURES,
+)
+from content_assistant.core.models import content_hash
+
+logger = logging.getLogger("content_assistant_app")
+
+
+@dataclass
+class PendingText:
+    bucket: BucketKey
+    text: str
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class WriteBehindWriter:
+    """
+    Persists generated texts in the background, so responses do not wait for the database.
+
+    Queued texts are collected for up to `max_wait_ms`, or until `max_batch_size` of them are
+    waiting, and handed to `persist_batch`, which embeds, inserts and indexes them in bulk. A
+    failed batch is retried up to `max_attempts` times with a growing delay, then dropped and
+    logged; a batch rejected by a full inference queue is retried until it is saved. `put`
+    waits while `max_queue_size` texts are queued, so a slow database slows the requests down
+    instead of growing the queue without bound. The worker starts with the first queued text;
+    `drain` persists what is left on shutdown.
+    """
+
+    def __init__(
+        self,
+        persist_batch: Callable[[list[PendingText]], Awaitable[None]],
+        max_batch_size: int,
+        max_wait_ms: int,
+        max_queue_size: int,
+        max_attempts: int = 3,
+    ):
+        self.persist_batch = persist_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self.max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (bucket, content hash) of the texts queued or being persisted
+        self._pending: Counter = Counter()
+
+    def __len__(self) -> int:
+        return sum(self._pending.values())
+
+    def is_pending(self, bucket: BucketKey, text: str) -> bool:
+        """Whether a text of the bucket is queued but not saved yet."""
+        return self._pending[(bucket, content_hash(text))] > 0
+
+    async def put(self, bucket: BucketKey, text: str):
+        """Queue a generated text to be saved, waiting while the queue is full."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = None
+        queue = self._queue
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run(queue))
+
+        key = (bucket, content_hash(text))
+        # Counted while waiting for room too, so the text is not saved twice meanwhile
+        self._pending[key] += 1
+        try:
+            await queue.put(PendingText(bucket, text))
+        except BaseException:
+            # E.g. the request was cancelled while the queue was full, the text is not queued
+            self._pending[key] -= 1
+            self._pending += Counter()  # Drop the zero counts
+            raise
+
+    async def drain(self, timeout: float):
+        """Persist the queued texts, for up to `timeout` seconds, and stop the worker."""
+        if self._queue is None or self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{len(self)} generated texts were not saved before shutdown.")
+        self._worker.cancel()
+
+    async def _next_batch(self, queue: asyncio.Queue) -> list[PendingText]:
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                await self._persist(batch)
+            finally:
+                for item in batch:
+                    self._pending[(item.bucket, content_hash(item.text))] -= 1
+                    queue.task_done()
+                self._pending += Counter()  # Drop the zero counts
+
+    async def _persist(self, batch: list[PendingText]):
+        WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+        attempt = 0
+        while True:
+            try:
+                await self.persist_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except ServiceOverloadedError:
+                # A busy inference queue is no failure of the batch, it waits for room instead
+                logger.warning(f"Saving {len(batch)} generated texts waits for inference.")
+                await asyncio.sleep(1)
+                continue
+            except Exception as e:
+                attempt += 1
+                WRITE_BEHIND_FAILURES.inc()
+                if attempt == self.max_attempts:
+                    logger.error(
+                        f"Dropping {len(batch)} generated texts after {attempt} failed attempts "
+                        f"to save them: {str(e)}"
+                    )
+                    return
+                logger.warning(f"Saving {len(batch)} generated texts failed, retrying: {str(e)}")
+                await asyncio.sleep(attempt)
+            else:
+                persisted_at = time.perf_counter()
+                for item in batch:
+                    INDEX_FRESHNESS_LAG_SECONDS.observe(persisted_at - item.enqueued_at)
+                return
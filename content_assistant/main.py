@@ -1,8 +1,10 @@
+import asyncio
 import content_assistant
 import uvicorn
 import logging.config
+from contextlib import asynccontextmanager
 from content_assistant.core.config.logging import logging_config
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.exceptions import HTTPException, RequestValidationError
 from content_assistant.core.config.settings import get_settings
 from content_assistant.core.exceptions import (
@@ -11,13 +13,61 @@ from content_assistant.core.exceptions import (
     request_validation_exception_handler,
     http_exception_handler,
 )
-from content_assistant.routers import collections_router, health_router
+from content_assistant.core.content_generator import inference_executor, text_writer
+from content_assistant.core.db.database import engine
+from content_assistant.core.metrics import (
+    MULTIPROCESS,
+    collect_server_timings,
+    server_timing_header,
+    update_gauges_periodically,
+)
+from content_assistant.core.model_registry import model_registry
+from content_assistant.routers import collections_router, health_router, metrics_router
 
 logging.config.dictConfig(logging_config)
 
+logger = logging.getLogger("content_assistant_app")
+
+# How often each worker writes its gauges in multiprocess mode
+GAUGE_UPDATE_SECONDS = 5
+
+
+def log_model_loading_errors(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Loading the models failed: {task.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.model_preload:
+        # Load in the background, so the replica is live (but not ready) while it is cold
+        app.state.model_loading = asyncio.create_task(
+            asyncio.to_thread(model_registry.load_all, warm_up=settings.model_warm_up)
+        )
+        app.state.model_loading.add_done_callback(log_model_loading_errors)
+    # In multiprocess mode the gauges of workers not serving a scrape are read from their files
+    gauges = (
+        asyncio.create_task(update_gauges_periodically(GAUGE_UPDATE_SECONDS))
+        if MULTIPROCESS
+        else None
+    )
+    yield
+    if gauges is not None:
+        gauges.cancel()
+    if text_writer is not None:
+        # Save the texts already returned to clients before the executor and pool go away
+        await text_writer.drain(timeout=settings.write_behind_drain_seconds)
+    inference_executor.shutdown(wait=False)
+    await engine.dispose()
+
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Content Authoring Assistant API", version=content_assistant.__version__)
+    app = FastAPI(
+        title="Content Authoring Assistant API",
+        version=content_assistant.__version__,
+        lifespan=lifespan,
+    )
 
     @app.exception_handler(HTTPException)
     async def custom_http_exception_handler(request, e):
@@ -31,11 +81,22 @@ def create_app() -> FastAPI:
     async def custom_validation_exception_handler(request, e):
         return await request_validation_exception_handler(request, e)
 
+    if get_settings().server_timing_enabled:
+
+        @app.middleware("http")
+        async def add_server_timing_header(request: Request, call_next):
+            timings = collect_server_timings()
+            response = await call_next(request)
+            if timings:
+                response.headers["Server-Timing"] = server_timing_header(timings)
+            return response
+
     api_router = APIRouter()
     api_router.include_router(
         collections_router, prefix="/collections", tags=["content_generation"]
     )
     api_router.include_router(health_router, prefix="/health", tags=["health"])
+    api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
     app.include_router(api_router)
 
     return app
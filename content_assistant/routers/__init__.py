@@ -1,2 +1,3 @@
 from content_assistant.routers.collections import router as collections_router
 from content_assistant.routers.health import router as health_router
+from content_assistant.routers.metrics import router as metrics_router
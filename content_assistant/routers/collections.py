@@ -1,32 +1,170 @@
-from fastapi import APIRouter, status, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Request, status, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
-from content_assistant.schemas import TextGenerationRequest, TextGenerationResponse
-from content_assistant.core.content_generator import generate_text
+from content_assistant.schemas import (
+    BulkTextGenerationRequest,
+    TextGenerationRequest,
+    TextGenerationResponse,
+)
+from content_assistant.core.admission import AdmissionController, is_trusted_proxy
+from content_assistant.core.bulk_generator import generate_texts_in_bulk
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.content_generator import generate_text, max_new_tokens_for, stream_text
+from content_assistant.core.exceptions import AppExceptionCase
+from content_assistant.core.inference import BULK, INTERACTIVE
+from content_assistant.core.response_formats import (
+    LEGACY_JSON,
+    MEDIA_TYPES,
+    UTF8_JSON,
+    compress,
+    encode_text_body,
+    encode_utf16,
+    negotiate_content_encoding,
+    negotiate_text_format,
+)
+from typing import AsyncIterator, Optional
+import contextlib
+import json
 import logging
 
 logger = logging.getLogger("content_assistant_app")
 
 router = APIRouter()
 
+# Per-tenant rate limits of the generation endpoints, None when disabled
+admission_controller = AdmissionController.from_settings(get_settings())
+
+
+def tenant_of(http_request: Request) -> str:
+    """
+    The tenant a request is counted against: its API key if it is a configured one, or else
+    its client address.
+
+    Other keys are ignored, so callers cannot get a fresh budget with every new key, and the
+    X-Real-IP header is only taken from trusted proxies.
+    """
+    settings = get_settings()
+    api_key = http_request.headers.get(settings.admission_tenant_header)
+    if api_key and api_key in settings.admission_api_keys:
+        return f"key:{api_key}"
+    client_host = http_request.client.host if http_request.client else "unknown"
+    # Behind nginx the peer is the proxy, the client address is passed in X-Real-IP
+    real_ip = http_request.headers.get("x-real-ip")
+    if real_ip and is_trusted_proxy(client_host, settings.admission_trusted_proxies):
+        client_host = real_ip
+    return f"address:{client_host}"
+
+
+def item_cost(item: TextGenerationRequest) -> float:
+    """The decode tokens a requested text is expected to need, never negative."""
+    return max(0, max_new_tokens_for(item.word_count, item.domain))
+
+
+def generation_cost(items: list[TextGenerationRequest]) -> float:
+    """The decode tokens the requested texts are expected to need."""
+    return sum(item_cost(item) for item in items)
+
+
+def admit(http_request: Request, items: list[TextGenerationRequest], priority: int):
+    """
+    Charge the estimated decode tokens of the requested texts to the caller's budget.
+
+    Raises:
+        RateLimitedError: If the caller's budget does not cover them, answered with a 429.
+    """
+    if admission_controller is not None:
+        admission_controller.admit(tenant_of(http_request), generation_cost(items), priority)
+
+
+@contextlib.contextmanager
+def generation_errors():
+    """Translate errors of the generation pipeline into HTTP errors."""
+    try:
+        yield
+
+    except AppExceptionCase:
+        # Handled by the app exception handler, e.g. 503 when the inference queue is full
+        raise
+
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="A database error occurred."
+        )
+
+    except ValueError as e:
+        logger.warning(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred.",
+        )
+
+
+def text_response(generated_text: str, http_request: Request) -> Response:
+    """
+    Build the response of a generated text in the format the client accepts.
+
+    Bodies of at least `response_compression_min_bytes` are compressed with brotli or gzip if
+    the client accepts it.
+    """
+    settings = get_settings()
+    text_format = negotiate_text_format(http_request.headers.get("accept"))
+    body = encode_text_body(generated_text, text_format)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if (
+        settings.response_compression_enabled
+        and len(body) >= settings.response_compression_min_bytes
+    ):
+        content_encoding = negotiate_content_encoding(http_request.headers.get("accept-encoding"))
+        if content_encoding is not None:
+            body = compress(body, content_encoding)
+            headers["Content-Encoding"] = content_encoding
+    return Response(body, media_type=MEDIA_TYPES[text_format], headers=headers)
+
 
 @router.post(
-    "/generate_text", response_model=TextGenerationResponse, status_code=status.HTTP_200_OK
+    "/generate_text",
+    response_model=TextGenerationResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "content": {
+                MEDIA_TYPES[UTF8_JSON]: {},
+                "text/plain": {},
+                "application/octet-stream": {},
+            }
+        }
+    },
 )
-async def generate_text_endpoint(request: TextGenerationRequest):
+async def generate_text_endpoint(request: TextGenerationRequest, http_request: Request):
     """
     Endpoint to generate text based on user input.
 
+    The format of the text is negotiated with the Accept header: `application/json` (the
+    default) returns `{"generated_text": ...}` with the representation of the UTF-16 encoded
+    text, `application/vnd.content-assistant.v2+json` the plain text in UTF-8 JSON,
+    `text/plain` the text as UTF-8 body, `text/plain; charset=utf-16` and
+    `application/octet-stream` the UTF-16 bytes as body.
+
     Args:
         request (TextGenerationRequest): The input request containing keywords, domain, audience, tone, and word count.
+        http_request (Request): The HTTP request, for its Accept and Accept-Encoding headers
+            and the caller's identity.
 
     Returns:
-        JSONResponse: A response containing the text in UTF16 format or an error message.
+        Response: A response containing the text in the negotiated format or an error message.
 
     Raises:
         HTTPException: If any error occurs during processing.
+        RateLimitedError: If the caller's request budget is used up.
     """
-    try:
+    admit(http_request, [request], INTERACTIVE)
+    with generation_errors():
         logger.info(f"Received request for text generation with parameters: {request.model_dump()}")
         generated_text = await generate_text(
             keywords=request.keywords,
@@ -34,22 +172,177 @@ async def generate_text_endpoint(request: TextGenerationRequest):
             word_count=request.word_count,
             audience=request.audience,
             tone=request.tone,
+            use_cache=request.use_cache,
         )
-        return JSONResponse(content={"generated_text": generated_text})
+        return text_response(generated_text, http_request)
 
-    except SQLAlchemyError as e:
-        logger.error(f"Database error occurred: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="A database error occurred."
-        )
 
-    except ValueError as e:
-        logger.warning(f"Validation error: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+def server_sent_event(data: dict, event: str = "message") -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 
+async def text_events(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    generated_chunks = []
+    try:
+        async for chunk in chunks:
+            generated_chunks.append(chunk)
+            yield server_sent_event({"text": chunk})
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        # Headers are already sent, so report the failure in the stream itself
+        logger.error(f"Error while streaming generated text: {str(e)}", exc_info=True)
+        yield server_sent_event({"detail": "An internal server error occurred."}, event="error")
+        return
+    yield server_sent_event({"generated_text": "".join(generated_chunks).strip()}, event="end")
+
+
+@router.post("/generate_text/stream", status_code=status.HTTP_200_OK)
+async def generate_text_stream_endpoint(request: TextGenerationRequest, http_request: Request):
+    """
+    Endpoint to generate text based on user input, streamed as server-sent events while decoding.
+
+    Each `message` event carries the next chunk of plain text as `{"text": ...}`, a final `end`
+    event the complete text as `{"generated_text": ...}`. Failures after the stream started are
+    reported as an `error` event.
+
+    Args:
+        request (TextGenerationRequest): The input request containing keywords, domain, audience, tone, and word count.
+        http_request (Request): The HTTP request, for the caller's identity.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+
+    Raises:
+        HTTPException: If any error occurs before streaming starts.
+        RateLimitedError: If the caller's request budget is used up.
+    """
+    admit(http_request, [request], INTERACTIVE)
+    with generation_errors():
+        logger.info(f"Received request for text streaming with parameters: {request.model_dump()}")
+        chunks = await stream_text(
+            keywords=request.keywords,
+            domain=request.domain,
+            word_count=request.word_count,
+            audience=request.audience,
+            tone=request.tone,
+        )
+    return StreamingResponse(
+        text_events(chunks),
+        media_type="text/event-stream",
+        # Keep nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def check_bulk_size(items: list[TextGenerationRequest]):
+    max_items = get_settings().bulk_max_items
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No items to generate.")
+    if len(items) > max_items:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred.",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items: {len(items)}, at most {max_items} are accepted per call.",
         )
+
+
+async def bulk_result_lines(
+    items: list[TextGenerationRequest],
+    text_format: str = LEGACY_JSON,
+    tenant: Optional[str] = None,
+) -> AsyncIterator[str]:
+    # The tenant was charged for all items, those not generated are refunded at the end, also
+    # when the client goes away
+    unspent_cost = generation_cost(items)
+    try:
+        async for result in generate_texts_in_bulk(items):
+            if result.generated_text is None:
+                line = {"index": result.index, "error": result.error}
+            else:
+                unspent_cost -= item_cost(items[result.index])
+                if text_format == UTF8_JSON:
+                    line = {"index": result.index, "generated_text": result.generated_text}
+                else:
+                    line = {
+                        "index": result.index,
+                        "generated_text": encode_utf16(result.generated_text),
+                    }
+            yield json.dumps(line, ensure_ascii=text_format != UTF8_JSON) + "\n"
+    finally:
+        if admission_controller is not None and tenant is not None and unspent_cost > 0:
+            admission_controller.refund(tenant, unspent_cost, BULK)
+
+
+def bulk_response(items: list[TextGenerationRequest], http_request: Request) -> StreamingResponse:
+    logger.info(f"Received bulk text generation request with {len(items)} items.")
+    # Lines carry plain texts for the v2 JSON format, other formats keep the legacy lines
+    text_format = negotiate_text_format(http_request.headers.get("accept"))
+    return StreamingResponse(
+        bulk_result_lines(items, text_format, tenant_of(http_request)),
+        media_type="application/x-ndjson",
+        headers={"Vary": "Accept"},
+    )
+
+
+@router.post("/generate_text/batch", status_code=status.HTTP_200_OK)
+async def generate_text_batch_endpoint(request: BulkTextGenerationRequest, http_request: Request):
+    """
+    Endpoint to generate texts for many requests in one call.
+
+    Requests of the same domain, audience and tone share database reads, embedding and
+    generation batches. Results are streamed back as NDJSON as soon as their chunk is saved, one
+    line per request: `{"index": ..., "generated_text": ...}` with the text in the same UTF-16
+    format as `/generate_text`, or plain with `Accept: application/vnd.content-assistant.v2+json`,
+    or `{"index": ..., "error": ...}`. `index` is the position of the request in `items`; lines
+    are not in submission order.
+
+    Args:
+        request (BulkTextGenerationRequest): The list of text generation requests.
+        http_request (Request): The HTTP request, for its Accept header and the caller's
+            identity.
+
+    Returns:
+        StreamingResponse: An `application/x-ndjson` response.
+
+    Raises:
+        HTTPException: If the list is empty or too long.
+        RateLimitedError: If the caller's bulk request budget is used up.
+    """
+    check_bulk_size(request.items)
+    admit(http_request, request.items, BULK)
+    return bulk_response(request.items, http_request)
+
+
+@router.post("/generate_text/batch/jsonl", status_code=status.HTTP_200_OK)
+async def generate_text_batch_jsonl_endpoint(request: Request):
+    """
+    Endpoint to generate texts for a JSONL upload with one text generation request per line.
+
+    Send the file as the request body, e.g.
+    `curl --data-binary @requests.jsonl -H "Content-Type: application/x-ndjson" ...`.
+    Results are streamed back like `/generate_text/batch`, `index` being the request's position
+    among the non-empty lines.
+
+    Args:
+        request (Request): The request with the JSONL body.
+
+    Returns:
+        StreamingResponse: An `application/x-ndjson` response.
+
+    Raises:
+        HTTPException: If a line is not a valid text generation request or there are too many.
+        RateLimitedError: If the caller's bulk request budget is used up.
+    """
+    items = []
+    body = await request.body()
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(TextGenerationRequest.model_validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid request on line {line_number}: {e.errors()[0]['msg']}",
+            )
+    check_bulk_size(items)
+    admit(request, items, BULK)
+    return bulk_response(items, request)
@@ -1,8 +1,22 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.model_registry import model_registry
 
 router = APIRouter()
 
 
 @router.get("")
+@router.get("/live")
 def healthcheck():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "OK"}
+
+
+@router.get("/ready")
+def readiness():
+    """Readiness: the models are loaded, so requests are not slowed down by a cold start."""
+    # Without preloading the models are loaded on first use, a replica is ready right away
+    if get_settings().model_preload and not model_registry.ready:
+        return JSONResponse(status_code=503, content={"status": "LOADING"})
     return {"status": "OK"}
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+
+from content_assistant.core.metrics import MULTIPROCESS, update_gauges
+
+router = APIRouter()
+
+
+@router.get("")
+def metrics():
+    if not MULTIPROCESS:
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    update_gauges()
+    # The metrics of all workers, read from their files in PROMETHEUS_MULTIPROC_DIR
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
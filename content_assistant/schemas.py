@@ -1,12 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Longest text a request may ask for, within the default interactive admission budget
+MAX_WORD_COUNT = 1_000
 
 
 class TextGenerationRequest(BaseModel):
     keywords: list[str]
     domain: str
-    word_count: int
+    word_count: int = Field(gt=0, le=MAX_WORD_COUNT)
     audience: str
     tone: str
+    # Set to False to always generate a fresh text instead of serving a cached one
+    use_cache: bool = True
 
 
 class TextGenerationResponse(BaseModel):
@@ -14,3 +19,7 @@ class TextGenerationResponse(BaseModel):
 
     class Config:
         json_schema_extra = {"example": {"generated_text": "UTF-16_STRING_HERE"}}
+
+
+class BulkTextGenerationRequest(BaseModel):
+    items: list[TextGenerationRequest]
@@ -0,0 +1,62 @@
+"""
+Serve several API workers per host sharing one copy of the model weights.
+
+The models are loaded once in the gunicorn master, before the workers are forked. The workers
+share the weights' memory pages copy-on-write, since inference only reads them. Usage:
+
+    gunicorn "content_assistant.main:create_app()" -c gunicorn.conf.py
+
+Set the number of workers with GUNICORN_WORKERS.
+"""
+
+import gc
+import glob
+import os
+
+from content_assistant.core.config.settings import get_settings
+
+bind = f"0.0.0.0:{os.environ.get('UVICORN_PORT', 8000)}"
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app, and register its models, in the master
+preload_app = True
+# Loading the models may take longer than the default 30s worker timeout
+timeout = 120
+# Leave workers time to save their write-behind queue on shutdown (WRITE_BEHIND_DRAIN_SECONDS)
+graceful_timeout = int(get_settings().write_behind_drain_seconds) + 15
+
+# Metric files of the workers (see README "Metrics"); files of a previous run would be added to
+# this run's metrics, so they are removed before the app is loaded
+prometheus_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if prometheus_multiproc_dir:
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(prometheus_multiproc_dir, "*.db")):
+        os.remove(path)
+
+
+def on_starting(server):
+    import torch
+    from content_assistant.core.model_registry import model_registry
+
+    # No inference in the master: OpenMP thread pools started before a fork hang in the
+    # children, so the workers warm up the models themselves
+    torch.set_num_threads(1)
+    model_registry.load()
+    # Keep the garbage collector from writing to the objects loaded so far, which would copy
+    # their pages into every worker
+    gc.freeze()
+    server.log.info("Loaded the models in the master, forking workers.")
+
+
+def post_fork(server, worker):
+    import torch
+
+    torch.set_num_threads(get_settings().torch_num_threads)
+
+
+def child_exit(server, worker):
+    if prometheus_multiproc_dir:
+        from prometheus_client import multiprocess
+
+        # Drop the gauges of the exited worker, its counters stay part of the totals
+        multiprocess.mark_process_dead(worker.pid)
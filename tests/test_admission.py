@@ -0,0 +1,95 @@
+import pytest
+from content_assistant.core.admission import AdmissionController, TokenBucket, is_trusted_proxy
+from content_assistant.core.exceptions import RateLimitedError, RequestError
+from content_assistant.core.inference import BULK, INTERACTIVE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refills_and_charges_requests():
+    bucket = TokenBucket(rate=10, capacity=100, now=0)
+
+    assert bucket.try_take(60, now=0) == 0
+    assert bucket.try_take(60, now=0) == pytest.approx(2.0)
+    assert bucket.try_take(60, now=2) == 0
+
+    # Negative costs take nothing instead of refilling the bucket
+    assert bucket.try_take(-1_000, now=2) == 0
+    assert bucket.level == 0
+
+
+def test_admission_controller_limits_tenants_and_priorities_separately():
+    clock = FakeClock()
+    controller = AdmissionController(
+        rates={INTERACTIVE: 10, BULK: 10}, capacities={INTERACTIVE: 100, BULK: 1_000}, clock=clock
+    )
+
+    controller.admit("key:a", 100)
+    controller.admit("key:b", 100)
+    controller.admit("key:a", 1_000, priority=BULK)
+    with pytest.raises(RateLimitedError) as exc_info:
+        controller.admit("key:a", 50)
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "5"}
+
+    clock.now = 5
+    controller.admit("key:a", 50)
+
+
+def test_admission_controller_rejects_requests_over_the_whole_budget():
+    controller = AdmissionController(
+        rates={INTERACTIVE: 10, BULK: 10},
+        capacities={INTERACTIVE: 100, BULK: 1_000},
+        clock=FakeClock(),
+    )
+
+    with pytest.raises(RequestError) as exc_info:
+        controller.admit("key:a", 5_000, priority=BULK)
+    assert exc_info.value.status_code == 400
+    # Nothing was taken from the budget
+    controller.admit("key:a", 1_000, priority=BULK)
+
+
+def test_admission_controller_refunds_work_not_done():
+    controller = AdmissionController(
+        rates={INTERACTIVE: 10, BULK: 10},
+        capacities={INTERACTIVE: 100, BULK: 1_000},
+        clock=FakeClock(),
+    )
+
+    controller.admit("key:a", 800, priority=BULK)
+    with pytest.raises(RateLimitedError):
+        controller.admit("key:a", 800, priority=BULK)
+
+    # Refunds fill the bucket up to its capacity at most
+    controller.refund("key:a", 5_000, priority=BULK)
+    assert controller._buckets[("key:a", BULK)].level == 1_000
+    controller.admit("key:a", 1_000, priority=BULK)
+
+
+def test_admission_controller_forgets_least_recent_tenants():
+    controller = AdmissionController(
+        rates={INTERACTIVE: 1, BULK: 1}, capacities={INTERACTIVE: 10, BULK: 10}, max_tenants=2
+    )
+
+    for tenant in ("key:a", "key:b", "key:c"):
+        controller.admit(tenant, 10)
+
+    assert len(controller._buckets) == 2
+    # key:a was forgotten and starts with a full budget again
+    controller.admit("key:a", 10)
+
+
+def test_trusted_proxies_by_address_or_network():
+    trusted = ["10.0.0.5", "172.16.0.0/12"]
+
+    assert is_trusted_proxy("10.0.0.5", trusted)
+    assert is_trusted_proxy("172.18.0.3", trusted)
+    assert not is_trusted_proxy("10.0.0.6", trusted)
+    assert not is_trusted_proxy("testclient", trusted)
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from content_assistant.core.batching import GenerationBatcher
+from content_assistant.core.inference import InferenceExecutor
+
+
+@pytest.mark.asyncio
+async def test_generation_batcher_groups_compatible_prompts():
+    calls = []
+
+    def generate_batch(prompts, max_new_tokens, **generation_kwargs):
+        calls.append((list(prompts), max_new_tokens))
+        return [f"{prompt} done" for prompt in prompts]
+
+    executor = InferenceExecutor(max_workers=1, max_queue_size=8)
+    batcher = GenerationBatcher(generate_batch, executor, max_wait_ms=20, max_batch_size=8)
+
+    results = await asyncio.gather(
+        batcher.generate("a", max_new_tokens=20, do_sample=True),
+        batcher.generate("b", max_new_tokens=50, do_sample=True),
+        batcher.generate("c", max_new_tokens=200, do_sample=True),
+    )
+
+    assert results == ["a done", "b done", "c done"]
+    # 20 and 50 tokens share the 64 token bucket, 200 goes to the 256 one
+    assert sorted(calls) == [(["a", "b"], 64), (["c"], 256)]
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_generation_batcher_dispatches_full_batch_without_waiting():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=8)
+    batcher = GenerationBatcher(
+        lambda prompts, **kwargs: [prompt.upper() for prompt in prompts],
+        executor,
+        max_wait_ms=60_000,
+        max_batch_size=2,
+    )
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.generate("a", 10), batcher.generate("b", 10)), timeout=5
+    )
+
+    assert results == ["A", "B"]
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_generation_batcher_passes_word_counts_of_each_prompt():
+    calls = []
+
+    def generate_batch(prompts, max_new_tokens, word_counts=None, **generation_kwargs):
+        calls.append((list(prompts), word_counts))
+        return [[prompt, prompt.upper()] for prompt in prompts]
+
+    executor = InferenceExecutor(max_workers=1, max_queue_size=8)
+    batcher = GenerationBatcher(generate_batch, executor, max_wait_ms=20, max_batch_size=8)
+
+    results = await asyncio.gather(
+        batcher.generate("a", max_new_tokens=20, word_count=10),
+        batcher.generate("b", max_new_tokens=40, word_count=25),
+    )
+
+    assert results == [["a", "A"], ["b", "B"]]
+    assert calls == [(["a", "b"], [10, 25])]
+    executor.shutdown()
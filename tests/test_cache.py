@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from content_assistant.core.cache import InMemoryCacheBackend, ResponseCache, SemanticCache
+
+BUCKET = ("e-commerce", "consumer", "playful")
+
+
+def test_make_key_normalizes_keywords_only():
+    key = ResponseCache.make_key(["Salad", " bread "], "e-commerce", 50, "consumer", "playful")
+
+    assert key == ResponseCache.make_key(
+        ["bread", "salad"], "e-commerce", 50, "consumer", "playful"
+    )
+    assert key != ResponseCache.make_key(
+        ["bread", "salad"], "e-commerce", 60, "consumer", "playful"
+    )
+    # Buckets are case-sensitive, like in the database
+    assert key != ResponseCache.make_key(
+        ["bread", "salad"], "E-commerce", 50, "consumer", "playful"
+    )
+
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_evicts_expired_and_least_recently_used_entries():
+    backend = InMemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    await backend.set("a", "A")
+    await backend.set("b", "B")
+    assert await backend.get("a") == "A"
+
+    await backend.set("c", "C")
+    assert await backend.get("b") is None
+    assert await backend.get("a") == "A"
+
+    with patch("content_assistant.core.cache.time.monotonic", return_value=10**9):
+        assert await backend.get("a") is None
+
+
+def test_semantic_cache_reuses_only_similar_queries_of_the_same_scope():
+    cache = SemanticCache(threshold=0.9, max_entries=10, ttl_seconds=60)
+    embedding = np.array([1.0, 0.0], dtype="float32")
+    cache.set("key", BUCKET, 50, embedding, "cached text")
+
+    assert cache.get(BUCKET, 50, np.array([0.99, 0.14], dtype="float32")) == "cached text"
+    assert cache.get(BUCKET, 50, np.array([0.0, 1.0], dtype="float32")) is None
+    assert cache.get(BUCKET, 80, embedding) is None
+    assert cache.get(("legal", "business", "formal"), 50, embedding) is None
@@ -1,5 +1,12 @@
+import json
 import pytest
 from unittest.mock import patch
+from content_assistant.core.admission import AdmissionController
+from content_assistant.core.bulk_generator import BulkGenerationResult
+from content_assistant.core.config.settings import get_settings
+from content_assistant.core.content_generator import max_new_tokens_for
+from content_assistant.core.exceptions import ServiceOverloadedError
+from content_assistant.core.inference import BULK, INTERACTIVE
 from content_assistant.main import create_app
 from fastapi.testclient import TestClient
 
@@ -10,7 +17,7 @@ client = TestClient(app)
 @pytest.mark.asyncio
 @patch("content_assistant.routers.collections.generate_text")
 async def test_integration_trigger_generate_text(mock_trigger_generate_text):
-    mock_trigger_generate_text.return_value = "Generated test content in UTF16 format."
+    mock_trigger_generate_text.return_value = "Generated test content."
 
     request_data = {
         "keywords": ["test"],
@@ -22,4 +29,229 @@ async def test_integration_trigger_generate_text(mock_trigger_generate_text):
     response = client.post("/collections/generate_text", json=request_data)
 
     assert response.status_code == 200
-    assert response.json()["generated_text"] == "Generated test content in UTF16 format."
+    assert response.json()["generated_text"] == str("Generated test content.".encode("utf-16"))
+
+
+@patch("content_assistant.routers.collections.generate_text")
+def test_generate_text_negotiates_response_format(mock_generate_text):
+    mock_generate_text.return_value = "Grüner Salat."
+    request_data = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+
+    response = client.post(
+        "/collections/generate_text",
+        json=request_data,
+        headers={"Accept": "application/vnd.content-assistant.v2+json"},
+    )
+    assert response.json() == {"generated_text": "Grüner Salat."}
+
+    response = client.post(
+        "/collections/generate_text", json=request_data, headers={"Accept": "text/plain"}
+    )
+    assert response.headers["Content-Type"] == "text/plain; charset=utf-8"
+    assert response.text == "Grüner Salat."
+
+    response = client.post(
+        "/collections/generate_text",
+        json=request_data,
+        headers={"Accept": "application/octet-stream"},
+    )
+    assert response.content == "Grüner Salat.".encode("utf-16")
+
+
+@pytest.mark.asyncio
+@patch("content_assistant.routers.collections.generate_text")
+async def test_integration_generate_text_overloaded(mock_trigger_generate_text):
+    mock_trigger_generate_text.side_effect = ServiceOverloadedError()
+
+    request_data = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+    response = client.post("/collections/generate_text", json=request_data)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["app_exception"] == "ServiceOverloadedError"
+
+
+@patch("content_assistant.routers.collections.generate_text")
+def test_generate_text_rate_limited_per_tenant(mock_generate_text):
+    mock_generate_text.return_value = "Generated test content."
+    # Budget for one 100-word text per tenant, refilled at one token per second
+    limits = AdmissionController(
+        rates={INTERACTIVE: 1, BULK: 1}, capacities={INTERACTIVE: 200, BULK: 200}
+    )
+    request_data = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+
+    with patch("content_assistant.routers.collections.admission_controller", limits), patch.object(
+        get_settings(), "admission_api_keys", ["other"]
+    ):
+        first = client.post("/collections/generate_text", json=request_data)
+        limited = client.post("/collections/generate_text", json=request_data)
+        # Unknown keys and X-Real-IP headers of untrusted peers are counted against the address
+        unknown_key = client.post(
+            "/collections/generate_text", json=request_data, headers={"X-API-Key": "fresh"}
+        )
+        spoofed_address = client.post(
+            "/collections/generate_text", json=request_data, headers={"X-Real-IP": "10.0.0.1"}
+        )
+        other_tenant = client.post(
+            "/collections/generate_text", json=request_data, headers={"X-API-Key": "other"}
+        )
+
+    assert first.status_code == 200
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 1
+    assert limited.json()["app_exception"] == "RateLimitedError"
+    assert unknown_key.status_code == 429
+    assert spoofed_address.status_code == 429
+    assert other_tenant.status_code == 200
+    assert mock_generate_text.call_count == 2
+
+
+@patch("content_assistant.routers.collections.generate_texts_in_bulk")
+def test_generate_text_batch_refunds_items_not_generated(mock_generate_texts_in_bulk):
+    async def results(items):
+        yield BulkGenerationResult(0, generated_text="A")
+        yield BulkGenerationResult(1, error="Text generation failed.")
+
+    mock_generate_texts_in_bulk.side_effect = results
+    item = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+    item_cost = max_new_tokens_for(100, "test_domain")
+    # Budget for two items, barely refilled
+    limits = AdmissionController(
+        rates={INTERACTIVE: 1, BULK: 1}, capacities={INTERACTIVE: 200, BULK: 2 * item_cost}
+    )
+
+    with patch("content_assistant.routers.collections.admission_controller", limits):
+        first = client.post("/collections/generate_text/batch", json={"items": [item, item]})
+        # Only the failed item's cost was given back
+        refunded = client.post("/collections/generate_text/batch", json={"items": [item]})
+        limited = client.post("/collections/generate_text/batch", json={"items": [item]})
+
+    assert first.status_code == 200
+    assert refunded.status_code == 200
+    assert limited.status_code == 429
+
+
+def test_generate_text_batch_rejects_unbounded_costs():
+    item = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+    limits = AdmissionController(
+        rates={INTERACTIVE: 1, BULK: 1},
+        capacities={INTERACTIVE: 200, BULK: 10 * max_new_tokens_for(100, "test_domain")},
+    )
+
+    with patch("content_assistant.routers.collections.admission_controller", limits):
+        # A negative word count cannot offset the cost of the other items
+        negative = client.post(
+            "/collections/generate_text/batch",
+            json={"items": [item] * 20 + [{**item, "word_count": -10_000_000}]},
+        )
+        # Batches costing more than the whole budget have to be split
+        too_large = client.post("/collections/generate_text/batch", json={"items": [item] * 20})
+
+    assert negative.status_code == 400
+    assert too_large.status_code == 400
+    assert too_large.json()["app_exception"] == "RequestError"
+
+
+def test_health_separates_liveness_from_readiness():
+    with patch("content_assistant.routers.health.model_registry") as mock_model_registry:
+        mock_model_registry.ready = False
+        assert client.get("/health/live").status_code == 200
+        assert client.get("/health/ready").status_code == 503
+
+        mock_model_registry.ready = True
+        assert client.get("/health/ready").status_code == 200
+
+
+def test_metrics_endpoint():
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "content_assistant_generation_batch_size" in response.text
+
+
+@pytest.mark.asyncio
+@patch("content_assistant.routers.collections.stream_text")
+async def test_integration_stream_generated_text(mock_stream_text):
+    async def chunks():
+        for chunk in ["Generated ", "streamed ", "text."]:
+            yield chunk
+
+    mock_stream_text.return_value = chunks()
+
+    request_data = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+    response = client.post("/collections/generate_text/stream", json=request_data)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event]
+    assert events[0] == 'event: message\ndata: {"text": "Generated "}'
+    assert events[-1] == 'event: end\ndata: {"generated_text": "Generated streamed text."}'
+
+
+@pytest.mark.asyncio
+@patch("content_assistant.routers.collections.generate_texts_in_bulk")
+async def test_integration_generate_text_batch(mock_generate_texts_in_bulk):
+    async def results(items):
+        yield BulkGenerationResult(1, error="Text generation failed.")
+        yield BulkGenerationResult(0, generated_text="A")
+
+    mock_generate_texts_in_bulk.side_effect = results
+
+    item = {
+        "keywords": ["test"],
+        "domain": "test_domain",
+        "word_count": 100,
+        "audience": "test_audience",
+        "tone": "test_tone",
+    }
+    response = client.post("/collections/generate_text/batch", json={"items": [item, item]})
+
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"index": 1, "error": "Text generation failed."},
+        {"index": 0, "generated_text": str("A".encode("utf-16"))},
+    ]
+
+    jsonl = "\n".join([json.dumps(item), "", json.dumps(item)])
+    response = client.post("/collections/generate_text/batch/jsonl", content=jsonl)
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+
+    response = client.post("/collections/generate_text/batch/jsonl", content='{"keywords": []}')
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+import numpy as np
+from content_assistant.core.faiss_indexes import FaissIndexFactory
+from content_assistant.core.index_manager import FaissIndexManager
+
+INDEX_DIMENSION = 384
+
+
+def _embeddings(*values):
+    return np.array([[value] * INDEX_DIMENSION for value in values], dtype="float32")
+
+
+def test_bucket_index_adds_incrementally():
+    manager = FaissIndexManager(INDEX_DIMENSION, memory_budget_bytes=1024 * 1024)
+    bucket_index = manager.get_or_create(("e-commerce", "consumer", "playful"))
+
+    bucket_index.add([1, 2], _embeddings(0.1, -0.1))
+    bucket_index.add([2, 3], _embeddings(-0.1, 0.2))
+
+    assert len(bucket_index) == 3
+    assert bucket_index.search(_embeddings(0.1)[0], k=1)[0][0] == 3
+
+
+def test_manager_evicts_least_recently_used_bucket():
+    # Room for a single 2-vector bucket
+    manager = FaissIndexManager(INDEX_DIMENSION, memory_budget_bytes=2 * (INDEX_DIMENSION * 4 + 8))
+    cold, hot = ("legal", "business", "formal"), ("e-commerce", "consumer", "playful")
+
+    manager.get_or_create(cold).add([1, 2], _embeddings(0.1, 0.2))
+    manager.get_or_create(hot).add([3, 4], _embeddings(0.1, 0.2))
+    manager.evict()
+
+    assert manager.get(cold) is None
+    assert manager.get(hot) is not None
+
+    # Non-resident buckets are not created by incremental adds
+    manager.add(cold, [5], _embeddings(0.3))
+    assert manager.get(cold) is None
+
+
+def test_bucket_index_switches_to_ann_index_past_threshold():
+    factory = FaissIndexFactory(index_type="auto", ann_index_type="hnsw", ann_threshold=100)
+    manager = FaissIndexManager(INDEX_DIMENSION, memory_budget_bytes=2**30, index_factory=factory)
+    bucket_index = manager.get_or_create(("e-commerce", "consumer", "playful"))
+    vectors = np.random.default_rng(0).standard_normal((150, INDEX_DIMENSION)).astype("float32")
+
+    bucket_index.add(range(1, 51), vectors[:50])
+    assert bucket_index.index_type == "flat"
+
+    bucket_index.add(range(51, 151), vectors[50:])
+    assert bucket_index.index_type == "hnsw"
+    assert len(bucket_index) == bucket_index.index.ntotal == 150
+    assert bucket_index.search(vectors[10], k=1)[0][0] == 11
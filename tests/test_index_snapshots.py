@@ -0,0 +1,60 @@
+import numpy as np
+from content_assistant.core.faiss_indexes import FaissIndexFactory
+from content_assistant.core.index_manager import BucketIndex, FaissIndexManager
+from content_assistant.core.index_snapshots import IndexSnapshotStore
+
+INDEX_DIMENSION = 384
+BUCKET = ("e-commerce", "consumer", "playful")
+
+
+def _vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, INDEX_DIMENSION)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _snapshotted_bucket(tmp_path, vectors, factory=None):
+    bucket_index = BucketIndex(INDEX_DIMENSION, factory)
+    bucket_index.add(range(1, len(vectors) + 1), vectors)
+    bucket_index.mark_synced(len(vectors))
+    store = IndexSnapshotStore(str(tmp_path), INDEX_DIMENSION, factory)
+    store.save(BUCKET, bucket_index)
+    return store
+
+
+def test_snapshot_round_trip_with_newer_texts(tmp_path):
+    vectors = _vectors(60)
+    store = _snapshotted_bucket(tmp_path, vectors[:50])
+    manager = FaissIndexManager(
+        INDEX_DIMENSION, memory_budget_bytes=2**30, load_snapshot=store.load
+    )
+
+    bucket_index = manager.get_or_create(BUCKET)
+    assert bucket_index.synced_id == 50
+    assert len(bucket_index) == 50
+
+    # Texts of the snapshot are not added again, newer ones go to the regular index
+    bucket_index.add(range(45, 61), vectors[44:])
+    assert len(bucket_index) == 60
+    assert len(bucket_index.ids) == 10
+    assert bucket_index.search(vectors[10], k=1)[0][0] == 11
+    assert bucket_index.search(vectors[55], k=1)[0][0] == 56
+
+
+def test_memory_mapped_ivf_snapshot(tmp_path):
+    factory = FaissIndexFactory(index_type="ivf_flat", ivf_nlist=4)
+    vectors = _vectors(400)
+    store = _snapshotted_bucket(tmp_path, vectors, factory)
+
+    bucket_index = store.load(BUCKET)
+    assert bucket_index.snapshot_type == "ivf_flat"
+    assert bucket_index.search(vectors[123], k=1)[0][0] == 124
+
+
+def test_latest_snapshot_replaces_older_ones(tmp_path):
+    vectors = _vectors(20)
+    _snapshotted_bucket(tmp_path, vectors[:10])
+    store = _snapshotted_bucket(tmp_path, vectors)
+
+    assert store.load(BUCKET).synced_id == 20
+    assert len([path for path in store.bucket_directory(BUCKET).iterdir() if path.is_dir()]) == 1
+    assert store.load(("legal", "business", "formal")) is None
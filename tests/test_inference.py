@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+from content_assistant.core.exceptions import ServiceOverloadedError
+from content_assistant.core.inference import BULK, INTERACTIVE, InferenceExecutor
+
+
+@pytest.mark.asyncio
+async def test_inference_executor_rejects_calls_when_queue_is_full():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    queued = asyncio.ensure_future(executor.run(lambda: "done"))
+    await asyncio.sleep(0)
+    assert executor.in_flight == 2 and executor.queued == 1
+
+    with pytest.raises(ServiceOverloadedError) as exc_info:
+        await executor.run(lambda: "rejected")
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    assert await running is True
+    assert await queued == "done"
+    assert executor.in_flight == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_inference_executor_serves_interactive_calls_before_bulk_calls():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    release = threading.Event()
+    order = []
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    bulk = [
+        asyncio.ensure_future(executor.run_with_priority(BULK, order.append, f"bulk {i}"))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    # Queued bulk calls do not use up the queue of interactive calls
+    interactive = asyncio.ensure_future(executor.run(order.append, "interactive"))
+    await asyncio.sleep(0)
+    assert executor.queued == 4
+
+    release.set()
+    await asyncio.gather(running, interactive, *bulk)
+    assert order == ["interactive", "bulk 0", "bulk 1", "bulk 2"]
+    assert executor.in_flight == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_inference_executor_admits_submitted_calls_right_away():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+    release = threading.Event()
+
+    running = executor.submit(INTERACTIVE, release.wait)
+    assert executor.in_flight == 1
+    with pytest.raises(ServiceOverloadedError):
+        executor.submit(INTERACTIVE, lambda: "rejected")
+
+    # Calls cancelled before they start leave the queue too
+    cancelled = executor.submit(BULK, lambda: "cancelled")
+    cancelled.cancel()
+    release.set()
+    assert await running is True
+    await asyncio.sleep(0)
+    assert executor.in_flight == 0
+    executor.shutdown()
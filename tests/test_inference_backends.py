@@ -0,0 +1,19 @@
+import pytest
+import torch
+
+from content_assistant.core.inference_backends import _quantize, load_model
+
+
+def test_load_model_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        load_model("embedding", "sentence-transformers/all-MiniLM-L6-v2", backend="tensorrt")
+
+
+def test_quantize_replaces_linear_layers_with_int8_ones():
+    model = torch.nn.Sequential(torch.nn.Linear(16, 8), torch.nn.ReLU(), torch.nn.Linear(8, 4))
+    inputs = torch.randn(2, 16)
+
+    quantized = _quantize(model)
+
+    assert isinstance(quantized[0], torch.nn.quantized.dynamic.Linear)
+    torch.testing.assert_close(quantized(inputs), model(inputs), atol=0.05, rtol=0.05)
@@ -0,0 +1,64 @@
+import torch
+
+from content_assistant.core.length_control import TokensPerWordEstimator, WordCountStoppingCriteria
+
+PAD, EOS = 0, 1
+WORDS = {2: "fresh", 3: "salad", 4: "menu."}
+
+
+class WordTokenizer:
+    """One token per word, like the stand-in models of the benchmarks."""
+
+    eos_token_id = EOS
+
+    def decode(self, token_ids, skip_special_tokens=False):
+        return " ".join(WORDS[int(token_id)] for token_id in token_ids if int(token_id) in WORDS)
+
+
+def test_estimator_uses_default_until_domain_is_calibrated():
+    estimator = TokensPerWordEstimator(default_tokens_per_word=1.5, tolerance=0.2, margin_tokens=4)
+
+    assert estimator.needs_calibration("e-commerce")
+    assert estimator.max_new_tokens(10) == 22
+
+    estimator.calibrate("e-commerce", token_counts=[12, 18], word_counts=[10, 10])
+
+    assert not estimator.needs_calibration("e-commerce")
+    assert estimator.tokens_per_word("e-commerce") == 1.5
+    assert estimator.tokens_per_word("advertising") == 1.5
+    estimator.calibrate("advertising", token_counts=[30], word_counts=[10])
+    assert estimator.max_new_tokens(10, "advertising") == 40
+
+
+def test_estimator_keeps_default_without_stored_words():
+    estimator = TokensPerWordEstimator(default_tokens_per_word=2.0, refresh_seconds=0)
+
+    estimator.calibrate("e-commerce", token_counts=[], word_counts=[])
+
+    assert estimator.tokens_per_word("e-commerce") == 2.0
+    assert estimator.needs_calibration("e-commerce")
+
+
+def test_word_count_criteria_stops_once_every_sequence_is_long_enough():
+    criteria = WordCountStoppingCriteria(WordTokenizer(), word_counts=[2, 3], tolerance=0.5)
+
+    # The first text ends a sentence at its word count, the second still needs a word
+    input_ids = torch.tensor([[PAD, 2, 4], [PAD, 2, 3]])
+    assert not criteria(input_ids, scores=None)
+
+    # Three words do not end a sentence, but reach 50% more than 2 words
+    input_ids = torch.tensor([[PAD, 2, 3, 3], [PAD, 2, 3, 4]])
+    assert criteria(input_ids, scores=None)
+
+
+def test_word_count_criteria_skips_ended_sequences_of_each_prompt():
+    criteria = WordCountStoppingCriteria(
+        WordTokenizer(), word_counts=[1, 5], tolerance=0.0, num_return_sequences=2
+    )
+
+    # Both candidates of the first prompt are long enough, those of the second one ended
+    input_ids = torch.tensor([[PAD, 2, 3], [PAD, 4, 3], [PAD, 2, EOS], [PAD, EOS, PAD]])
+    assert criteria(input_ids, scores=None)
+
+    input_ids = torch.tensor([[PAD, 2, 3], [PAD, 4, 3], [PAD, 2, 3], [PAD, EOS, PAD]])
+    assert not criteria(input_ids, scores=None)
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+from prometheus_client import CollectorRegistry, multiprocess
+from content_assistant.core.metrics import (
+    STAGE_SECONDS,
+    collect_server_timings,
+    server_timing_header,
+    time_stage,
+)
+
+
+def _stage_count(stage: str) -> float:
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels["stage"] == stage:
+                return sample.value
+    return 0.0
+
+
+def test_time_stage_observes_histogram_and_collects_server_timings():
+    before = _stage_count("test_stage")
+    timings = collect_server_timings()
+
+    with time_stage("test_stage"):
+        pass
+    with time_stage("test_stage"):
+        pass
+
+    assert _stage_count("test_stage") == before + 2
+    assert [stage for stage, _ in timings] == ["test_stage", "test_stage"]
+
+
+def test_server_timing_header_sums_repeated_stages():
+    header = server_timing_header([("generation", 0.5), ("db_write", 0.002), ("generation", 0.25)])
+
+    assert header == "generation;dur=750.0, db_write;dur=2.0"
+
+
+WORKER_SCRIPT = """
+from content_assistant.core.metrics import INFERENCE_QUEUED, set_gauge_function, time_stage
+from content_assistant.core.metrics import update_gauges
+
+set_gauge_function(INFERENCE_QUEUED, lambda: 3)
+update_gauges()
+with time_stage("test_stage"):
+    pass
+"""
+
+
+def test_metrics_of_several_worker_processes_are_summed(tmp_path):
+    environment = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER_SCRIPT], env=environment, check=True)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    samples = {
+        (sample.name, sample.labels.get("stage")): sample.value
+        for metric in registry.collect()
+        for sample in metric.samples
+    }
+    assert samples[("content_assistant_stage_seconds_count", "test_stage")] == 2
+    assert samples[("content_assistant_inference_queued", None)] == 6
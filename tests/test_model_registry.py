@@ -0,0 +1,38 @@
+import threading
+
+from content_assistant.core.model_registry import ModelRegistry
+
+
+def test_model_registry_loads_models_lazily_and_once():
+    registry = ModelRegistry()
+    loads = []
+
+    def load():
+        loads.append(threading.get_ident())
+        return object()
+
+    registry.register("embedding", load)
+    assert not registry.is_loaded("embedding")
+
+    threads = [threading.Thread(target=registry.get, args=("embedding",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert registry.get("embedding") is registry.get("embedding")
+
+
+def test_model_registry_load_all_warms_up_and_becomes_ready():
+    registry = ModelRegistry()
+    warmed_up = []
+    registry.register("embedding", lambda: "embedding model", warm_up=warmed_up.append)
+    registry.register("generation", lambda: "generation model")
+
+    assert not registry.ready
+    registry.load_all()
+
+    assert registry.ready
+    assert registry.is_loaded("generation")
+    assert warmed_up == ["embedding model"]
@@ -0,0 +1,21 @@
+import numpy as np
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from content_assistant.core.models import TextEntry, Vector
+
+
+def test_vector_binds_text_representation_cast_to_vector():
+    process = Vector(3).bind_processor(postgresql.dialect())
+
+    assert process(np.array([0.5, -1, 0], dtype="float32")) == "[0.5,-1.0,0.0]"
+    assert process(None) is None
+
+    query = select(TextEntry.id).order_by(TextEntry.embedding_vector.op("<#>")(np.zeros(384)))
+    assert "<#> CAST(CAST(%(embedding_vector_1)s AS TEXT) AS VECTOR(384))" in str(
+        query.compile(dialect=postgresql.dialect())
+    )
+
+
+def test_embedding_vector_is_not_loaded_with_text_entries():
+    assert "embedding_vector" not in str(select(TextEntry))
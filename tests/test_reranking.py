@@ -0,0 +1,33 @@
+from content_assistant.core.reranking import keyword_overlap, rerank, similarity_threshold_for
+
+KEYWORDS = ["fresh bread", "milk"]
+
+
+def test_keyword_overlap_counts_keyword_words():
+    assert keyword_overlap(KEYWORDS, "Fresh bread, baked daily, and cold milk.") == 1.0
+    assert keyword_overlap(KEYWORDS, "Our bread is the best.") == 1 / 3
+    assert keyword_overlap([], "Anything") == 0.0
+
+
+def test_rerank_prefers_texts_mentioning_the_keywords():
+    candidates = [("A text about pastries.", 0.82), ("Fresh bread and milk delivered.", 0.78)]
+
+    assert rerank(KEYWORDS, candidates, threshold=0.8) == ["A text about pastries."]
+    assert rerank(KEYWORDS, candidates, threshold=0.8, lexical_weight=0.3, limit=2) == [
+        "Fresh bread and milk delivered."
+    ]
+
+
+def test_rerank_returns_up_to_limit_texts_above_threshold():
+    candidates = [("milk", 0.9), ("fresh bread", 0.85), ("cheese", 0.5)]
+
+    assert rerank(KEYWORDS, candidates, threshold=0.8, limit=2) == ["milk", "fresh bread"]
+    assert rerank(KEYWORDS, candidates, threshold=0.95) == []
+
+
+def test_similarity_threshold_per_bucket():
+    thresholds = {"legal": 0.7, "legal:business:formal": 0.9}
+
+    assert similarity_threshold_for(("legal", "business", "formal"), 0.8, thresholds) == 0.9
+    assert similarity_threshold_for(("legal", "consumer", "formal"), 0.8, thresholds) == 0.7
+    assert similarity_threshold_for(("e-commerce", "consumer", "playful"), 0.8) == 0.8
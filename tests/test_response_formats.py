@@ -0,0 +1,52 @@
+import gzip
+import json
+
+from content_assistant.core.response_formats import (
+    LEGACY_JSON,
+    UTF16_BINARY,
+    UTF16_TEXT,
+    UTF8_JSON,
+    UTF8_TEXT,
+    compress,
+    encode_text_body,
+    negotiate_content_encoding,
+    negotiate_text_format,
+)
+
+
+def test_negotiate_text_format_defaults_to_legacy_json():
+    assert negotiate_text_format(None) == LEGACY_JSON
+    assert negotiate_text_format("*/*") == LEGACY_JSON
+    assert negotiate_text_format("application/json") == LEGACY_JSON
+    assert negotiate_text_format("image/png") == LEGACY_JSON
+
+
+def test_negotiate_text_format_follows_quality_and_charset():
+    assert negotiate_text_format("application/vnd.content-assistant.v2+json") == UTF8_JSON
+    assert negotiate_text_format("text/plain") == UTF8_TEXT
+    assert negotiate_text_format('text/plain; charset="UTF-16"') == UTF16_TEXT
+    assert negotiate_text_format("application/json;q=0.5, application/octet-stream") == UTF16_BINARY
+    assert negotiate_text_format("text/plain;q=0, application/json") == LEGACY_JSON
+
+
+def test_encode_text_body():
+    text = "Grüner Salat."
+
+    assert json.loads(encode_text_body(text, LEGACY_JSON)) == {
+        "generated_text": str(text.encode("utf-16"))
+    }
+    assert json.loads(encode_text_body(text, UTF8_JSON)) == {"generated_text": text}
+    assert encode_text_body(text, UTF8_TEXT) == text.encode("utf-8")
+    assert encode_text_body(text, UTF16_BINARY).decode("utf-16") == text
+    # The legacy representation escapes every byte, the plain formats do not
+    assert len(encode_text_body(text, UTF8_JSON)) < len(encode_text_body(text, LEGACY_JSON)) / 2
+
+
+def test_negotiate_content_encoding_and_compress():
+    assert negotiate_content_encoding(None) is None
+    assert negotiate_content_encoding("identity") is None
+    assert negotiate_content_encoding("gzip;q=0") is None
+    assert negotiate_content_encoding("deflate, gzip") == "gzip"
+
+    body = encode_text_body("salad " * 200, UTF8_TEXT)
+    assert gzip.decompress(compress(body, "gzip")) == body
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from content_assistant.core.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call_between_identical_callers():
+    flights = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def generate(key):
+        calls.append(key)
+        await release.wait()
+        return f"{key} text"
+
+    callers = [
+        asyncio.ensure_future(flights.run(key, lambda key=key: generate(key)))
+        for key in ("a", "a", "b", "a")
+    ]
+    await asyncio.sleep(0)
+    assert len(flights) == 2
+
+    release.set()
+    results = await asyncio.gather(*callers)
+
+    assert sorted(calls) == ["a", "b"]
+    assert results == [("a text", 0), ("a text", 1), ("b text", 0), ("a text", 2)]
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_keeps_running_for_others_when_a_caller_is_cancelled():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def generate():
+        await release.wait()
+        return "text"
+
+    first = asyncio.ensure_future(flights.run("a", generate))
+    second = asyncio.ensure_future(flights.run("a", generate))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == ("text", 1)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_single_flight_raises_the_error_to_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("Text generation failed.")
+
+    results = await asyncio.gather(
+        flights.run("a", fail), flights.run("a", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
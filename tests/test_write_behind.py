@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from content_assistant.core.exceptions import ServiceOverloadedError
+from content_assistant.core.write_behind import WriteBehindWriter
+
+BUCKET = ("e-commerce", "consumer", "playful")
+
+
+@pytest.mark.asyncio
+async def test_write_behind_writer_persists_queued_texts_in_batches():
+    batches = []
+
+    async def persist_batch(batch):
+        batches.append([item.text for item in batch])
+
+    writer = WriteBehindWriter(persist_batch, max_batch_size=2, max_wait_ms=20, max_queue_size=8)
+    for text in ("a", "b", "c"):
+        await writer.put(BUCKET, text)
+    assert writer.is_pending(BUCKET, "a")
+    assert not writer.is_pending(("advertising", "business", "formal"), "a")
+
+    await writer.drain(timeout=5)
+
+    assert batches == [["a", "b"], ["c"]]
+    assert len(writer) == 0
+    assert not writer.is_pending(BUCKET, "a")
+
+
+@pytest.mark.asyncio
+async def test_write_behind_writer_retries_failed_batches(monkeypatch):
+    attempts = []
+
+    async def persist_batch(batch):
+        attempts.append([item.text for item in batch])
+        if len(attempts) == 1:
+            raise RuntimeError("Failed to save generated texts.")
+
+    async def no_sleep(seconds):
+        pass
+
+    writer = WriteBehindWriter(persist_batch, max_batch_size=8, max_wait_ms=0, max_queue_size=8)
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    await writer.put(BUCKET, "a")
+    await writer.drain(timeout=5)
+
+    assert attempts == [["a"], ["a"]]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_writer_waits_out_a_full_inference_queue(monkeypatch):
+    attempts = []
+
+    async def persist_batch(batch):
+        attempts.append([item.text for item in batch])
+        if len(attempts) <= 5:
+            raise ServiceOverloadedError()
+
+    async def no_sleep(seconds):
+        pass
+
+    writer = WriteBehindWriter(persist_batch, max_batch_size=8, max_wait_ms=0, max_queue_size=8)
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    await writer.put(BUCKET, "a")
+    await writer.drain(timeout=5)
+
+    # Overload does not count as a failed attempt, the batch is not dropped after 3
+    assert len(attempts) == 6
+
+
+@pytest.mark.asyncio
+async def test_write_behind_writer_forgets_texts_whose_put_was_cancelled():
+    release = asyncio.Event()
+
+    async def persist_batch(batch):
+        await release.wait()
+
+    writer = WriteBehindWriter(persist_batch, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+    await writer.put(BUCKET, "a")
+    await asyncio.sleep(0)  # The worker takes "a" and waits in persist_batch
+    await writer.put(BUCKET, "b")
+    blocked = asyncio.ensure_future(writer.put(BUCKET, "c"))
+    await asyncio.sleep(0)
+    assert writer.is_pending(BUCKET, "c")
+
+    blocked.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await blocked
+    assert not writer.is_pending(BUCKET, "c")
+
+    release.set()
+    await writer.drain(timeout=5)
+    assert len(writer) == 0